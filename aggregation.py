@@ -0,0 +1,157 @@
+"""
+Out-of-core Feature Aggregation
+Per-student features from the OULAD event tables, computed from chunks of a CSV (or of a cached
+table, see data_cache.py) with mergeable partial aggregates (count, sum, min, max and sum of squared
+deviations), so memory grows with the number of students rather than the number of events
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_cache import CachedTable
+
+# Rows per CSV chunk; peak memory is a few copies of one chunk plus the per-student state
+CHUNK_ROWS = int(os.environ.get('TRAIN_CHUNK_ROWS', 1000000))
+
+# Only the columns the features use, in the smallest dtypes that hold OULAD values exactly.
+# Columns that can be missing are float32 (OULAD values are small integers, exact in float32).
+ASSESSMENT_DTYPES = {'id_student': 'int32', 'date_submitted': 'float32', 'score': 'float32'}
+VLE_DTYPES = {'id_student': 'int32', 'date': 'float32', 'sum_click': 'float32'}
+REGISTRATION_DTYPES = {'id_student': 'int32', 'date_registration': 'float32', 'date_unregistration': 'float32'}
+
+# OULAD writes missing values as '?'
+NA_VALUES = ['?']
+
+
+class GroupedMoments:
+    """
+    Running count, sum, min, max and M2 (sum of squared deviations from the mean) per key and column
+    Chunks are reduced on their own, then merged with Chan et al.'s pairwise update, so results do
+    not depend on how the input was split. Missing values are skipped, as pandas does.
+    """
+
+    def __init__(self, key, columns):
+        self.key = key
+        self.columns = list(columns)
+        self.rows = 0
+        self.count = None
+        self.total = None
+        self.min = None
+        self.max = None
+        self.m2 = None
+
+    def update(self, chunk):
+        keys = chunk[self.key].to_numpy()
+        values = chunk[self.columns].astype('float64')
+        grouped = values.groupby(keys, sort=False)
+        count = grouped.count()
+        total = grouped.sum()
+        mean = (total / count.where(count > 0)).reindex(keys)
+        m2 = ((values - mean.to_numpy()) ** 2).groupby(keys, sort=False).sum()
+        self._merge(count, total, grouped.min(), grouped.max(), m2)
+        self.rows += len(chunk)
+        return self
+
+    def _merge(self, count, total, low, high, m2):
+        if self.count is None:
+            self.count, self.total, self.min, self.max, self.m2 = count, total, low, high, m2
+            return
+        index = self.count.index.union(count.index)
+
+        def both(a, b, fill):
+            return a.reindex(index, fill_value=fill), b.reindex(index, fill_value=fill)
+
+        n_a, n_b = both(self.count, count, 0)
+        s_a, s_b = both(self.total, total, 0.0)
+        m2_a, m2_b = both(self.m2, m2, 0.0)
+        n = n_a + n_b
+        delta = s_b / n_b.where(n_b > 0) - s_a / n_a.where(n_a > 0)
+        # Only groups seen on both sides get the cross term
+        cross = (delta ** 2 * n_a * n_b / n.where(n > 0)).fillna(0.0)
+
+        self.count = n
+        self.total = s_a + s_b
+        self.m2 = m2_a + m2_b + cross
+        # Both sides are aligned on index and columns, so fmin/fmax run once over the raw arrays
+        min_a, min_b = both(self.min, low, np.nan)
+        max_a, max_b = both(self.max, high, np.nan)
+        self.min = pd.DataFrame(np.fmin(min_a.to_numpy(), min_b.to_numpy()), index=index, columns=min_a.columns)
+        self.max = pd.DataFrame(np.fmax(max_a.to_numpy(), max_b.to_numpy()), index=index, columns=max_a.columns)
+
+    def mean(self):
+        return self.total / self.count.where(self.count > 0)
+
+    def std(self):
+        """Sample standard deviation (ddof=1), NaN for fewer than two values, as pandas"""
+        return np.sqrt(self.m2 / (self.count - 1).where(self.count > 1))
+
+
+def read_chunks(source, dtypes, chunk_rows=None):
+    """Chunks of the needed columns from a cached table or a CSV path"""
+    if isinstance(source, CachedTable):
+        return source.chunks(list(dtypes), chunk_rows or CHUNK_ROWS)
+    return pd.read_csv(source, usecols=list(dtypes), dtype=dtypes, na_values=NA_VALUES,
+                       chunksize=chunk_rows or CHUNK_ROWS)
+
+
+def aggregate_csv(source, key, columns, dtypes, chunk_rows=None):
+    moments = GroupedMoments(key, columns)
+    for chunk in read_chunks(source, dtypes, chunk_rows):
+        moments.update(chunk)
+    return moments
+
+
+def _frame(moments, columns):
+    result = pd.DataFrame(columns, index=moments.count.index).sort_index()
+    result.index.name = moments.key
+    return result.reset_index()
+
+
+def assessment_features(source, chunk_rows=None):
+    """Same columns as groupby('id_student').agg(score mean/std/min/max/count, date_submitted mean/std)"""
+    m = aggregate_csv(source, 'id_student', ['score', 'date_submitted'], ASSESSMENT_DTYPES, chunk_rows)
+    mean, std = m.mean(), m.std()
+    features = _frame(m, {
+        'avg_score': mean['score'],
+        'std_score': std['score'],
+        'min_score': m.min['score'],
+        'max_score': m.max['score'],
+        'num_assessments': m.count['score'],
+        'avg_submission_date': mean['date_submitted'],
+        'std_submission_date': std['date_submitted'],
+    })
+    features['score_range'] = features['max_score'] - features['min_score']
+    features['std_score'] = features['std_score'].fillna(0)
+    features['std_submission_date'] = features['std_submission_date'].fillna(0)
+    return features, m.rows
+
+
+def vle_features(source, chunk_rows=None):
+    """Same columns as groupby('id_student').agg(sum_click sum/mean/std/max, date count/min/max)"""
+    m = aggregate_csv(source, 'id_student', ['sum_click', 'date'], VLE_DTYPES, chunk_rows)
+    mean, std = m.mean(), m.std()
+    features = _frame(m, {
+        'total_clicks': m.total['sum_click'],
+        'avg_clicks': mean['sum_click'],
+        'std_clicks': std['sum_click'],
+        'max_clicks': m.max['sum_click'],
+        'num_interactions': m.count['date'],
+        'first_access': m.min['date'],
+        'last_access': m.max['date'],
+    })
+    features['access_duration'] = features['last_access'] - features['first_access']
+    features['std_clicks'] = features['std_clicks'].fillna(0)
+    return features, m.rows
+
+
+def registration_features(source, chunk_rows=None):
+    """Mean registration date and number of unregistrations per student"""
+    m = aggregate_csv(source, 'id_student', ['date_registration', 'date_unregistration'],
+                      REGISTRATION_DTYPES, chunk_rows)
+    features = _frame(m, {
+        'avg_registration_date': m.mean()['date_registration'],
+        'num_unregistrations': m.count['date_unregistration'],
+    })
+    return features, m.rows
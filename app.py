@@ -3,14 +3,34 @@ Student Anomaly Detection API - Fixed Prediction Logic
 Flask backend for serving the trained model
 """
 
-from flask import Flask, request, jsonify
+import time
+IMPORT_STARTED = time.perf_counter()
+
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-import joblib
 import numpy as np
-import pandas as pd
+import hmac
+import json
 import os
+import threading
 import traceback
 
+import batch_jobs
+import metrics
+import model_store
+import response_format
+import risk_engine
+import streaming
+from model_store import ModelSet
+from prediction_cache import PredictionCache, feature_keys
+from coalescer import RequestCoalescer
+from profiling import RequestProfiler
+from sharded_scoring import ShardedScorer
+from traffic import RequestRecorder
+from feature_store import FeatureStore
+from online_features import OnlineFeatures
+from preprocessing import CATEGORICAL_COLS, NUMERIC_COLS, unknown_categories
+
 app = Flask(__name__)
 
 # Fix CORS configuration
@@ -22,105 +42,437 @@ CORS(app, resources={
     }
 })
 
+MODELS_DIR = os.environ.get('MODELS_DIR', os.path.join(os.path.dirname(__file__), 'models'))
+
+# With APP_LAZY_INIT=1, importing this module does not load models; that happens in create_app()
+# (or on the first request), so tools and tests that only need the code import it cheaply
+APP_LAZY_INIT = os.environ.get('APP_LAZY_INIT', '0') == '1'
+
+# Rows scored per chunk by /predict_stream
+STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', 1000))
+
+# Shared secret for /admin endpoints (unset or empty disables them)
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# Seconds between checks of the models directory for a retrained model (0 disables watching)
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 0))
+
+# 'auto' serves the memory-mapped model_bundle.bin when present, 'bundle' requires it, 'pickle' ignores it
+MODEL_FORMAT = os.environ.get('MODEL_FORMAT', 'auto')
+
+# 'float32' encodes, scales and scores in single precision (half the bytes per batch) when the loaded
+# model's scores stay within model_store.FLOAT32_SCORE_TOLERANCE of the float64 path
+INFERENCE_DTYPE = os.environ.get('INFERENCE_DTYPE', 'float64')
+
+# Asynchronous batch jobs: spooled to disk, scored in a process pool, kept for BATCH_JOB_RETENTION seconds
+job_manager = batch_jobs.JobManager(
+    os.environ.get('BATCH_JOBS_DIR', os.path.join(os.path.dirname(__file__), 'jobs')),
+    max_workers=int(os.environ.get('BATCH_JOB_WORKERS', 2)),
+    retention=float(os.environ.get('BATCH_JOB_RETENTION', 86400)),
+    chunk_size=STREAM_CHUNK_SIZE
+)
+BATCH_JOB_PAGE_SIZE = int(os.environ.get('BATCH_JOB_PAGE_SIZE', 500))
+
+# Model outputs cached by feature vector + model version (size 0 disables the cache)
+prediction_cache = PredictionCache(
+    maxsize=int(os.environ.get('PREDICTION_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('PREDICTION_CACHE_TTL', 300))
+)
+
+# Optional micro-batching of concurrent /predict calls (window 0 disables it)
+COALESCE_WINDOW_MS = float(os.environ.get('COALESCE_WINDOW_MS', 0))
+COALESCE_MAX_BATCH = int(os.environ.get('COALESCE_MAX_BATCH', 64))
+request_coalescer = None
+if COALESCE_WINDOW_MS > 0:
+    request_coalescer = RequestCoalescer(
+        lambda X, models: score_samples(X, models),
+        window=COALESCE_WINDOW_MS / 1000.0,
+        max_batch=COALESCE_MAX_BATCH
+    )
+
+# Batches of at least SHARD_MIN_ROWS are scored across SHARD_WORKERS processes (0 = one per CPU, 1 disables)
+sharded_scorer = ShardedScorer(
+    workers=int(os.environ.get('SHARD_WORKERS', 0)),
+    min_rows=int(os.environ.get('SHARD_MIN_ROWS', 20000))
+)
+
+# Opt-in profiling: admin requests with an X-Profile header, plus a PROFILE_SAMPLE_RATE fraction of all requests
+request_profiler = RequestProfiler(
+    os.environ.get('PROFILE_DIR', os.path.join(os.path.dirname(__file__), 'profiles')),
+    sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', 0)),
+    mode=os.environ.get('PROFILE_MODE', 'sampling'),
+    interval=float(os.environ.get('PROFILE_INTERVAL_MS', 1)) / 1000.0
+)
+
+# Per-student features written by train_model.py, so clients can send only an id_student
+FEATURE_STORE_PATH = os.environ.get('FEATURE_STORE_PATH', os.path.join(MODELS_DIR, 'feature_store.bin'))
+FEATURE_STORE_CACHE_SIZE = int(os.environ.get('FEATURE_STORE_CACHE_SIZE', 10000))
+feature_store = None
+
+# Running aggregates of events posted to /events, overlaid on the feature store; reset when the store changes
+online_features = None
+online_lock = threading.Lock()
+
+# Traffic capture for benchmarks/loadtest.py: a REQUEST_LOG_SAMPLE_RATE fraction of requests appended as JSONL
+# Uploads to these endpoints may be streamed and are never captured, whatever their content type
+STREAMED_ENDPOINTS = ('predict_stream', 'ingest_events', 'submit_job')
+request_recorder = None
+if os.environ.get('REQUEST_LOG_PATH'):
+    request_recorder = RequestRecorder(
+        os.environ['REQUEST_LOG_PATH'],
+        sample_rate=float(os.environ.get('REQUEST_LOG_SAMPLE_RATE', 1)),
+        max_body_bytes=int(os.environ.get('REQUEST_LOG_MAX_BODY_BYTES', 1 << 20))
+    )
+
 # Global variables for models
 model = None
 scaler = None
 label_encoders = None
+model_version = None
+
+# The active artifact set; swapped as a unit under models_lock
+active_models = ModelSet(None, None, None)
+models_lock = threading.Lock()
+
+init_lock = threading.Lock()
+initialized = False
+models_loaded = False
+startup_report = {'mode': 'lazy' if APP_LAZY_INIT else 'eager', 'import_s': None,
+                  'load_s': None, 'warm_up_s': None, 'init_s': None, 'total_s': None}
+
+reload_lock = threading.Lock()
+reload_status = {'state': 'idle', 'version': None, 'error': None, 'started_at': None, 'finished_at': None}
+model_watcher = None
+
+def current_models():
+    """Snapshot of the active artifact set; requests use it throughout so a reload never mixes versions"""
+    global active_models
+    
+    with models_lock:
+        models = active_models
+        if not models.matches(model, scaler, label_encoders):
+            # The globals were replaced directly (e.g. patched in tests): wrap them in a set
+            models = ModelSet(model, scaler, label_encoders, version=model_version)
+            active_models = models
+        return models
+
+def activate_models(models):
+    """Make a loaded artifact set active in one atomic step"""
+    global model, scaler, label_encoders, model_version, active_models
+    
+    with models_lock:
+        model, scaler, label_encoders = models.model, models.scaler, models.label_encoders
+        model_version = models.version
+        active_models = models
+    
+    # Entries are keyed by version, so this only frees memory held by the old model
+    prediction_cache.clear()
 
 def load_models():
     """Load the trained models from the models directory"""
-    global model, scaler, label_encoders
-    
     try:
-        models_dir = os.path.join(os.path.dirname(__file__), 'models')
-        
-        if not os.path.exists(models_dir):
-            print(f"⚠️  Models directory not found: {models_dir}")
-            return False
-        
-        model_path = os.path.join(models_dir, 'best_anomaly_model.pkl')
-        scaler_path = os.path.join(models_dir, 'scaler.pkl')
-        encoders_path = os.path.join(models_dir, 'label_encoders.pkl')
-        
-        print(f"Loading model from: {model_path}")
-        print(f"Loading scaler from: {scaler_path}")
-        print(f"Loading encoders from: {encoders_path}")
-        
-        for path in [model_path, scaler_path, encoders_path]:
-            if not os.path.exists(path):
-                print(f"⚠️  Model file not found: {path}")
-                return False
-        
-        model = joblib.load(model_path)
-        scaler = joblib.load(scaler_path)
-        label_encoders = joblib.load(encoders_path)
-        
-        print("="*60)
-        print("✓ Successfully loaded all models!")
-        print(f"Model type: {type(model).__name__}")
-        if hasattr(model, 'contamination'):
-            print(f"Model contamination: {model.contamination}")
-        if hasattr(model, 'threshold_'):
-            print(f"Model threshold: {model.threshold_}")
-        print("="*60)
-        return True
-        
+        models = model_store.load_model_set(MODELS_DIR, MODEL_FORMAT, INFERENCE_DTYPE)
+    except FileNotFoundError as e:
+        print(f"⚠️  {e}")
+        return False
     except Exception as e:
         print("="*60)
         print(f"✗ Error loading models: {e}")
         traceback.print_exc()
         print("="*60)
         return False
+    
+    activate_models(models)
+    
+    print("="*60)
+    print("✓ Successfully loaded all models!")
+    print(f"Model type: {type(models.model).__name__}")
+    print(f"Model version: {models.version}")
+    print(f"Inference dtype: {models.dtype.name}")
+    if hasattr(models.model, 'contamination'):
+        print(f"Model contamination: {models.model.contamination}")
+    if hasattr(models.model, 'threshold_'):
+        print(f"Model threshold: {models.model.threshold_}")
+    print("="*60)
+    return True
 
-def preprocess_input(data):
-    """Preprocess the input data for prediction"""
+def load_feature_store():
+    """
+    Open (or reopen, if the file changed) the memory-mapped feature store; returns True if one is open
+    A store whose file was removed (e.g. by a streaming retrain) is dropped rather than kept serving.
+    """
+    global feature_store
+    
+    if not os.path.exists(FEATURE_STORE_PATH):
+        if feature_store is not None and feature_store.path == FEATURE_STORE_PATH:
+            print(f"⚠️  Feature store {FEATURE_STORE_PATH} was removed: ID lookups are disabled")
+            feature_store = None
+        return feature_store is not None
     try:
-        # Create DataFrame
-        df = pd.DataFrame([data]) if isinstance(data, dict) else data.copy()
-        
-        # Encode categorical variables
-        categorical_cols = ['code_module', 'code_presentation', 'gender', 'region', 
-                           'highest_education', 'imd_band', 'age_band', 'disability']
-        
-        for col in categorical_cols:
-            if col in df.columns and col in label_encoders:
-                le = label_encoders[col]
-                try:
-                    df[col + '_encoded'] = le.transform(df[col].astype(str))
-                except ValueError as e:
-                    print(f"⚠️  Unknown value for {col}: using default")
-                    df[col + '_encoded'] = 0
-            else:
-                df[col + '_encoded'] = 0
-        
-        # Define all feature columns (must match training order)
-        feature_cols = [col + '_encoded' for col in categorical_cols] + [
-            'studied_credits', 'num_of_prev_attempts',
-            'avg_score', 'std_score', 'min_score', 'max_score', 'num_assessments',
-            'avg_submission_date', 'std_submission_date', 'score_range',
-            'total_clicks', 'avg_clicks', 'std_clicks', 'max_clicks',
-            'num_interactions', 'first_access', 'last_access', 'access_duration',
-            'avg_registration_date', 'num_unregistrations'
-        ]
+        if feature_store is not None and feature_store.mtime == os.path.getmtime(FEATURE_STORE_PATH):
+            return True
+        feature_store = FeatureStore(FEATURE_STORE_PATH, cache_size=FEATURE_STORE_CACHE_SIZE)
+        print(f"✓ Feature store: {feature_store.rows} students (version {feature_store.version})")
+        return True
+    except Exception as e:
+        print(f"⚠️  Could not open feature store {FEATURE_STORE_PATH}: {e}")
+        return feature_store is not None
+
+def live_features():
+    """OnlineFeatures for the open feature store (None without one); a new store starts from empty state"""
+    global online_features
+    
+    store = feature_store
+    if store is None:
+        return None
+    with online_lock:
+        if online_features is None or online_features.store is not store:
+            if online_features is not None and len(online_features):
+                print(f"⚠️  Feature store changed: dropping live events of {len(online_features)} students")
+            online_features = OnlineFeatures(store)
+        return online_features
+
+def init_app():
+    """Load models and start background services once; returns the Flask app"""
+    global initialized, models_loaded, model_watcher
+    
+    with init_lock:
+        if initialized:
+            return app
+        started = time.perf_counter()
         
-        # Ensure all features exist with default values
-        for feature in feature_cols:
-            if feature not in df.columns:
-                df[feature] = 0
+        print("\n" + "="*60)
+        print("🚀 Starting Student Anomaly Detection API v1.3")
+        print("="*60)
+        if current_models().model is None:
+            models_loaded = load_models()
+        else:
+            # Models were provided before init (e.g. patched in by tests): keep them
+            models_loaded = True
         
-        # Select features in correct order
-        X = df[feature_cols]
+        if not models_loaded:
+            print("\n⚠️  WARNING: Models not loaded!")
+        load_feature_store()
         
-        # Scale the features
-        X_scaled = scaler.transform(X)
+        if MODEL_WATCH_INTERVAL > 0:
+            model_watcher = model_store.ModelWatcher(MODELS_DIR, reload_models, interval=MODEL_WATCH_INTERVAL).start()
+            print(f"👀 Watching {MODELS_DIR} for new models every {MODEL_WATCH_INTERVAL:g}s")
         
-        return X_scaled
+        timings = current_models().timings
+        startup_report.update(
+            load_s=timings.get('load_s'),
+            warm_up_s=timings.get('warm_up_s'),
+            init_s=round(time.perf_counter() - started, 4),
+            total_s=round(time.perf_counter() - IMPORT_STARTED, 4)
+        )
+        print_startup_report()
+        initialized = True
+    return app
+
+def create_app():
+    """Application factory, e.g. gunicorn 'app:create_app()'"""
+    return init_app()
+
+def after_fork():
+    """
+    Prepare a worker forked from a preloaded parent (see deployment/gunicorn.conf.py)
+    Only the forking thread survives a fork, so locks a parent background thread (the model
+    watcher's reload) may have held are replaced, and the watcher is restarted in the worker.
+    """
+    global models_lock, reload_lock, online_lock
+    
+    models_lock = threading.Lock()
+    reload_lock = threading.Lock()
+    online_lock = threading.Lock()
+    if reload_status['state'] == 'loading':
+        reload_status.update(state='idle', error='Interrupted by fork')
+    
+    if model_watcher is not None:
+        # Keeps the parent's last-seen signature, so artifacts written since the preload are picked up
+        model_watcher.start()
+
+def print_startup_report():
+    print("⏱️  Startup: " + ", ".join(
+        f"{stage} {startup_report[stage + '_s']:.3f}s"
+        for stage in ['import', 'load', 'warm_up', 'init', 'total']
+        if startup_report[stage + '_s'] is not None
+    ))
+
+@app.before_request
+def ensure_initialized():
+    """Lazy mode: the first request triggers init if the server did not call create_app()"""
+    if not initialized:
+        init_app()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Per-endpoint request count, error count and latency (streamed bodies: time to first byte)"""
+    started = g.get('request_started')
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint)
+        metrics.REQUESTS.inc(endpoint, str(response.status_code))
+        if response.status_code >= 400:
+            metrics.ERRORS.inc(endpoint)
+    return response
+
+@app.before_request
+def capture_request():
+    if request_recorder is None or request.method == 'OPTIONS' or not request_recorder.wants(request.path):
+        return
+    # Uploads to these endpoints can be read by their handlers from request.stream: reading them here
+    # would buffer the whole upload and could leave the handler an empty body, whatever the content type
+    if request.endpoint in STREAMED_ENDPOINTS:
+        return
+    length = request.content_length
+    if length is None and 'chunked' not in request.headers.get('Transfer-Encoding', '').lower():
+        length = 0
+    if request_recorder.accepts_body(length):
+        path = request.full_path if request.query_string else request.path
+        body = request.get_data(cache=True) if length else b''
+        request_recorder.record(request.method, path, request.content_type, body)
+
+@app.before_request
+def start_profiling():
+    # With profiling off this is one header lookup and one float comparison
+    requested = 'X-Profile' in request.headers and is_admin_request()
+    if request_profiler.wants(requested):
+        g.profile = request_profiler.start(f"{request.method} {request.path}")
+
+def save_profile(session):
+    paths = request_profiler.finish(session)
+    print(f"🔬 Profiled {session.label}: {', '.join(paths)}")
+
+@app.after_request
+def finish_profiling(response):
+    session = g.pop('profile', None)
+    if session is not None:
+        response.headers['X-Profile-Id'] = session.profile_id
+        if response.is_streamed:
+            # A streamed body (e.g. /predict_stream) is scored while it is sent: keep profiling until
+            # the server closes the response, after the last chunk or a client disconnect
+            response.call_on_close(lambda: save_profile(session))
+        else:
+            save_profile(session)
+    return response
+
+@app.teardown_request
+def abandon_profiling(exc):
+    """Requests that raised never reach after_request: still stop and save their profile"""
+    session = g.pop('profile', None)
+    if session is not None:
+        request_profiler.finish(session)
+
+def reload_models():
+    """
+    Load, validate and warm up the artifacts in the background, then swap them in
+    Returns False if a reload is already running. Requests keep being served by the
+    current set until the swap, and requests already in flight finish on it.
+    """
+    if not reload_lock.acquire(blocking=False):
+        return False
+    
+    reload_status.update(state='loading', error=None, started_at=time.time(), finished_at=None)
+    
+    def run():
+        try:
+            models = model_store.load_model_set(MODELS_DIR, MODEL_FORMAT, INFERENCE_DTYPE)
+            previous = current_models().version
+            activate_models(models)
+            load_feature_store()
+            reload_status.update(state='succeeded', version=models.version)
+            print(f"✓ Reloaded models: {previous} -> {models.version}")
+        except Exception as e:
+            reload_status.update(state='failed', error=str(e))
+            print(f"✗ Model reload failed, still serving {current_models().version}: {e}")
+            traceback.print_exc()
+        finally:
+            reload_status['finished_at'] = time.time()
+            reload_lock.release()
+    
+    threading.Thread(target=run, name='model-reload', daemon=True).start()
+    return True
+
+def is_admin_request():
+    """True if the request carries the configured admin token"""
+    if not ADMIN_TOKEN:
+        return False
+    token = request.headers.get('X-Admin-Token', '')
+    return hmac.compare_digest(token, ADMIN_TOKEN)
+
+def score_samples(X, models=None):
+    """Return (predictions, raw_scores) for a preprocessed feature matrix"""
+    models = models or current_models()
+    metrics.record_batch(len(X))
+    with metrics.stage('score'):
+        return sharded_scorer.score(models, X)
+
+def score_rows(X_scaled, models):
+    """score_samples(), with single rows micro-batched through the request coalescer when enabled"""
+    if request_coalescer is not None and len(X_scaled) == 1:
+        prediction, raw_score = request_coalescer.score(X_scaled[0], context=models)
+        return np.array([prediction]), np.array([raw_score])
+    return score_samples(X_scaled, models)
+
+def encode_input(data, models=None):
+    """Encode a record or DataFrame into the unscaled feature matrix"""
+    try:
+        models = models or current_models()
+        with metrics.stage('preprocess'):
+            return models.encode(data)
         
     except Exception as e:
         print(f"✗ Preprocessing error: {e}")
         traceback.print_exc()
         raise ValueError(f"Error preprocessing input: {str(e)}")
 
+def scale_input(X, models):
+    with metrics.stage('scale'):
+        return models.scale(X)
+
+def preprocess_input(data, models=None):
+    """Preprocess the input data for prediction"""
+    models = models or current_models()
+    X = encode_input(data, models)
+    
+    # Scale the features
+    X_scaled = scale_input(X, models)
+    
+    return X_scaled
+
+def predict_input(data, models=None):
+    """Return (predictions, raw_scores) for a record or DataFrame, running the model only on cache misses"""
+    models = models or current_models()
+    if prediction_cache.maxsize <= 0 or models.version is None:
+        return score_rows(preprocess_input(data, models), models)
+    
+    X = encode_input(data, models)
+    keys = feature_keys(X, models.version)
+    cached = prediction_cache.get_many(keys)
+    
+    predictions = np.empty(len(keys), dtype=int)
+    raw_scores = np.empty(len(keys), dtype=np.float64)
+    misses = []
+    for i, value in enumerate(cached):
+        if value is None:
+            misses.append(i)
+        else:
+            predictions[i], raw_scores[i] = value
+    
+    if misses:
+        miss_predictions, miss_scores = score_rows(scale_input(X[misses], models), models)
+        predictions[misses] = miss_predictions
+        raw_scores[misses] = miss_scores
+        prediction_cache.put_many(
+            (keys[i], (int(p), float(s))) for i, p, s in zip(misses, miss_predictions, miss_scores)
+        )
+    
+    return predictions, raw_scores
+
 def calculate_risk_score_advanced(raw_score, prediction, student_data):
     """
     Advanced risk calculation that uses BOTH anomaly score AND actual student metrics
@@ -335,14 +687,18 @@ def home():
     if request.method == 'OPTIONS':
         return '', 204
     
+    models = current_models()
     return jsonify({
         'status': 'running',
         'message': 'Student Anomaly Detection API',
         'version': '1.3 - Fixed Risk Calculation',
-        'model_loaded': model is not None,
+        'model_loaded': models.model is not None,
+        'model_version': models.version,
         'endpoints': {
             '/predict': 'Single student prediction',
             '/predict_batch': 'Batch CSV prediction',
+            '/predict_stream': 'Streaming NDJSON/CSV batch prediction',
+            '/jobs': 'Asynchronous batch prediction jobs',
             '/diagnose': 'Test prediction on sample data'
         }
     })
@@ -350,7 +706,8 @@ def home():
 @app.route('/diagnose', methods=['GET'])
 def diagnose():
     """Diagnostic endpoint to test model behavior"""
-    if model is None:
+    models = current_models()
+    if models.model is None:
         return jsonify({'error': 'Models not loaded'}), 500
     
     # Create test samples
@@ -377,9 +734,8 @@ def diagnose():
             'num_unregistrations': 0
         }
         
-        X = preprocess_input(test_data)
-        pred = model.predict(X)[0]
-        score = model.score_samples(X)[0]
+        predictions, raw_scores = predict_input(test_data, models)
+        pred, score = predictions[0], raw_scores[0]
         risk = calculate_risk_score_advanced(score, pred, test_data)
         
         results.append({
@@ -393,8 +749,9 @@ def diagnose():
     return jsonify({
         'diagnosis': results,
         'model_info': {
-            'type': type(model).__name__,
-            'contamination': getattr(model, 'contamination', 'N/A')
+            'type': type(models.model).__name__,
+            'version': models.version,
+            'contamination': getattr(models.model, 'contamination', 'N/A')
         }
     })
 
@@ -405,41 +762,87 @@ def predict():
         return '', 204
     
     try:
-        if model is None:
+        models = current_models()
+        if models.model is None:
             return jsonify({'error': 'Models not loaded'}), 500
         
-        data = request.get_json()
+        with metrics.stage('json_parse'):
+            data = request.get_json()
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
-        X = preprocess_input(data)
-        prediction = model.predict(X)[0]
-        raw_score = model.score_samples(X)[0]
+        if 'id_student' in data and needs_stored_features(data):
+            if feature_store is None:
+                return jsonify({'error': 'Feature store not loaded'}), 503
+            stored = lookup_student(data['id_student'])
+            if stored is None:
+                return jsonify({'error': f"Unknown id_student: {data['id_student']}"}), 404
+            # Fields sent with the request override the stored ones
+            stored.update(data)
+            data = stored
+        
+        predictions, raw_scores = predict_input(data, models)
+        prediction, raw_score = predictions[0], raw_scores[0]
         
         # Use advanced risk calculation
-        risk_score = calculate_risk_score_advanced(raw_score, prediction, data)
+        with metrics.stage('risk_score'):
+            risk_score = calculate_risk_score_advanced(raw_score, prediction, data)
         is_at_risk = risk_score >= 50  # Risk-based threshold instead of model prediction
         
-        risk_factors = analyze_risk_factors(data, is_at_risk, risk_score)
+        with metrics.stage('risk_factors'):
+            risk_factors = analyze_risk_factors(data, is_at_risk, risk_score)
         recommendation = generate_recommendation(is_at_risk, risk_score, risk_factors)
         
         print(f"✓ Prediction: pred={prediction}, score={raw_score:.3f}, risk={risk_score:.1f}%")
         
-        return jsonify({
-            'isAtRisk': bool(is_at_risk),
-            'riskScore': float(risk_score),
-            'anomalyScore': float(raw_score),
-            'prediction': int(prediction),
-            'confidence': 0.85,
-            'riskFactors': risk_factors,
-            'recommendation': recommendation
-        })
+        with metrics.stage('serialize'):
+            response = jsonify({
+                'isAtRisk': bool(is_at_risk),
+                'riskScore': float(risk_score),
+                'anomalyScore': float(raw_score),
+                'prediction': int(prediction),
+                'confidence': 0.85,
+                'riskFactors': risk_factors,
+                'recommendation': recommendation,
+                # Unseen categories are scored as their column's first class (preprocessing.UNKNOWN_CODE)
+                'unknownCategories': unknown_categories(data, models.encoder),
+                'modelVersion': models.version
+            })
+        return response
         
     except Exception as e:
         print(f"✗ Prediction error: {e}")
         traceback.print_exc()
         return jsonify({'error': str(e)}), 400
 
+def needs_stored_features(data):
+    """True if a record lacks model inputs, i.e. they have to come from the feature store"""
+    return any(col not in data for col in CATEGORICAL_COLS + NUMERIC_COLS)
+
+def lookup_student(student_id):
+    """Stored feature record for one student with live event features applied, or None if unknown"""
+    with metrics.stage('feature_lookup'):
+        record = feature_store.get(student_id)
+        if record is not None:
+            live_features().apply(record)
+        return record
+
+def lookup_students(student_ids):
+    """Stored feature rows for many students with live event features applied, plus the unknown ids"""
+    with metrics.stage('feature_lookup'):
+        df, missing_ids = feature_store.frame(student_ids)
+        live_features().apply_frame(df)
+    df['student_id'] = df['id_student']
+    return df, missing_ids
+
+def score_students(df, models, first_index=0, response_type=response_format.ROWS):
+    """
+    Score a DataFrame of students through the prediction cache and return (risk columns, results)
+    results are the result records, or for the columnar formats the build_batch_columns() body
+    """
+    return risk_engine.score_students(df, models, first_index, columnar=response_type != response_format.ROWS,
+                                      predict=predict_input)
+
 @app.route('/predict_batch', methods=['POST', 'OPTIONS'])
 def predict_batch():
     """Predict risk for multiple students from CSV data"""
@@ -447,102 +850,307 @@ def predict_batch():
         return '', 204
     
     try:
-        if model is None:
+        # Rows (the default, read by batch.html), or the compact columns as JSON or MessagePack
+        try:
+            response_type = response_format.negotiate(request.args.get('format'), request.accept_mimetypes)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 406
+        
+        models = current_models()
+        if models.model is None:
             return jsonify({'error': 'Models not loaded'}), 500
         
-        data = request.get_json()
-        if not data or 'students' not in data:
+        with metrics.stage('json_parse'):
+            data = request.get_json()
+        if not data or ('students' not in data and 'student_ids' not in data):
             return jsonify({'error': 'No student data provided'}), 400
         
-        students_data = data['students']
-        print(f"📥 Batch prediction for {len(students_data)} students")
-        
-        df = pd.DataFrame(students_data)
-        if 'student_id' in df.columns:
-            student_ids = df['student_id'].tolist()
+        missing_ids = None
+        if 'students' in data:
+            students_data = data['students']
+            print(f"📥 Batch prediction for {len(students_data)} students")
+            
+            with metrics.stage('dataframe'):
+                # pandas is imported by the batch paths only, keeping it off startup and /predict
+                import pandas as pd
+                df = pd.DataFrame(students_data)
         else:
-            student_ids = list(range(len(df)))
+            if feature_store is None:
+                return jsonify({'error': 'Feature store not loaded'}), 503
+            print(f"📥 Batch prediction for {len(data['student_ids'])} student IDs")
+            
+            df, missing_ids = lookup_students(data['student_ids'])
+            if df.empty:
+                return jsonify({'error': 'None of the student_ids are in the feature store',
+                                'missing_ids': missing_ids}), 404
+        columns, results = score_students(df, models, response_type=response_type)
+        summary = risk_engine.summarize_batch(columns['riskScore'], columns['isAtRisk'])
+        at_risk = summary['at_risk_count']
+        total = summary['total_students']
         
-        X = preprocess_input(df)
-        predictions = model.predict(X)
-        raw_scores = model.score_samples(X)
+        print(f"✓ Batch complete: {at_risk}/{total} at-risk ({summary['at_risk_percentage']}%)")
         
-        results = []
-        for idx, (pred, raw_score) in enumerate(zip(predictions, raw_scores)):
-            student_data = students_data[idx]
-            risk_score = calculate_risk_score_advanced(raw_score, pred, student_data)
-            is_at_risk = risk_score >= 50
-            
-            risk_factors = analyze_risk_factors(student_data, is_at_risk, risk_score)
-            recommendation = generate_recommendation(is_at_risk, risk_score, risk_factors)
+        with metrics.stage('serialize'):
+            if response_type == response_format.ROWS:
+                body = {
+                    'summary': summary,
+                    'predictions': results,
+                    'modelVersion': models.version
+                }
+            else:
+                body = {
+                    'format': response_format.COLUMNS,
+                    'summary': summary,
+                    'modelVersion': models.version,
+                    **results
+                }
+            if missing_ids is not None:
+                body['missing_ids'] = missing_ids
             
-            results.append({
-                'student_id': student_ids[idx],
-                'isAtRisk': bool(is_at_risk),
-                'riskScore': float(risk_score),
-                'anomalyScore': float(raw_score),
-                'prediction': int(pred),
-                'confidence': 0.85,
-                'riskLevel': 'High' if risk_score > 70 else 'Medium' if risk_score > 40 else 'Low',
-                'numRiskFactors': len(risk_factors),
-                'topRiskFactors': [f['factor'] for f in risk_factors[:3]],
-                'recommendation': recommendation,
-                'avg_score': student_data.get('avg_score', 0),
-                'total_clicks': student_data.get('total_clicks', 0),
-                'num_assessments': student_data.get('num_assessments', 0)
-            })
+            if response_type == response_format.MSGPACK:
+                response = Response(response_format.packb(body), mimetype=response_format.MSGPACK_MIMETYPE)
+            else:
+                response = jsonify(response_format.to_builtin(body) if response_type == response_format.COLUMNS
+                                   else body)
+            response.vary.add('Accept')
+        return response
         
-        total = len(results)
-        at_risk = sum(1 for r in results if r['isAtRisk'])
-        high_risk = sum(1 for r in results if r['riskScore'] > 70)
-        medium_risk = sum(1 for r in results if 40 < r['riskScore'] <= 70)
-        low_risk = sum(1 for r in results if r['riskScore'] <= 40)
+    except Exception as e:
+        print(f"✗ Batch error: {e}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/predict_stream', methods=['POST', 'OPTIONS'])
+def predict_stream():
+    """Score an NDJSON or CSV upload in fixed-size chunks and stream NDJSON results back"""
+    if request.method == 'OPTIONS':
+        return '', 204
+    
+    models = current_models()
+    if models.model is None:
+        return jsonify({'error': 'Models not loaded'}), 500
+    
+    try:
+        chunk_size = int(request.args.get('chunk_size', STREAM_CHUNK_SIZE))
+        if chunk_size < 1:
+            raise ValueError
+    except ValueError:
+        return jsonify({'error': 'chunk_size must be a positive integer'}), 400
+    
+    records = streaming.iter_records(request.stream, request.mimetype)
+    
+    def generate():
+        import pandas as pd
+    
+        # Only one chunk of input, features and results is alive at any time
+        summary = risk_engine.BatchSummary()
+        try:
+            for chunk in streaming.iter_chunks(records, chunk_size):
+                columns, results = score_students(pd.DataFrame(chunk), models, first_index=summary.total)
+                summary.update(columns['riskScore'], columns['isAtRisk'])
+                with metrics.stage('serialize'):
+                    lines = ''.join(json.dumps(result) + '\n' for result in results)
+                yield lines
+        except Exception as e:
+            print(f"✗ Stream error after {summary.total} students: {e}")
+            traceback.print_exc()
+            yield json.dumps({'error': str(e), 'students_scored': summary.total}) + '\n'
+            return
         
-        summary = {
-            'total_students': total,
-            'at_risk_count': at_risk,
-            'at_risk_percentage': round((at_risk / total) * 100, 1),
-            'high_risk_count': high_risk,
-            'medium_risk_count': medium_risk,
-            'low_risk_count': low_risk,
-            'average_risk_score': round(sum(r['riskScore'] for r in results) / total, 1)
-        }
+        summary = summary.as_dict()
+        print(f"✓ Stream complete: {summary['at_risk_count']}/{summary['total_students']} at-risk")
+        yield json.dumps({'summary': summary, 'modelVersion': models.version}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/events', methods=['POST', 'OPTIONS'])
+def ingest_events():
+    """
+    Apply VLE click / assessment events to the students' running aggregates and rescore them
+    Body: one event, a list of events or {"events": [...]} as JSON, or an NDJSON / CSV upload.
+    ?rescore=0 only ingests.
+    """
+    if request.method == 'OPTIONS':
+        return '', 204
+    
+    online = live_features()
+    if online is None:
+        return jsonify({'error': 'Feature store not loaded'}), 503
+    
+    try:
+        if request.is_json:
+            with metrics.stage('json_parse'):
+                data = request.get_json()
+            events = data.get('events', [data]) if isinstance(data, dict) else data
+            if not isinstance(events, list):
+                return jsonify({'error': 'events must be a list'}), 400
+        else:
+            events = streaming.iter_records(request.stream, request.mimetype)
         
-        print(f"✓ Batch complete: {at_risk}/{total} at-risk ({summary['at_risk_percentage']}%)")
+        with metrics.stage('ingest'):
+            result = online.ingest(events)
+        student_ids = result['student_ids']
+        for kind, count in result['accepted'].items():
+            metrics.EVENTS_INGESTED.inc(kind, amount=count)
+        print(f"📥 Ingested {sum(result['accepted'].values())} events for {len(student_ids)} students"
+              f" ({result['rejected']} rejected)")
         
-        return jsonify({
-            'summary': summary,
-            'predictions': results
-        })
+        body = {
+            'accepted': result['accepted'],
+            'rejected': result['rejected'],
+            'errors': result['errors'],
+            'students_updated': len(student_ids)
+        }
+        models = current_models()
+        if request.args.get('rescore', '1') != '0' and student_ids and models.model is not None:
+            df, _ = lookup_students(student_ids)
+            columns, results = score_students(df, models)
+            body['predictions'] = results
+            body['modelVersion'] = models.version
+        with metrics.stage('serialize'):
+            response = jsonify(body)
+        return response
         
     except Exception as e:
-        print(f"✗ Batch error: {e}")
+        print(f"✗ Ingestion error: {e}")
         traceback.print_exc()
         return jsonify({'error': str(e)}), 400
 
+def job_links(job_id):
+    return {'status': f'/jobs/{job_id}', 'results': f'/jobs/{job_id}/results'}
+
+@app.route('/jobs', methods=['POST', 'OPTIONS'])
+def submit_job():
+    """Queue a cohort for background scoring: JSON {"students": [...]}, NDJSON or CSV"""
+    if request.method == 'OPTIONS':
+        return '', 204
+    
+    models = current_models()
+    if models.model is None:
+        return jsonify({'error': 'Models not loaded'}), 500
+    
+    try:
+        if request.mimetype == 'application/json':
+            data = request.get_json()
+            if not data or 'students' not in data:
+                return jsonify({'error': 'No student data provided'}), 400
+            records = data['students']
+        else:
+            records = streaming.iter_records(request.stream, request.mimetype)
+        status = job_manager.create(records, models)
+    except Exception as e:
+        print(f"✗ Job submission error: {e}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 400
+    
+    print(f"📥 Queued job {status['job_id']} for {status['total']} students")
+    return jsonify({**status, 'links': job_links(status['job_id'])}), 202
+
+@app.route('/jobs/<job_id>', methods=['GET', 'DELETE'])
+def job_status(job_id):
+    """Report a job's state and progress, or delete it"""
+    try:
+        if request.method == 'DELETE':
+            job_manager.delete(job_id)
+            return '', 204
+        status = job_manager.status(job_id)
+    except KeyError:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify({**status, 'links': job_links(job_id)})
+
+@app.route('/jobs/<job_id>/results', methods=['GET'])
+def job_results(job_id):
+    """One page of a job's results; follow next_cursor until it is null"""
+    try:
+        limit = int(request.args.get('limit', BATCH_JOB_PAGE_SIZE))
+        if limit < 1:
+            raise ValueError("limit must be a positive integer")
+        records, next_cursor, status = job_manager.results(job_id, request.args.get('cursor'), limit)
+    except KeyError:
+        return jsonify({'error': 'Job not found'}), 404
+    except ValueError as e:
+        return jsonify({'error': f'Invalid page request: {e}'}), 400
+    
+    return jsonify({
+        'job_id': job_id,
+        'state': status['state'],
+        'predictions': records,
+        'next_cursor': next_cursor,
+        'summary': status['summary'],
+        'modelVersion': status['model_version']
+    })
+
 @app.route('/info', methods=['GET', 'OPTIONS'])
 def model_info():
     """Get information about the model"""
     if request.method == 'OPTIONS':
         return '', 204
     
+    models = current_models()
     return jsonify({
         'model_type': 'Isolation Forest',
-        'model_loaded': model is not None,
+        'model_loaded': models.model is not None,
+        'model_version': models.version,
+        'model_loaded_at': models.loaded_at,
+        'inference_dtype': models.dtype.name,
+        'float32_drift': models.float32_drift,
+        'reload': dict(reload_status),
+        'startup': startup_report,
+        'prediction_cache': prediction_cache.stats(),
+        'batch_jobs': job_manager.stats(),
+        'sharded_scoring': sharded_scorer.stats(),
+        'profiling': request_profiler.stats(),
+        'request_coalescer': request_coalescer.stats() if request_coalescer is not None else None,
+        'request_log': request_recorder.stats() if request_recorder is not None else None,
+        'feature_store': feature_store.stats() if feature_store is not None else None,
+        'online_features': online_features.stats() if online_features is not None else None,
         'version': '1.3',
         'description': 'Hybrid approach using ML anomaly detection + rule-based risk assessment'
     })
 
-# Load models on startup
-print("\n" + "="*60)
-print("🚀 Starting Student Anomaly Detection API v1.3")
-print("="*60)
-models_loaded = load_models()
+metrics.registry.register(metrics.Gauge(
+    'student_api_model_info', 'Model version currently served (value is always 1)', ['version'],
+    callback=lambda: {(current_models().version or 'none',): 1}))
+metrics.registry.register(metrics.Gauge(
+    'student_api_rows_per_second', 'Rows scored per second over the last minute',
+    callback=lambda: {(): round(metrics.rows_throughput.rate(), 3)}))
+metrics.registry.register(metrics.Gauge(
+    'student_api_prediction_cache_entries', 'Entries in the prediction cache',
+    callback=lambda: {(): len(prediction_cache)}))
+metrics.registry.register(metrics.Gauge(
+    'student_api_prediction_cache_hit_rate', 'Prediction cache hit rate since start',
+    callback=lambda: {(): prediction_cache.stats()['hit_rate']}))
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus text exposition of the API's counters, histograms and gauges"""
+    return Response(metrics.registry.render(), mimetype=None, content_type=metrics.CONTENT_TYPE)
+
+@app.route('/admin/reload', methods=['GET', 'POST'])
+def admin_reload():
+    """Start a background model reload (POST) or report the last one (GET)"""
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden'}), 403
+    
+    if request.method == 'POST':
+        started = reload_models()
+        return jsonify({
+            'started': started,
+            'active_version': current_models().version,
+            'reload': dict(reload_status)
+        }), 202 if started else 409
+    
+    return jsonify({'active_version': current_models().version, 'reload': dict(reload_status)})
+
+startup_report['import_s'] = round(time.perf_counter() - IMPORT_STARTED, 4)
 
-if not models_loaded:
-    print("\n⚠️  WARNING: Models not loaded!")
+# Load models on startup (deferred to create_app() in lazy mode)
+if not APP_LAZY_INIT:
+    init_app()
 
 if __name__ == '__main__':
+    init_app()
     print("\n🌐 Server starting on http://0.0.0.0:5000")
     print("📊 Visit /diagnose to test model predictions")
     print("="*60 + "\n")
@@ -0,0 +1,225 @@
+"""
+Batch Jobs
+Asynchronous cohort scoring: uploads are spooled to disk, scored in a background process pool,
+and the results are read back page by page with a cursor
+"""
+
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import risk_engine
+import streaming
+
+INPUT_FILE = 'input.ndjson'
+RESULTS_FILE = 'results.ndjson'
+STATUS_FILE = 'status.json'
+TERMINAL_STATES = ('succeeded', 'failed')
+
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+def _write_json(path, data):
+    """Replace a JSON file atomically, so readers in other processes never see half of it"""
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def run_job(job_dir, models, chunk_size):
+    """
+    Score a spooled job in a pool process, appending results and updating status.json per chunk
+    status['processed'] only advances after the chunk's results are flushed, so pages up to
+    that row can be served while the job is still running.
+    """
+    status_path = os.path.join(job_dir, STATUS_FILE)
+    status = _read_json(status_path)
+    status.update(state='running', started_at=time.time())
+    _write_json(status_path, status)
+
+    # Imported here rather than at module level: the API imports this module at startup
+    import pandas as pd
+
+    summary = risk_engine.BatchSummary()
+    try:
+        with open(os.path.join(job_dir, INPUT_FILE), 'rb') as source, \
+                open(os.path.join(job_dir, RESULTS_FILE), 'w') as out:
+            for chunk in streaming.iter_chunks(streaming.iter_ndjson_records(source), chunk_size):
+                columns, results = risk_engine.score_students(pd.DataFrame(chunk), models, first_index=summary.total)
+                out.write(''.join(json.dumps(result) + '\n' for result in results))
+                out.flush()
+                summary.update(columns['riskScore'], columns['isAtRisk'])
+                status['processed'] = summary.total
+                _write_json(status_path, status)
+    except Exception as e:
+        status.update(state='failed', error=str(e), finished_at=time.time())
+        _write_json(status_path, status)
+        return status
+
+    status.update(state='succeeded', summary=summary.as_dict(), finished_at=time.time())
+    _write_json(status_path, status)
+    return status
+
+
+class JobManager:
+    """
+    Creates jobs under `root` and scores them in a pool of `max_workers` processes
+    Everything about a job lives in its directory, so any API worker process can report on
+    any job. Finished jobs are deleted `retention` seconds after they complete.
+    """
+
+    def __init__(self, root, max_workers=2, retention=86400.0, chunk_size=1000):
+        self.root = root
+        self.max_workers = max_workers
+        self.retention = retention
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+
+    def _executor(self):
+        """Start the pool on first use (and again in a forked server worker)"""
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                # spawn: pool processes never inherit locks or threads from a multi-threaded server
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+                self._pid = os.getpid()
+            return self._pool
+
+    def job_dir(self, job_id):
+        if not JOB_ID_PATTERN.match(job_id or ''):
+            raise KeyError(job_id)
+        return os.path.join(self.root, job_id)
+
+    def create(self, records, models):
+        """Spool records to disk, queue the job and return its initial status"""
+        self.purge_expired()
+
+        job_id = uuid.uuid4().hex
+        job_dir = self.job_dir(job_id)
+        os.makedirs(job_dir)
+
+        total = 0
+        try:
+            with open(os.path.join(job_dir, INPUT_FILE), 'w') as f:
+                for record in records:
+                    f.write(json.dumps(record) + '\n')
+                    total += 1
+        except Exception:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+
+        status = {
+            'job_id': job_id,
+            'state': 'queued',
+            'total': total,
+            'processed': 0,
+            'model_version': models.version,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'error': None,
+            'summary': None
+        }
+        _write_json(os.path.join(job_dir, STATUS_FILE), status)
+
+        future = self._executor().submit(run_job, job_dir, models, self.chunk_size)
+        future.add_done_callback(lambda f: self._check_failed(job_dir, f))
+        return status
+
+    def _check_failed(self, job_dir, future):
+        """Record a job whose pool process died (or could not be started) as failed"""
+        error = future.exception()
+        if error is None:
+            return
+        status_path = os.path.join(job_dir, STATUS_FILE)
+        try:
+            status = _read_json(status_path)
+        except OSError:
+            return
+        if status['state'] not in TERMINAL_STATES:
+            status.update(state='failed', error=f"Worker error: {error}", finished_at=time.time())
+            _write_json(status_path, status)
+
+    def status(self, job_id):
+        """Current status dict; KeyError if the job does not exist (or has expired)"""
+        try:
+            return _read_json(os.path.join(self.job_dir(job_id), STATUS_FILE))
+        except FileNotFoundError:
+            raise KeyError(job_id)
+
+    def results(self, job_id, cursor=None, limit=500):
+        """
+        One page of results: (records, next_cursor, status)
+        The cursor is the byte offset of the next unread result. next_cursor is None once every
+        result of a finished job has been returned; while the job runs it may return an empty
+        page with the same cursor, to be polled again.
+        """
+        status = self.status(job_id)
+        offset = int(cursor or 0)
+        if offset < 0:
+            raise ValueError("cursor must not be negative")
+
+        records = []
+        at_end = True
+        path = os.path.join(self.job_dir(job_id), RESULTS_FILE)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                while True:
+                    line = f.readline()
+                    if not line.endswith(b'\n'):
+                        # End of file, or a line the pool process is still writing
+                        at_end = not line
+                        break
+                    if len(records) == limit:
+                        at_end = False
+                        break
+                    records.append(json.loads(line))
+                    offset += len(line)
+
+        done = status['state'] in TERMINAL_STATES and at_end
+        return records, None if done else str(offset), status
+
+    def delete(self, job_id):
+        job_dir = self.job_dir(job_id)
+        if not os.path.exists(job_dir):
+            raise KeyError(job_id)
+        shutil.rmtree(job_dir, ignore_errors=True)
+
+    def purge_expired(self, now=None):
+        """Delete finished jobs older than the retention period; returns how many were removed"""
+        now = time.time() if now is None else now
+        removed = 0
+        if not os.path.isdir(self.root):
+            return removed
+        for job_id in os.listdir(self.root):
+            try:
+                status = self.status(job_id)
+            except (KeyError, ValueError, OSError):
+                continue
+            finished_at = status.get('finished_at')
+            if finished_at is not None and now - finished_at > self.retention:
+                shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+                removed += 1
+        return removed
+
+    def stats(self):
+        return {
+            'workers': self.max_workers,
+            'retention_s': self.retention,
+            'jobs_on_disk': len(os.listdir(self.root)) if os.path.isdir(self.root) else 0
+        }
@@ -0,0 +1,59 @@
+"""
+Benchmark: flattened forest engine vs sklearn predict + score_samples
+Usage: python benchmarks/bench_forest_engine.py [--sizes 1 1000 100000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.ensemble import IsolationForest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from forest_engine import FlatForest
+from preprocessing import FEATURE_COLS
+
+
+def best_time(fn, repeat):
+    """Best wall-clock time of `repeat` calls"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 1000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    n_features = len(FEATURE_COLS)
+
+    # Same settings as train_model.py
+    model = IsolationForest(n_estimators=200, max_samples=256, contamination=0.3, random_state=42)
+    model.fit(rng.normal(size=(20000, n_features)))
+    forest = FlatForest.from_isolation_forest(model)
+
+    print("=" * 60)
+    print(f"{'batch size':>12} {'sklearn (ms)':>14} {'flat (ms)':>12} {'speedup':>9}")
+    print("=" * 60)
+    for size in args.sizes:
+        X = rng.normal(size=(size, n_features))
+        repeat = args.repeat if size < 100000 else 1
+
+        sklearn_time = best_time(lambda: (model.predict(X), model.score_samples(X)), repeat)
+        flat_time = best_time(lambda: forest.score(X), repeat)
+
+        print(f"{size:>12} {sklearn_time * 1e3:>14.2f} {flat_time * 1e3:>12.2f} {sklearn_time / flat_time:>8.1f}x")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark: single-process scoring vs sharded scoring across a process pool
+Usage: python benchmarks/bench_sharded_scoring.py [--sizes 10000 100000 1000000] [--workers N]
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_forest_engine import best_time
+from model_store import ModelSet
+from preprocessing import FEATURE_COLS
+from sharded_scoring import ShardedScorer, available_cpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--workers', type=int, default=0, help='pool size (0 = one per CPU)')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    n_features = len(FEATURE_COLS)
+
+    # Same settings as train_model.py
+    X_train = rng.normal(size=(20000, n_features))
+    scaler = StandardScaler().fit(X_train)
+    model = IsolationForest(n_estimators=200, max_samples=256, contamination=0.3, random_state=42)
+    model.fit(scaler.transform(X_train))
+    models = ModelSet(model, scaler, {})
+
+    scorer = ShardedScorer(workers=args.workers or available_cpus(), min_rows=1)
+    print(f"CPUs available: {available_cpus()}, pool size: {scorer.workers}")
+    if scorer.workers > 1:
+        scorer.score(models, X_train[:1000])  # start the pool and publish the forest
+
+    print("=" * 64)
+    print(f"{'rows':>10} {'single (rows/s)':>18} {'sharded (rows/s)':>18} {'speedup':>9}")
+    print("=" * 64)
+    for size in args.sizes:
+        X = rng.normal(size=(size, n_features))
+        repeat = args.repeat if size < 1000000 else 1
+
+        single_time = best_time(lambda: models.score(models.scale(X)), repeat)
+        sharded_time = best_time(lambda: scorer.score(models, models.scale(X)), repeat)
+
+        print(f"{size:>10} {size / single_time:>18,.0f} {size / sharded_time:>18,.0f} "
+              f"{single_time / sharded_time:>8.2f}x")
+    print("=" * 64)
+    scorer.close()
+
+
+if __name__ == '__main__':
+    main()
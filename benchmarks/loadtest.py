@@ -0,0 +1,343 @@
+"""
+Load tester: replays captured request logs (or synthetic traffic) against a running API
+Closed loop (--concurrency) keeps N requests in flight; open loop (--rate) sends requests at a fixed
+Poisson arrival rate whether or not earlier ones have finished, so queueing shows up as latency.
+Several values run as steps and the first saturated step is reported.
+
+Usage:
+  python benchmarks/loadtest.py --concurrency 1 2 4 8 16
+  python benchmarks/loadtest.py --rate 50 100 200 400 --mix predict=80,predict_batch=15,info=5
+  python benchmarks/loadtest.py --log requests.log.jsonl --replay-timing --speed 4
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import generate_cohort
+from traffic import read_log
+
+ENDPOINTS = {
+    'predict': ('POST', '/predict'),
+    'predict_batch': ('POST', '/predict_batch'),
+    'info': ('GET', '/info'),
+    'health': ('GET', '/'),
+}
+DEFAULT_MIX = 'predict=80,predict_batch=15,info=5'
+
+
+def parse_mix(text):
+    """'predict=80,info=20' -> {'predict': 0.8, 'info': 0.2}"""
+    weights = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint in mix: {name} (choose from {', '.join(ENDPOINTS)})")
+        weights[name] = float(weight or 1)
+    total = sum(weights.values())
+    return {name: weight / total for name, weight in weights.items()}
+
+
+def synthetic_requests(n, mix, batch_size=100, seed=0):
+    """n request entries drawn from the endpoint mix, with bodies from the synthetic cohort"""
+    rng = np.random.default_rng(seed)
+    students = json.loads(generate_cohort(max(1000, batch_size), seed=seed).to_json(orient='records'))
+    names = list(mix)
+    entries = []
+    for name in rng.choice(names, n, p=[mix[name] for name in names]):
+        method, path = ENDPOINTS[name]
+        body = None
+        if name == 'predict':
+            body = json.dumps(students[rng.integers(len(students))])
+        elif name == 'predict_batch':
+            start = rng.integers(len(students) - batch_size + 1)
+            body = json.dumps({'students': students[start:start + batch_size]})
+        entries.append({'method': method, 'path': path, 'content_type': 'application/json' if body else None,
+                        'body': body})
+    return entries
+
+
+def endpoint_of(entry):
+    return entry['path'].split('?', 1)[0]
+
+
+class Client:
+    """One keep-alive HTTP connection, reopened after any error"""
+
+    def __init__(self, base_url, timeout=30.0):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._conn = None
+
+    def send(self, entry):
+        """Send one logged request; returns (status, error)"""
+        body = entry.get('body')
+        body = body.encode('utf-8') if body is not None else None
+        headers = {'Content-Type': entry['content_type']} if entry.get('content_type') else {}
+        try:
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._conn.request(entry.get('method', 'GET'), entry['path'], body=body, headers=headers)
+            response = self._conn.getresponse()
+            response.read()
+            if response.getheader('Connection', '').lower() == 'close':
+                self.close()
+            return response.status, None
+        except (OSError, http.client.HTTPException) as e:
+            self.close()
+            return None, f"{type(e).__name__}: {e}"
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def run_closed(base_url, entries, concurrency, duration, timeout=30.0):
+    """`concurrency` workers each send the next request as soon as the previous one finishes"""
+    results = []
+    counter = itertools.count()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        client = Client(base_url, timeout)
+        local = []
+        while time.perf_counter() < deadline:
+            entry = entries[next(counter) % len(entries)]
+            started = time.perf_counter()
+            status, error = client.send(entry)
+            local.append((endpoint_of(entry), started, time.perf_counter(), status, error))
+        client.close()
+        results.extend(local)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
+
+
+def poisson_schedule(rate, duration, seed=0):
+    """Arrival offsets (seconds) of a Poisson process with `rate` requests per second"""
+    rng = np.random.default_rng(seed)
+    gaps = rng.exponential(1.0 / rate, int(rate * duration * 1.5) + 10)
+    offsets = np.cumsum(gaps)
+    return offsets[offsets < duration]
+
+
+def log_schedule(entries, speed=1.0):
+    """Arrival offsets taken from the log's timestamps, compressed by `speed`"""
+    times = np.array([entry.get('t', 0.0) for entry in entries], dtype=float)
+    return (times - times.min()) / speed
+
+
+def run_open(base_url, entries, offsets, max_in_flight=64, timeout=30.0, grace=10.0):
+    """
+    Send entries[i % len] at offsets[i] regardless of earlier responses
+    Latency is measured from the scheduled send time, so time spent waiting for a free connection
+    counts (no coordinated omission). Requests still queued `grace` seconds after the last arrival
+    are abandoned and reported as errors.
+    """
+    results = []
+    pending = queue.Queue()
+    started = time.perf_counter()
+    give_up = started + (offsets[-1] if len(offsets) else 0) + grace
+
+    def worker():
+        client = Client(base_url, timeout)
+        local = []
+        while True:
+            item = pending.get()
+            if item is None:
+                break
+            entry, scheduled = item
+            if time.perf_counter() > give_up:
+                local.append((endpoint_of(entry), scheduled, time.perf_counter(), None, 'abandoned'))
+                continue
+            status, error = client.send(entry)
+            local.append((endpoint_of(entry), scheduled, time.perf_counter(), status, error))
+        client.close()
+        results.extend(local)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max_in_flight)]
+    for thread in threads:
+        thread.start()
+    for i, offset in enumerate(offsets):
+        scheduled = started + offset
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        pending.put((entries[i % len(entries)], scheduled))
+    for _ in threads:
+        pending.put(None)
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
+
+
+def latency_stats(latencies):
+    if not len(latencies):
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'max_ms': round(float(np.max(latencies)) * 1000, 3)
+    }
+
+
+def summarize(results, elapsed):
+    """Totals and per-endpoint latency, throughput and error rate for one step"""
+    def stats(rows):
+        ok = [finished - started for _, started, finished, status, error in rows
+              if error is None and status is not None and status < 400]
+        errors = len(rows) - len(ok)
+        summary = {
+            'requests': len(rows),
+            'errors': errors,
+            'error_rate': round(errors / len(rows), 4) if rows else 0.0,
+            'throughput_rps': round(len(ok) / elapsed, 2) if elapsed > 0 else 0.0
+        }
+        summary.update(latency_stats(np.array(ok)))
+        return summary
+
+    summary = stats(results)
+    by_endpoint = {}
+    for row in results:
+        by_endpoint.setdefault(row[0], []).append(row)
+    summary['by_endpoint'] = {endpoint: stats(rows) for endpoint, rows in sorted(by_endpoint.items())}
+    summary['elapsed_s'] = round(elapsed, 3)
+    return summary
+
+
+def is_saturated(step, previous, slo_ms=None, max_error_rate=0.01, min_gain=0.1):
+    """
+    Why a step counts as saturated, or None
+    Open loop: the server no longer keeps up with the offered rate. Closed loop: more concurrency
+    no longer buys min_gain more throughput. Either way: too many errors or p99 over the SLO.
+    """
+    if step['error_rate'] > max_error_rate:
+        return f"error rate {step['error_rate']:.1%}"
+    if slo_ms is not None and step['p99_ms'] is not None and step['p99_ms'] > slo_ms:
+        return f"p99 {step['p99_ms']:.1f} ms over the {slo_ms:g} ms SLO"
+    if step.get('offered_rps'):
+        if step['throughput_rps'] < 0.9 * step['offered_rps']:
+            return f"served {step['throughput_rps']:.1f} of {step['offered_rps']:.1f} req/s offered"
+    elif previous is not None and step['throughput_rps'] < previous['throughput_rps'] * (1 + min_gain):
+        change = step['throughput_rps'] / previous['throughput_rps'] - 1
+        return f"throughput {step['throughput_rps']:.1f} req/s, {change:+.0%} on the previous step"
+    return None
+
+
+def print_step(step):
+    latency = ' '.join(f"{step[key]:>8.1f}" if step[key] is not None else f"{'-':>8}"
+                       for key in ('p50_ms', 'p95_ms', 'p99_ms'))
+    print(f"{step['label']:>14} {step['throughput_rps']:>10.1f} {latency} {step['error_rate']:>7.1%}"
+          f"{'  ⚠️ ' + step['saturated'] if step['saturated'] else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--log', help='request log to replay (JSONL, as written with REQUEST_LOG_PATH)')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='synthetic endpoint mix, e.g. predict=80,info=20')
+    parser.add_argument('--batch-size', type=int, default=100, help='students per synthetic /predict_batch')
+    parser.add_argument('--synthetic-requests', type=int, default=2000, help='distinct synthetic requests')
+    parser.add_argument('--concurrency', type=int, nargs='+', help='closed-loop steps: requests in flight')
+    parser.add_argument('--rate', type=float, nargs='+', help='open-loop steps: arrivals per second')
+    parser.add_argument('--replay-timing', action='store_true', help="replay at the log's own timing")
+    parser.add_argument('--speed', type=float, default=1.0, help='time compression for --replay-timing')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per step')
+    parser.add_argument('--max-in-flight', type=int, default=64, help='open-loop connection limit')
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--warmup', type=int, default=20, help='sequential requests before measuring')
+    parser.add_argument('--slo-ms', type=float, help='p99 latency above this counts as saturated')
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--output', help='write every step as JSON')
+    args = parser.parse_args()
+
+    if args.log:
+        entries = read_log(args.log)
+        if not entries:
+            sys.exit(f"✗ No requests in {args.log}")
+        print(f"📥 Replaying {len(entries)} logged requests from {args.log}")
+    else:
+        entries = synthetic_requests(args.synthetic_requests, parse_mix(args.mix), args.batch_size)
+        print(f"📥 {len(entries)} synthetic requests, mix {args.mix}")
+
+    warm = Client(args.url, args.timeout)
+    for entry in entries[:args.warmup]:
+        status, error = warm.send(entry)
+        if error is not None:
+            sys.exit(f"✗ Cannot reach {args.url}: {error}")
+    warm.close()
+
+    if args.replay_timing:
+        plan = [('replay', f"x{args.speed:g}", None)]
+    elif args.rate:
+        plan = [('open', rate, rate) for rate in args.rate]
+    else:
+        plan = [('closed', c, None) for c in (args.concurrency or [1, 2, 4, 8])]
+
+    print("=" * 72)
+    print(f"{'step':>14} {'req/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    print("=" * 72)
+    steps, previous, saturation = [], None, None
+    for mode, value, offered in plan:
+        if mode == 'closed':
+            results, elapsed = run_closed(args.url, entries, value, args.duration, args.timeout)
+            label = f"c={value}"
+        elif mode == 'open':
+            offsets = poisson_schedule(value, args.duration, seed=len(steps))
+            results, elapsed = run_open(args.url, entries, offsets, args.max_in_flight, args.timeout)
+            label = f"{value:g}/s"
+        else:
+            offsets = log_schedule(entries, args.speed)
+            offered = len(offsets) / max(offsets[-1], 1e-9)
+            results, elapsed = run_open(args.url, entries, offsets, args.max_in_flight, args.timeout)
+            label = value
+
+        step = summarize(results, elapsed)
+        step.update(mode=mode, label=label, offered_rps=offered)
+        step['saturated'] = is_saturated(step, previous if mode == 'closed' else None,
+                                         args.slo_ms, args.max_error_rate)
+        print_step(step)
+        steps.append(step)
+        if step['saturated'] and saturation is None:
+            saturation = step
+        previous = step
+    print("=" * 72)
+
+    sustainable = [step for step in steps if not step['saturated']]
+    if saturation is not None:
+        print(f"⚠️ Saturated at {saturation['label']}: {saturation['saturated']}")
+    if sustainable:
+        best = max(sustainable, key=lambda step: step['throughput_rps'])
+        print(f"✓ Highest unsaturated step: {best['label']} at {best['throughput_rps']:.1f} req/s, "
+              f"p99 {best['p99_ms']} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'url': args.url, 'source': args.log or args.mix, 'steps': steps}, f, indent=2)
+        print(f"✓ Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
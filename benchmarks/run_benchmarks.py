@@ -0,0 +1,247 @@
+"""
+Benchmark suite with regression budgets
+Measures /predict latency percentiles, /predict_batch throughput and train_model.py training time on
+synthetic data, writes the results as JSON and optionally compares them with a saved baseline.
+
+Usage:
+  python benchmarks/run_benchmarks.py --output benchmarks/baseline.json
+  python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json --threshold 0.2
+  python benchmarks/run_benchmarks.py --suites batch --batch-sizes 1 100 10000 1000000
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from importlib.util import find_spec
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from synthetic import generate_cohort, write_oulad
+
+SUITES = ('predict', 'batch', 'train')
+
+
+def metric(value, unit, better):
+    return {'value': round(float(value), 6), 'unit': unit, 'better': better}
+
+
+def fit_benchmark_models(df):
+    """Encoders, scaler and forest fitted on the cohort with train_model.py's forest settings"""
+    from sklearn.ensemble import IsolationForest
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+    from model_store import ModelSet
+    from preprocessing import CATEGORICAL_COLS, FEATURE_COLS
+
+    encoded = df.copy()
+    label_encoders = {}
+    for col in CATEGORICAL_COLS:
+        le = LabelEncoder()
+        encoded[col + '_encoded'] = le.fit_transform(df[col].astype(str))
+        label_encoders[col] = le
+    scaler = StandardScaler().fit(encoded[FEATURE_COLS])
+    model = IsolationForest(n_estimators=200, max_samples=256, contamination=0.3, random_state=42)
+    model.fit(scaler.transform(encoded[FEATURE_COLS]))
+    return ModelSet(model, scaler, label_encoders, version='benchmark')
+
+
+def load_app(models):
+    """Import the API without touching models/ and serve the benchmark models from it"""
+    os.environ['APP_LAZY_INIT'] = '1'
+    # Every request must reach the model; a warm cache would only measure dictionary lookups
+    os.environ['PREDICTION_CACHE_SIZE'] = '0'
+    os.environ.setdefault('SHARD_WORKERS', '1')
+    import app as app_module
+
+    app_module.activate_models(models)
+    app_module.app.logger.disabled = True
+    return app_module
+
+
+def quiet(fn):
+    """Run fn with stdout discarded (the API prints a line per prediction)"""
+    stdout = sys.stdout
+    with open(os.devnull, 'w') as sink:
+        sys.stdout = sink
+        try:
+            return fn()
+        finally:
+            sys.stdout = stdout
+
+
+def bench_predict(client, students, requests, warmup=50):
+    """Latency percentiles of single-student /predict calls"""
+    bodies = [json.dumps(student) for student in students]
+
+    def run(n):
+        latencies = []
+        for i in range(n):
+            started = time.perf_counter()
+            response = client.post('/predict', data=bodies[i % len(bodies)], content_type='application/json')
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise RuntimeError(f"/predict returned {response.status_code}: {response.get_data(as_text=True)}")
+        return latencies
+
+    quiet(lambda: run(warmup))
+    latencies = np.array(quiet(lambda: run(requests))) * 1000
+    return {
+        'predict_p50_ms': metric(np.percentile(latencies, 50), 'ms', 'lower'),
+        'predict_p90_ms': metric(np.percentile(latencies, 90), 'ms', 'lower'),
+        'predict_p99_ms': metric(np.percentile(latencies, 99), 'ms', 'lower'),
+        'predict_mean_ms': metric(latencies.mean(), 'ms', 'lower'),
+    }
+
+
+def bench_batch(client, cohort, sizes, repeat):
+    """Rows per second through /predict_batch, end to end (JSON in, scoring, JSON out)"""
+    results = {}
+    for size in sizes:
+        df = cohort.iloc[:size] if size <= len(cohort) else generate_cohort(size, seed=size)
+        body = '{"students": ' + df.to_json(orient='records') + '}'
+        times = []
+        for _ in range(repeat if size < 100000 else 1):
+            started = time.perf_counter()
+            response = quiet(lambda: client.post('/predict_batch', data=body, content_type='application/json'))
+            times.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise RuntimeError(f"/predict_batch returned {response.status_code}")
+        best = min(times)
+        print(f"   {size:>9} rows: {best * 1000:10.1f} ms  {size / best:12,.0f} rows/s")
+        results[f'predict_batch_{size}_rows_per_s'] = metric(size / best, 'rows/s', 'higher')
+    return results
+
+
+def bench_train(n_students, vle_rows_per_student):
+    """Wall time of train_model.py on synthetic OULAD CSVs, run in a scratch directory"""
+    if find_spec('wandb') is None:
+        print("⚠️ wandb is not installed; skipping the training benchmark")
+        return {}
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        rows = write_oulad(os.path.join(workdir, 'data'), n_students, vle_rows_per_student=vle_rows_per_student)
+        print(f"   data: {', '.join(f'{name} {count:,}' for name, count in rows.items())}")
+        env = dict(os.environ, WANDB_MODE='disabled', WANDB_SILENT='true')
+        started = time.perf_counter()
+        completed = subprocess.run([sys.executable, os.path.join(ROOT, 'train_model.py')], cwd=workdir, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        elapsed = time.perf_counter() - started
+        if completed.returncode != 0:
+            raise RuntimeError(f"train_model.py failed:\n{completed.stderr[-2000:]}")
+    print(f"   {n_students:,} students: {elapsed:.2f} s")
+    results[f'train_{n_students}_students_s'] = metric(elapsed, 's', 'lower')
+    return results
+
+
+def compare(current, baseline, threshold=0.2, budgets=None):
+    """
+    Compare metrics with a baseline; returns rows of (name, baseline, current, change, regressed)
+    change is the relative difference in the "worse" direction, so a positive change is a slowdown
+    whichever way the metric is measured. A metric regresses when change exceeds its budget (from
+    `budgets`, else `threshold`). Metrics missing from either side are not compared.
+    """
+    budgets = budgets or {}
+    rows = []
+    for name in sorted(set(current) & set(baseline)):
+        before, after = baseline[name]['value'], current[name]['value']
+        if before == 0:
+            continue
+        if current[name]['better'] == 'higher':
+            change = (before - after) / before
+        else:
+            change = (after - before) / before
+        rows.append((name, before, after, change, change > budgets.get(name, threshold)))
+    return rows
+
+
+def print_comparison(rows):
+    print("=" * 78)
+    print(f"{'metric':<36} {'baseline':>12} {'current':>12} {'worse by':>10}")
+    print("=" * 78)
+    for name, before, after, change, regressed in rows:
+        flag = '  ✗ REGRESSION' if regressed else ''
+        print(f"{name:<36} {before:>12.3f} {after:>12.3f} {change:>9.1%}{flag}")
+    print("=" * 78)
+
+
+def parse_budgets(values):
+    budgets = {}
+    for value in values:
+        name, _, fraction = value.partition('=')
+        budgets[name] = float(fraction)
+    return budgets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--suites', nargs='+', choices=SUITES, default=list(SUITES))
+    parser.add_argument('--requests', type=int, default=2000, help='/predict calls for the latency percentiles')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 100, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--train-students', type=int, default=20000)
+    parser.add_argument('--vle-rows-per-student', type=int, default=40)
+    parser.add_argument('--output', help='write the results as JSON (e.g. a new baseline)')
+    parser.add_argument('--baseline', help='compare against this results file; exit 1 on a regression')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown as a fraction (0.2 = 20%%)')
+    parser.add_argument('--budget', action='append', default=[], metavar='METRIC=FRACTION',
+                        help='per-metric threshold, e.g. predict_p99_ms=0.5')
+    args = parser.parse_args()
+
+    results = {}
+    if 'predict' in args.suites or 'batch' in args.suites:
+        cohort = generate_cohort(max([2000] + [s for s in args.batch_sizes if s <= 100000]), seed=0)
+        print("🔬 Fitting benchmark model...")
+        app_module = load_app(fit_benchmark_models(cohort.iloc[:20000]))
+        client = app_module.app.test_client()
+
+        if 'predict' in args.suites:
+            print(f"⏱️ /predict latency ({args.requests} requests)")
+            students = json.loads(cohort.iloc[:1000].to_json(orient='records'))
+            results.update(bench_predict(client, students, args.requests))
+            for name in ('predict_p50_ms', 'predict_p90_ms', 'predict_p99_ms'):
+                print(f"   {name}: {results[name]['value']:.3f} ms")
+        if 'batch' in args.suites:
+            print("⏱️ /predict_batch throughput")
+            results.update(bench_batch(client, cohort, args.batch_sizes, args.repeat))
+
+    if 'train' in args.suites:
+        print("⏱️ train_model.py on synthetic OULAD data")
+        results.update(bench_train(args.train_students, args.vle_rows_per_student))
+
+    report = {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'suites': args.suites,
+        },
+        'metrics': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['metrics']
+        rows = compare(results, baseline, args.threshold, parse_budgets(args.budget))
+        print_comparison(rows)
+        regressions = [row[0] for row in rows if row[4]]
+        if regressions:
+            print(f"✗ {len(regressions)} metric(s) over budget: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"✓ No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
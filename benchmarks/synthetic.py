@@ -0,0 +1,146 @@
+"""
+Synthetic data for benchmarks
+- generate_cohort(): API-ready students with the 28 serving columns (plus student_id)
+- write_oulad(): OULAD-shaped raw CSVs (studentInfo, studentAssessment, studentVle,
+  studentRegistration) that train_model.py can train on
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+CODE_MODULES = ['AAA', 'BBB', 'CCC', 'DDD', 'EEE', 'FFF', 'GGG']
+CODE_PRESENTATIONS = ['2013B', '2013J', '2014B', '2014J']
+GENDERS = ['M', 'F']
+REGIONS = ['East Anglian Region', 'Scotland', 'North Western Region', 'South East Region',
+           'West Midlands Region', 'Wales', 'North Region', 'South Region', 'Ireland',
+           'South West Region', 'East Midlands Region', 'Yorkshire Region', 'London Region']
+EDUCATION = ['HE Qualification', 'A Level or Equivalent', 'Lower Than A Level',
+             'Post Graduate Qualification', 'No Formal quals']
+EDUCATION_WEIGHTS = [0.15, 0.43, 0.40, 0.01, 0.01]
+IMD_BANDS = ['0-10%', '10-20', '20-30%', '30-40%', '40-50%', '50-60%', '60-70%', '70-80%', '80-90%', '90-100%']
+AGE_BANDS = ['0-35', '35-55', '55<=']
+AGE_WEIGHTS = [0.70, 0.29, 0.01]
+DISABILITY = ['N', 'Y']
+FINAL_RESULTS_OK = ['Pass', 'Distinction']
+FINAL_RESULTS_AT_RISK = ['Fail', 'Withdrawn']
+
+
+def _categoricals(rng, n):
+    return {
+        'code_module': rng.choice(CODE_MODULES, n),
+        'code_presentation': rng.choice(CODE_PRESENTATIONS, n),
+        'gender': rng.choice(GENDERS, n),
+        'region': rng.choice(REGIONS, n),
+        'highest_education': rng.choice(EDUCATION, n, p=EDUCATION_WEIGHTS),
+        'imd_band': rng.choice(IMD_BANDS, n),
+        'age_band': rng.choice(AGE_BANDS, n, p=AGE_WEIGHTS),
+        'disability': rng.choice(DISABILITY, n, p=[0.9, 0.1]),
+    }
+
+
+def generate_cohort(n, seed=0, at_risk_rate=0.3):
+    """
+    n students with every column /predict and /predict_batch use, shaped like test.csv
+    A latent at-risk group gets lower, more erratic scores, later submissions, fewer clicks and
+    more previous attempts, so the model sees a realistic mix rather than pure noise.
+    """
+    rng = np.random.default_rng(seed)
+    at_risk = rng.random(n) < at_risk_rate
+
+    data = {'student_id': [f'S{i:07d}' for i in range(n)]}
+    data.update(_categoricals(rng, n))
+    data['studied_credits'] = rng.choice([30, 60, 90, 120, 150, 180], n, p=[0.1, 0.5, 0.15, 0.15, 0.05, 0.05])
+    data['num_of_prev_attempts'] = np.where(at_risk, rng.poisson(0.8, n), rng.poisson(0.1, n))
+
+    avg_score = np.clip(np.where(at_risk, rng.normal(48, 15, n), rng.normal(76, 10, n)), 0, 100)
+    std_score = np.abs(np.where(at_risk, rng.normal(18, 6, n), rng.normal(10, 4, n)))
+    min_score = np.clip(avg_score - std_score * rng.uniform(1, 2, n), 0, 100)
+    max_score = np.clip(avg_score + std_score * rng.uniform(0.5, 1.5, n), 0, 100)
+    data['avg_score'] = avg_score.round(1)
+    data['std_score'] = std_score.round(1)
+    data['min_score'] = min_score.round(1)
+    data['max_score'] = max_score.round(1)
+    data['num_assessments'] = np.maximum(1, np.where(at_risk, rng.poisson(4, n), rng.poisson(9, n)))
+    data['avg_submission_date'] = np.where(at_risk, rng.normal(160, 40, n), rng.normal(100, 25, n)).round(1)
+    data['std_submission_date'] = np.abs(rng.normal(25, 10, n)).round(1)
+    data['score_range'] = (max_score - min_score).round(1)
+
+    total_clicks = np.maximum(0, np.where(at_risk, rng.lognormal(5.5, 0.8, n), rng.lognormal(7.0, 0.5, n))).round()
+    num_interactions = np.maximum(1, np.where(at_risk, rng.poisson(8, n), rng.poisson(25, n)))
+    avg_clicks = total_clicks / num_interactions
+    data['total_clicks'] = total_clicks
+    data['avg_clicks'] = avg_clicks.round(1)
+    data['std_clicks'] = (avg_clicks * rng.uniform(0.2, 0.6, n)).round(1)
+    data['max_clicks'] = (avg_clicks * rng.uniform(1.5, 3.0, n)).round()
+    data['num_interactions'] = num_interactions
+
+    first_access = np.where(at_risk, rng.integers(20, 120, n), rng.integers(-20, 20, n))
+    last_access = first_access + np.where(at_risk, rng.integers(10, 120, n), rng.integers(150, 260, n))
+    data['first_access'] = first_access
+    data['last_access'] = last_access
+    data['access_duration'] = last_access - first_access
+    data['avg_registration_date'] = rng.integers(-180, 0, n)
+    data['num_unregistrations'] = (at_risk & (rng.random(n) < 0.4)).astype(int)
+
+    return pd.DataFrame(data)
+
+
+def write_oulad(data_dir, n_students, seed=0, assessments_per_student=8, vle_rows_per_student=40):
+    """Write OULAD-shaped CSVs for n_students into data_dir; returns {file name: rows}"""
+    rng = np.random.default_rng(seed)
+    os.makedirs(data_dir, exist_ok=True)
+    ids = rng.choice(np.arange(10000, 10000 + n_students * 20), n_students, replace=False)
+    at_risk = rng.random(n_students) < 0.45
+
+    info = pd.DataFrame(_categoricals(rng, n_students))
+    info.insert(2, 'id_student', ids)
+    info['num_of_prev_attempts'] = np.where(at_risk, rng.poisson(0.5, n_students), rng.poisson(0.1, n_students))
+    info['studied_credits'] = rng.choice([30, 60, 90, 120], n_students, p=[0.2, 0.5, 0.15, 0.15])
+    info['final_result'] = np.where(at_risk, rng.choice(FINAL_RESULTS_AT_RISK, n_students),
+                                    rng.choice(FINAL_RESULTS_OK, n_students, p=[0.8, 0.2]))
+    # OULAD column order
+    info = info[['code_module', 'code_presentation', 'id_student', 'gender', 'region', 'highest_education',
+                 'imd_band', 'age_band', 'num_of_prev_attempts', 'studied_credits', 'disability', 'final_result']]
+
+    counts = rng.poisson(assessments_per_student, n_students)
+    owner = np.repeat(np.arange(n_students), counts)
+    risky = at_risk[owner]
+    assessments = pd.DataFrame({
+        'id_assessment': rng.integers(1000, 40000, len(owner)),
+        'id_student': ids[owner],
+        'date_submitted': np.where(risky, rng.normal(150, 50, len(owner)), rng.normal(100, 40, len(owner))).round(),
+        'is_banked': (rng.random(len(owner)) < 0.01).astype(int),
+        'score': np.clip(np.where(risky, rng.normal(50, 20, len(owner)), rng.normal(75, 12, len(owner))), 0, 100).round(),
+    })
+
+    counts = rng.poisson(vle_rows_per_student * np.where(at_risk, 0.4, 1.0))
+    owner = np.repeat(np.arange(n_students), counts)
+    vle = pd.DataFrame({
+        'code_module': info['code_module'].to_numpy()[owner],
+        'code_presentation': info['code_presentation'].to_numpy()[owner],
+        'id_student': ids[owner],
+        'id_site': rng.integers(500000, 1000000, len(owner)),
+        'date': rng.integers(-25, 270, len(owner)),
+        'sum_click': np.maximum(1, rng.geometric(0.25, len(owner))),
+    })
+
+    unregistered = at_risk & (rng.random(n_students) < 0.5)
+    registration = pd.DataFrame({
+        'code_module': info['code_module'],
+        'code_presentation': info['code_presentation'],
+        'id_student': ids,
+        'date_registration': rng.integers(-200, 0, n_students),
+        'date_unregistration': np.where(unregistered, rng.integers(0, 200, n_students).astype(float), np.nan),
+    })
+
+    tables = {
+        'studentInfo.csv': info,
+        'studentAssessment.csv': assessments,
+        'studentVle.csv': vle,
+        'studentRegistration.csv': registration,
+    }
+    for name, table in tables.items():
+        table.to_csv(os.path.join(data_dir, name), index=False)
+    return {name: len(table) for name, table in tables.items()}
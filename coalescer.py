@@ -0,0 +1,111 @@
+"""
+Request Coalescer
+Micro-batches concurrent single-student scoring calls into one vectorized model call
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class RequestCoalescer:
+    """
+    Queues single feature rows from concurrent callers and scores them together
+
+    A batch is flushed when it reaches max_batch rows or when `window` seconds have
+    passed since its first row arrived, so the added latency is bounded by the window.
+    """
+
+    def __init__(self, score_fn, window=0.002, max_batch=64):
+        self.score_fn = score_fn
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.rows = 0
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+
+    def _ensure_worker(self):
+        """Start the batching thread on first use (and again in a forked child process)"""
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return self._queue
+        with self._lock:
+            if self._pid != os.getpid() or not self._thread.is_alive():
+                self._queue = queue.Queue()
+                self._thread = threading.Thread(target=self._run, args=(self._queue,),
+                                                name='request-coalescer', daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+        return self._queue
+
+    def submit(self, row, context=None):
+        """
+        Queue one feature row; returns a Future resolving to (prediction, raw_score)
+        Rows are only batched with rows submitted under the same context object (e.g. the
+        model set the caller started with), which is then passed to score_fn(X, context).
+        """
+        future = Future()
+        self._ensure_worker().put((context, np.asarray(row), future))
+        return future
+
+    def score(self, row, context=None):
+        """Blocking form of submit()"""
+        return self.submit(row, context).result()
+
+    def _run(self, pending):
+        held = None
+        while True:
+            first = held if held is not None else pending.get()
+            held = None
+            batch = [first]
+            deadline = time.monotonic() + self.window
+
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = pending.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item[0] is not first[0]:
+                    # Different context: flush this batch and start the next one with it
+                    held = item
+                    break
+                batch.append(item)
+
+            self._score(batch)
+
+    def _score(self, batch):
+        context = batch[0][0]
+        futures = [item[2] for item in batch]
+        try:
+            X = np.vstack([item[1] for item in batch])
+            if context is None:
+                predictions, raw_scores = self.score_fn(X)
+            else:
+                predictions, raw_scores = self.score_fn(X, context)
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.rows += len(batch)
+        for future, prediction, raw_score in zip(futures, predictions, raw_scores):
+            future.set_result((int(prediction), float(raw_score)))
+
+    def stats(self):
+        return {
+            'window_ms': self.window * 1000,
+            'max_batch': self.max_batch,
+            'batches': self.batches,
+            'rows': self.rows,
+            'avg_batch_size': round(self.rows / self.batches, 2) if self.batches else 0.0
+        }
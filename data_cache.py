@@ -0,0 +1,289 @@
+"""
+Training Data Cache
+Typed columnar copies of the raw OULAD CSVs. Each table is parsed once into one raw little-endian
+file per column: numbers in compact dtypes, text dictionary-encoded (integer codes plus a category
+list). Later runs memory-map the columns instead of parsing text.
+
+Layout (one directory per table and source content hash):
+    <cache_dir>/<table>-<hash>/meta.json   format version, source, row count, column dtypes, categories
+    <cache_dir>/<table>-<hash>/<column>.bin
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = 2
+HASH_INDEX = 'hashes.json'
+# OULAD marks missing numbers (e.g. studentAssessment score) with '?'. Categorical columns are kept
+# verbatim: '?' is a real imd_band value, fitted as a class of its own
+NA_VALUES = ['?']
+CATEGORY = 'category'
+
+# OULAD columns in the smallest dtypes that hold their values. Columns that can be missing are float.
+TABLE_SCHEMAS = {
+    'studentInfo.csv': {
+        'code_module': CATEGORY, 'code_presentation': CATEGORY, 'id_student': 'int32',
+        'gender': CATEGORY, 'region': CATEGORY, 'highest_education': CATEGORY, 'imd_band': CATEGORY,
+        'age_band': CATEGORY, 'num_of_prev_attempts': 'int16', 'studied_credits': 'int16',
+        'disability': CATEGORY, 'final_result': CATEGORY,
+    },
+    'studentAssessment.csv': {
+        'id_assessment': 'int32', 'id_student': 'int32', 'date_submitted': 'float32',
+        'is_banked': 'int8', 'score': 'float32',
+    },
+    'studentVle.csv': {
+        'code_module': CATEGORY, 'code_presentation': CATEGORY, 'id_student': 'int32',
+        'id_site': 'int32', 'date': 'float32', 'sum_click': 'float32',
+    },
+    'studentRegistration.csv': {
+        'code_module': CATEGORY, 'code_presentation': CATEGORY, 'id_student': 'int32',
+        'date_registration': 'float32', 'date_unregistration': 'float32',
+    },
+}
+
+BUILD_CHUNK_ROWS = 1000000
+
+
+def na_values(schema):
+    """read_csv na_values for a table: NA_VALUES in its numeric columns only"""
+    return {name: NA_VALUES for name, kind in (schema or {}).items() if kind != CATEGORY}
+
+
+def csv_na_values(csv_path):
+    return na_values(TABLE_SCHEMAS.get(os.path.basename(str(csv_path))))
+
+
+class CacheError(ValueError):
+    """A cached table is incomplete or from an unsupported format version"""
+
+
+def file_hash(path, block_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CachedTable:
+    """A cached table: memory-mapped numeric columns and categorical codes"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        if self.meta.get('format_version') != FORMAT_VERSION:
+            raise CacheError(f"Unsupported cache format in {path}")
+        self.rows = self.meta['rows']
+        self.columns = [col['name'] for col in self.meta['columns']]
+        self._columns = {col['name']: col for col in self.meta['columns']}
+        self._arrays = {}
+
+    def _array(self, name):
+        if name not in self._arrays:
+            col = self._columns[name]
+            file_path = os.path.join(self.path, f"{name}.bin")
+            if self.rows == 0:
+                self._arrays[name] = np.empty(0, dtype=col['dtype'])
+            else:
+                self._arrays[name] = np.memmap(file_path, dtype=col['dtype'], mode='r', shape=(self.rows,))
+        return self._arrays[name]
+
+    def column(self, name, start=0, stop=None):
+        values = self._array(name)[start:stop]
+        categories = self._columns[name].get('categories')
+        if categories is not None:
+            return pd.Categorical.from_codes(np.asarray(values, dtype=np.int64), categories=categories)
+        return values
+
+    def frame(self, columns=None, start=0, stop=None):
+        """DataFrame of rows [start, stop); numeric columns are copied out of the mapping"""
+        data = {}
+        for name in columns or self.columns:
+            values = self.column(name, start, stop)
+            data[name] = values if isinstance(values, pd.Categorical) else np.array(values)
+        return pd.DataFrame(data)
+
+    def chunks(self, columns=None, chunk_rows=BUILD_CHUNK_ROWS):
+        for start in range(0, self.rows, chunk_rows):
+            yield self.frame(columns, start, start + chunk_rows)
+
+
+def _code_dtype(n_categories):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def build_table(csv_path, target, schema=None, chunk_rows=BUILD_CHUNK_ROWS):
+    """Parse csv_path in chunks into a cache directory at target (written atomically)"""
+    schema = schema or {}
+    tmp = f"{target}.tmp-{os.getpid()}-{threading.get_ident()}"
+    os.makedirs(tmp)
+    try:
+        dtypes = {name: ('object' if dtype == CATEGORY else dtype) for name, dtype in schema.items()}
+        files, columns, categories, rows = {}, None, {}, 0
+        for chunk in pd.read_csv(csv_path, dtype=dtypes, na_values=na_values(schema), chunksize=chunk_rows):
+            if columns is None:
+                columns = []
+                for name in chunk.columns:
+                    kind = schema.get(name)
+                    if kind is None:
+                        kind = 'float64' if pd.api.types.is_numeric_dtype(chunk[name]) else CATEGORY
+                    columns.append({'name': name, 'kind': kind})
+                    if kind == CATEGORY:
+                        categories[name] = {}
+                    files[name] = open(os.path.join(tmp, f"{name}.bin"), 'wb')
+            for col in columns:
+                name = col['name']
+                if col['kind'] == CATEGORY:
+                    codes, uniques = pd.factorize(chunk[name])
+                    table = categories[name]
+                    mapping = np.array([table.setdefault(value, len(table)) for value in uniques] + [-1],
+                                       dtype=np.int64)
+                    # factorize marks missing values with -1, which indexes the trailing -1
+                    values = mapping[codes].astype('<i8')
+                else:
+                    values = chunk[name].to_numpy(dtype=np.dtype(col['kind']).newbyteorder('<'))
+                files[name].write(values.tobytes())
+            rows += len(chunk)
+        for f in files.values():
+            f.close()
+
+        meta_columns = []
+        for col in columns or []:
+            name = col['name']
+            if col['kind'] == CATEGORY:
+                values = list(categories[name])
+                dtype = _code_dtype(len(values)).newbyteorder('<')
+                # Codes were written as int64 while the dictionary grew; narrow them now, chunk by chunk
+                path = os.path.join(tmp, f"{name}.bin")
+                if rows:
+                    wide = np.memmap(path, dtype='<i8', mode='r', shape=(rows,))
+                    with open(path + '.narrow', 'wb') as f:
+                        for start in range(0, rows, chunk_rows):
+                            f.write(wide[start:start + chunk_rows].astype(dtype).tobytes())
+                    del wide
+                    os.replace(path + '.narrow', path)
+                meta_columns.append({'name': name, 'dtype': dtype.str, 'categories': values})
+            else:
+                meta_columns.append({'name': name, 'dtype': np.dtype(col['kind']).newbyteorder('<').str})
+
+        meta = {
+            'format_version': FORMAT_VERSION,
+            'source': os.path.basename(csv_path),
+            'rows': rows,
+            'columns': meta_columns,
+            'created_at': time.time()
+        }
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        os.rename(tmp, target)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return CachedTable(target)
+
+
+class DataCache:
+    """
+    Cache of CSV tables keyed by each file's content hash
+    Hashes are remembered by (size, mtime) so unchanged files are not re-read to be hashed. When a
+    source changes, its table is rebuilt from the CSV and the old copy removed.
+    """
+
+    def __init__(self, cache_dir, schemas=None, chunk_rows=BUILD_CHUNK_ROWS):
+        self.cache_dir = cache_dir
+        self.schemas = TABLE_SCHEMAS if schemas is None else schemas
+        self.chunk_rows = chunk_rows
+        self._lock = threading.Lock()
+        self._hashes = None
+
+    def _hash_index(self):
+        if self._hashes is None:
+            try:
+                with open(os.path.join(self.cache_dir, HASH_INDEX)) as f:
+                    self._hashes = json.load(f)
+            except (OSError, ValueError):
+                self._hashes = {}
+        return self._hashes
+
+    def content_hash(self, csv_path):
+        stat = os.stat(csv_path)
+        key = os.path.abspath(csv_path)
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        with self._lock:
+            known = self._hash_index().get(key)
+        if known is not None and known['stat'] == stamp:
+            return known['hash']
+        digest = file_hash(csv_path)
+        with self._lock:
+            self._hash_index()[key] = {'stat': stamp, 'hash': digest}
+        return digest
+
+    def _save_hash_index(self):
+        with self._lock:
+            tmp = os.path.join(self.cache_dir, f"{HASH_INDEX}.tmp-{os.getpid()}")
+            with open(tmp, 'w') as f:
+                json.dump(self._hash_index(), f)
+            os.replace(tmp, os.path.join(self.cache_dir, HASH_INDEX))
+
+    def table(self, csv_path):
+        """Return (CachedTable, built) for csv_path, building it if the content is new"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        name = os.path.basename(csv_path)
+        stem = os.path.splitext(name)[0]
+        target = os.path.join(self.cache_dir, f"{stem}-{self.content_hash(csv_path)[:16]}")
+        try:
+            return CachedTable(target), False
+        except (OSError, ValueError):
+            pass
+        table = build_table(csv_path, target, self.schemas.get(name), self.chunk_rows)
+        for entry in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, entry)
+            if entry.startswith(stem + '-') and path != target and '.tmp-' not in entry and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+        return table, True
+
+    def _table_or_csv(self, csv_path):
+        try:
+            return self.table(csv_path)
+        except Exception as e:
+            print(f"⚠️ Could not cache {os.path.basename(csv_path)} ({e}); reading the CSV")
+            return csv_path, False
+
+    def load(self, csv_paths, workers=None):
+        """
+        Open (or build) several tables in parallel
+        Returns {file name: CachedTable}, or the CSV path for a table that could not be cached.
+        """
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers or len(csv_paths)) as pool:
+            results = dict(zip(csv_paths, pool.map(self._table_or_csv, csv_paths)))
+        self._save_hash_index()
+        tables = {}
+        for path, (table, built) in results.items():
+            name = os.path.basename(path)
+            tables[name] = table
+            if isinstance(table, CachedTable):
+                print(f"{'✓ Cached' if built else '✓ From cache'} {name}: {table.rows} rows")
+        print(f"⏱️ Tables ready in {time.perf_counter() - started:.2f}s")
+        return tables
+
+
+def read_table(source):
+    """Whole table as a DataFrame, from a CachedTable or a CSV path (parsed as the cache does)"""
+    if isinstance(source, CachedTable):
+        return source.frame()
+    return pd.read_csv(source, na_values=csv_na_values(source))
@@ -0,0 +1,48 @@
+"""
+Gunicorn configuration for production serving
+Models are loaded once in the master (preload_app), then N workers are forked from it and share
+the loaded model copy-on-write. Every setting can be overridden through the environment.
+
+    gunicorn -c deployment/gunicorn.conf.py
+"""
+
+import gc
+import multiprocessing
+import os
+
+wsgi_app = 'app:create_app()'
+chdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+bind = os.environ.get('BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Load models in the master before forking
+preload_app = True
+
+# Recycle workers after max_requests (jittered so they do not all restart at once); a recycled
+# worker is forked from the master again, so it starts with the model already loaded
+max_requests = int(os.environ.get('MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.environ.get('MAX_REQUESTS_JITTER', max_requests // 10))
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', 30))
+timeout = int(os.environ.get('WORKER_TIMEOUT', 120))
+
+# Must outlive nginx's upstream keepalive_timeout so nginx, not gunicorn, closes idle connections
+keepalive = int(os.environ.get('KEEPALIVE', 75))
+
+accesslog = os.environ.get('ACCESS_LOG', '-')
+errorlog = '-'
+
+
+def when_ready(server):
+    # Move everything allocated while preloading (models included) out of the collector's view,
+    # so gc passes in workers do not write to those pages and un-share them
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"Models preloaded; forking {workers} worker(s) x {threads} thread(s)")
+
+
+def post_fork(server, worker):
+    import app
+    app.after_fork()
@@ -0,0 +1,254 @@
+"""
+Feature Store
+The merged per-student feature rows from training, written to one file indexed by id_student and
+memory-mapped read-only by the API, so clients can send student IDs instead of all 28 features.
+
+Layout (same framing as model_bundle.bin):
+    8 bytes   magic  b'SADFSTR1'
+    8 bytes   header length (little-endian uint64)
+    n bytes   JSON header (format version, version, row count, column order, category lists, array table)
+    padding   to a 64-byte boundary
+    data      ids (sorted int64), numeric (rows x 20 float64), codes (rows x 8 category codes),
+              observed (uint8 per row: which event tables the student had rows in; optional)
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from preprocessing import CATEGORICAL_COLS, NUMERIC_COLS
+
+MAGIC = b'SADFSTR1'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+KEY = 'id_student'
+INT64 = np.iinfo(np.int64)
+
+# Bits of the observed array. A student without rows in a table has median-filled features for it.
+OBSERVED_COL = 'observed_events'
+ASSESSMENT_EVENTS = 1
+VLE_EVENTS = 2
+
+
+def observed_events(df):
+    """Observed bits per row, from the aggregate columns before missing values are filled"""
+    return (df['num_assessments'].notna().astype(np.uint8) * ASSESSMENT_EVENTS
+            | df['num_interactions'].notna().astype(np.uint8) * VLE_EVENTS)
+
+
+class FeatureStoreError(ValueError):
+    """The feature store file is missing, truncated or from an unsupported format version"""
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_feature_store(path, df, version=None):
+    """
+    Write one row per student atomically and return the header
+    Students enrolled in several presentations keep their latest one. Categorical values are stored
+    as strings, the form the API's encoder looks them up in. An observed_events column (see
+    observed_events()) is stored when present.
+    """
+    # pandas is imported where frames are built, so the API can serve single students without it
+    import pandas as pd
+
+    df = df.sort_values([KEY, 'code_presentation'], kind='stable').drop_duplicates(KEY, keep='last')
+
+    categories, codes = {}, []
+    for col in CATEGORICAL_COLS:
+        # str() of every value, so a missing value is 'nan' and encodes to the class fitted on it
+        col_codes, uniques = pd.factorize(df[col].astype(object).map(str))
+        categories[col] = [str(value) for value in uniques]
+        codes.append(col_codes)
+    code_dtype = '<i2' if max(len(values) for values in categories.values()) < 32767 else '<i4'
+
+    arrays = {
+        'ids': np.ascontiguousarray(df[KEY].to_numpy(), dtype='<i8'),
+        'numeric': np.ascontiguousarray(df[NUMERIC_COLS].to_numpy(dtype=np.float64), dtype='<f8'),
+        'codes': np.ascontiguousarray(np.column_stack(codes), dtype=code_dtype),
+    }
+    if OBSERVED_COL in df.columns:
+        arrays['observed'] = np.ascontiguousarray(df[OBSERVED_COL].to_numpy(), dtype=np.uint8)
+    table, offset = {}, 0
+    for name, array in arrays.items():
+        offset = _align(offset)
+        table[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+
+    metadata = {
+        'format_version': FORMAT_VERSION,
+        'version': version,
+        'created_at': time.time(),
+        'rows': len(df),
+        'numeric_cols': list(NUMERIC_COLS),
+        'categorical_cols': list(CATEGORICAL_COLS),
+        'categories': categories,
+        'data_size': offset,
+        'arrays': table,
+    }
+    header = json.dumps(metadata).encode('utf-8')
+    prefix = MAGIC + struct.pack('<Q', len(header)) + header
+    data_start = _align(len(prefix))
+
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(prefix + b'\0' * (data_start - len(prefix)))
+        for name, array in arrays.items():
+            f.seek(data_start + table[name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+    return metadata
+
+
+def normalize_ids(ids):
+    """Request IDs as int64; anything that is not an integer becomes -1 (never stored)"""
+    ids = list(ids)
+    if all(isinstance(value, (int, np.integer)) and not isinstance(value, bool)
+           and INT64.min <= value <= INT64.max for value in ids):
+        # Already integers (the common single-student case): no pandas needed
+        return np.array(ids, dtype=np.int64)
+    import pandas as pd
+
+    values = pd.to_numeric(pd.Series(ids, dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+    valid = np.isfinite(values) & (values == np.round(values))
+    return np.where(valid, values, -1).astype(np.int64)
+
+
+class FeatureStore:
+    """
+    Read-only, memory-mapped feature rows with bulk lookup by binary search on the sorted ids
+    Single-student lookups go through an optional LRU hot set of ready-made records.
+    """
+
+    def __init__(self, path, cache_size=0):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise FeatureStoreError(f"{path} is not a feature store")
+            (header_len,) = struct.unpack('<Q', f.read(8))
+            self.metadata = json.loads(f.read(header_len).decode('utf-8'))
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.metadata.get('format_version') != FORMAT_VERSION:
+            raise FeatureStoreError(f"Unsupported feature store format: {self.metadata.get('format_version')}")
+        data_start = _align(len(MAGIC) + 8 + header_len)
+        if len(self._buffer) < data_start + self.metadata['data_size']:
+            raise FeatureStoreError(f"{path} is truncated")
+
+        arrays = {}
+        for name, spec in self.metadata['arrays'].items():
+            count = int(np.prod(spec['shape'], dtype=np.int64))
+            arrays[name] = np.frombuffer(self._buffer, dtype=spec['dtype'], count=count,
+                                         offset=data_start + spec['offset']).reshape(spec['shape'])
+        self.ids = arrays['ids']
+        self.numeric = arrays['numeric']
+        self.codes = arrays['codes']
+        # Files without the array predate it: treat every student as having events in both tables
+        self.observed = arrays.get('observed')
+        self.numeric_cols = self.metadata['numeric_cols']
+        self.categorical_cols = self.metadata['categorical_cols']
+        # Trailing None: code -1 (not written today, but cheap to tolerate)
+        self.categories = [np.array(self.metadata['categories'][col] + [None], dtype=object)
+                           for col in self.categorical_cols]
+        self.version = self.metadata.get('version')
+        self.rows = self.metadata['rows']
+        self.mtime = os.path.getmtime(path)
+
+        self.cache_size = cache_size
+        self.lookups = 0
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.rows
+
+    def positions(self, ids):
+        """(row positions, found mask) for each requested id"""
+        keys = normalize_ids(ids)
+        positions = np.searchsorted(self.ids, keys)
+        clipped = np.minimum(positions, max(self.rows - 1, 0))
+        found = (positions < self.rows) & (self.ids[clipped] == keys) if self.rows else np.zeros(len(keys), bool)
+        return clipped, found
+
+    def find(self, key):
+        """Row position of one integer id, or None; skips normalize_ids for callers that already parsed it"""
+        row = int(np.searchsorted(self.ids, key))
+        return row if row < self.rows and self.ids[row] == key else None
+
+    def observed_at(self, row):
+        """Observed bits of one row position"""
+        if self.observed is None:
+            return ASSESSMENT_EVENTS | VLE_EVENTS
+        return int(self.observed[row])
+
+    def frame(self, ids):
+        """
+        Feature rows for many students in request order
+        Returns (DataFrame with id_student, categorical and numeric columns, list of unknown ids).
+        """
+        import pandas as pd
+
+        ids = list(ids)
+        self.lookups += len(ids)
+        positions, found = self.positions(ids)
+        rows = positions[found]
+        data = {KEY: self.ids[rows]}
+        codes = self.codes[rows]
+        for i, col in enumerate(self.categorical_cols):
+            data[col] = self.categories[i][codes[:, i]]
+        numeric = self.numeric[rows]
+        for i, col in enumerate(self.numeric_cols):
+            data[col] = numeric[:, i]
+        missing = [student_id for student_id, ok in zip(ids, found) if not ok]
+        return pd.DataFrame(data), missing
+
+    def get(self, student_id):
+        """One student's features as a record (dict), or None if the id is unknown"""
+        key = normalize_ids([student_id])[0]
+        with self._lock:
+            record = self._cache.get(key)
+            if record is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return dict(record)
+            self.misses += 1
+
+        positions, found = self.positions([key])
+        self.lookups += 1
+        if not found[0]:
+            return None
+        row = positions[0]
+        record = {KEY: int(self.ids[row])}
+        for i, col in enumerate(self.categorical_cols):
+            record[col] = self.categories[i][self.codes[row, i]]
+        for col, value in zip(self.numeric_cols, self.numeric[row].tolist()):
+            record[col] = value
+
+        if self.cache_size > 0:
+            with self._lock:
+                self._cache[key] = record
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return dict(record)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'path': self.path,
+            'version': self.version,
+            'rows': self.rows,
+            'lookups': self.lookups,
+            'cache_size': self.cache_size,
+            'cache_entries': len(self._cache),
+            'cache_hit_rate': round(self.hits / total, 4) if total else 0.0
+        }
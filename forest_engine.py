@@ -0,0 +1,179 @@
+"""
+Flattened Isolation Forest Inference
+Scores and labels samples with one vectorized traversal of every tree at once
+"""
+
+import sys
+
+import numpy as np
+
+# Upper bound on (rows x trees) node indices held in memory per traversal chunk
+CHUNK_NODES = 1 << 16
+
+
+def average_path_length(n_samples):
+    """Average path length of an unsuccessful BST search over n_samples (c(n) in the paper)"""
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    result = np.zeros_like(n_samples)
+    result[n_samples == 2] = 1.0
+    many = n_samples > 2
+    n = n_samples[many]
+    result[many] = 2.0 * (np.log(n - 1.0) + np.euler_gamma) - 2.0 * (n - 1.0) / n
+    return result
+
+
+class FlatForest:
+    """
+    Every tree of a fitted IsolationForest laid out in contiguous node arrays
+
+    children holds (left, right) pairs, so the next node is children[2 * node + go_right].
+    Leaves point back to themselves, so all trees can be walked in lock-step for
+    max_depth steps and the leaf's path length (depth + c(n_leaf_samples)) read off at the end.
+    """
+
+    def __init__(self, feature, threshold, children, missing_left, leaf_value, roots,
+                 max_depth, normalizer, offset, n_features, source=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.missing_left = missing_left
+        self.leaf_value = leaf_value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.normalizer = normalizer
+        self.offset = offset
+        self.n_features = n_features
+        self.source = source
+
+    @staticmethod
+    def supports(model):
+        """True if model is a fitted IsolationForest this engine can flatten"""
+        # A fitted IsolationForest cannot exist before sklearn.ensemble has been imported, so looking
+        # it up in sys.modules keeps sklearn off the serving import path
+        ensemble = sys.modules.get('sklearn.ensemble')
+        return ensemble is not None and isinstance(model, ensemble.IsolationForest) and hasattr(model, 'estimators_')
+
+    @classmethod
+    def from_isolation_forest(cls, model):
+        """Flatten a fitted sklearn IsolationForest"""
+        features, thresholds, children, missing_left, leaf_values, roots = [], [], [], [], [], []
+        max_depth = 0
+        start = 0
+
+        for estimator, tree_features in zip(model.estimators_, model.estimators_features_):
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes)
+            is_leaf = tree.children_left == -1
+
+            depth = np.zeros(n_nodes, dtype=np.int64)
+            for node in range(n_nodes):
+                if not is_leaf[node]:
+                    depth[tree.children_left[node]] = depth[node] + 1
+                    depth[tree.children_right[node]] = depth[node] + 1
+            max_depth = max(max_depth, int(depth.max()))
+
+            # Map the tree's (possibly subsampled) feature indices back onto the full input
+            feature = np.where(is_leaf, 0, np.asarray(tree_features)[np.maximum(tree.feature, 0)])
+            left = np.where(is_leaf, node_ids, tree.children_left) + start
+            right = np.where(is_leaf, node_ids, tree.children_right) + start
+            missing = getattr(tree, 'missing_go_to_left', np.zeros(n_nodes, dtype=np.uint8))
+
+            features.append(feature)
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            children.append(np.column_stack([left, right]))
+            missing_left.append(np.asarray(missing, dtype=bool))
+            leaf_values.append(depth + average_path_length(tree.n_node_samples))
+            roots.append(start)
+            start += n_nodes
+
+        normalizer = len(model.estimators_) * float(average_path_length([model._max_samples])[0])
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children=np.concatenate(children).astype(np.intp).ravel(),
+            missing_left=np.concatenate(missing_left),
+            leaf_value=np.concatenate(leaf_values).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            normalizer=normalizer,
+            offset=float(model.offset_),
+            n_features=model.n_features_in_,
+            source=model
+        )
+
+    def as_float32(self):
+        """
+        The same forest with float32 thresholds and leaf values
+        Each threshold is rounded down to the nearest float32: for a float32 input x, x <= t and
+        x <= round_down(t) agree, so every split goes the same way as with the float64 thresholds.
+        Only the leaf values are rounded (relative error 2^-24, summed in float64). Node indices stay
+        intp, which np.take would otherwise convert on every step.
+        """
+        if self.threshold.dtype == np.float32:
+            return self
+        threshold = self.threshold.astype(np.float32)
+        above = threshold > self.threshold
+        threshold[above] = np.nextafter(threshold[above], np.float32(-np.inf))
+        return FlatForest(
+            feature=self.feature,
+            threshold=threshold,
+            children=self.children,
+            missing_left=self.missing_left,
+            leaf_value=self.leaf_value.astype(np.float32),
+            roots=self.roots,
+            max_depth=self.max_depth,
+            normalizer=self.normalizer,
+            offset=self.offset,
+            n_features=self.n_features,
+            source=self.source
+        )
+
+    def _path_lengths(self, X):
+        """Sum over trees of each sample's isolation path length"""
+        n_rows, n_trees = X.shape[0], len(self.roots)
+        chunk = max(1, CHUNK_NODES // n_trees)
+        has_nan = np.isnan(X).any()
+        depths = np.empty(n_rows, dtype=np.float64)
+
+        for begin in range(0, n_rows, chunk):
+            X_chunk = X[begin:begin + chunk]
+            flat = X_chunk.ravel()
+            row_offset = (np.arange(X_chunk.shape[0]) * self.n_features)[:, None]
+            node = np.tile(self.roots, (X_chunk.shape[0], 1))
+
+            for _ in range(self.max_depth):
+                values = np.take(flat, row_offset + np.take(self.feature, node))
+                go_right = ~(values <= np.take(self.threshold, node))
+                if has_nan:
+                    go_right &= ~(np.isnan(values) & np.take(self.missing_left, node))
+                node = np.take(self.children, 2 * node + go_right)
+
+            depths[begin:begin + chunk] = np.take(self.leaf_value, node).sum(axis=1, dtype=np.float64)
+
+        return depths
+
+    def score(self, X):
+        """Return (score_samples, predict) for X from a single traversal"""
+        # Trees compare float32 inputs against float64 thresholds, exactly like sklearn's Tree.apply
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        depths = self._path_lengths(X)
+        if self.normalizer != 0:
+            raw_scores = -(2 ** (-depths / self.normalizer))
+        else:
+            raw_scores = -np.ones_like(depths)
+        labels = np.where(raw_scores - self.offset < 0, -1, 1)
+        return raw_scores, labels
+
+    def score_samples(self, X):
+        """Same as IsolationForest.score_samples"""
+        return self.score(X)[0]
+
+    def decision_function(self, X):
+        """Same as IsolationForest.decision_function"""
+        return self.score_samples(X) - self.offset
+
+    def predict(self, X):
+        """Same as IsolationForest.predict"""
+        return self.score(X)[1]
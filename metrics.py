@@ -0,0 +1,251 @@
+"""
+Metrics
+Minimal Prometheus collectors for the API: counters, histograms and gauges rendered in the text
+exposition format. Observations only touch per-thread storage, so the hot path takes no lock;
+values from all threads are summed when /metrics is scraped.
+"""
+
+import bisect
+import threading
+import time
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _ThreadSharded:
+    """
+    Base for collectors whose state is kept per thread
+    Each thread registers its own dict once (the only locked step); scrapes read all of them and
+    fold the dicts of finished threads into one, so a thread-per-request server does not grow them.
+    """
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        try:
+            return self._local.values
+        except AttributeError:
+            values = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), values))
+            self._local.values = values
+            return values
+
+    def _merge(self, target, values):
+        raise NotImplementedError
+
+    def _snapshot(self):
+        with self._lock:
+            alive = []
+            for thread, values in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, values))
+                else:
+                    self._merge(self._retired, values)
+            self._shards = alive
+            # Copy each dict; a thread may add a label set while it is being read
+            return [dict(self._retired)] + [dict(values) for _, values in alive]
+
+
+class Counter(_ThreadSharded):
+    """Monotonic counter, optionally labelled"""
+
+    def inc(self, *labels, amount=1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def _merge(self, target, values):
+        for labels, value in values.items():
+            target[labels] = target.get(labels, 0) + value
+
+    def values(self):
+        totals = {}
+        for shard in self._snapshot():
+            self._merge(totals, shard)
+        return totals
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self.values().items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Histogram(_ThreadSharded):
+    """Cumulative-bucket histogram; observe() is a bisect and three additions on thread-local state"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            # [per-bucket counts (last one is +Inf), sum, count]
+            state = shard[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def _merge(self, target, values):
+        for labels, (counts, total, count) in values.items():
+            merged = target.get(labels)
+            if merged is None:
+                merged = [[0] * len(counts), 0.0, 0]
+            # Always build a new list: target may be a snapshot shared with a reader
+            target[labels] = [[a + b for a, b in zip(merged[0], counts)], merged[1] + total, merged[2] + count]
+
+    def values(self):
+        """{labels: (cumulative bucket counts, sum, count)}"""
+        totals = {}
+        for shard in self._snapshot():
+            self._merge(totals, shard)
+        result = {}
+        for labels, (counts, total, count) in totals.items():
+            cumulative, running = [], 0
+            for n in counts:
+                running += n
+                cumulative.append(running)
+            result[labels] = (cumulative, total, count)
+        return result
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, (cumulative, total, count) in sorted(self.values().items()):
+            for bound, n in zip(self.buckets + (float('inf'),), cumulative):
+                le = (('le', _format_value(float(bound))),)
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {n}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+class Gauge:
+    """Value computed at scrape time by a callback returning {labels tuple: value}"""
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge']
+        for labels, value in sorted(self.callback().items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Throughput:
+    """Rate of a counter over the last `window` seconds, sampled whenever it is read"""
+
+    def __init__(self, counter, window=60.0, clock=time.monotonic):
+        self.counter = counter
+        self.window = window
+        self.clock = clock
+        self._samples = [(clock(), 0)]
+        self._lock = threading.Lock()
+
+    def rate(self):
+        now = self.clock()
+        total = sum(self.counter.values().values())
+        with self._lock:
+            self._samples.append((now, total))
+            # Keep one sample older than the window as the baseline
+            while len(self._samples) > 2 and now - self._samples[1][0] >= self.window:
+                self._samples.pop(0)
+            then, before = self._samples[0]
+        return (total - before) / (now - then) if now > then else 0.0
+
+
+class Stage:
+    """Context manager timing one pipeline stage into a histogram"""
+
+    __slots__ = ('histogram', 'label', 'started')
+
+    def __init__(self, histogram, label):
+        self.histogram = histogram
+        self.label = label
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, self.label)
+        return False
+
+
+class Registry:
+    """Ordered set of collectors rendered together"""
+
+    def __init__(self):
+        self.collectors = []
+
+    def register(self, collector):
+        self.collectors.append(collector)
+        return collector
+
+    def render(self):
+        lines = []
+        for collector in self.collectors:
+            lines.extend(collector.render())
+        return '\n'.join(lines) + '\n'
+
+
+# API collectors
+registry = Registry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    'student_api_stage_seconds', 'Time spent in each prediction pipeline stage', ['stage']))
+REQUEST_SECONDS = registry.register(Histogram(
+    'student_api_request_seconds', 'Request latency by endpoint', ['endpoint']))
+REQUESTS = registry.register(Counter(
+    'student_api_requests_total', 'Requests by endpoint and status code', ['endpoint', 'status']))
+ERRORS = registry.register(Counter(
+    'student_api_errors_total', 'Requests answered with a 4xx/5xx status, by endpoint', ['endpoint']))
+BATCH_SIZE = registry.register(Histogram(
+    'student_api_batch_size_rows', 'Rows per model scoring call', buckets=BATCH_SIZE_BUCKETS))
+ROWS_SCORED = registry.register(Counter(
+    'student_api_rows_scored_total', 'Rows scored by the model'))
+EVENTS_INGESTED = registry.register(Counter(
+    'student_api_events_ingested_total', 'VLE and assessment events applied to live features', ['kind']))
+
+rows_throughput = Throughput(ROWS_SCORED)
+
+
+def stage(name):
+    """with metrics.stage('score'): ... records the block's duration under that stage label"""
+    return Stage(STAGE_SECONDS, name)
+
+
+def record_batch(n_rows):
+    BATCH_SIZE.observe(n_rows)
+    ROWS_SCORED.inc(amount=n_rows)
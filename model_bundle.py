@@ -0,0 +1,175 @@
+"""
+Model Bundle
+Single versioned, checksummed file holding everything needed to serve the model, laid out so that
+it can be memory-mapped read-only: worker processes share one physical copy and nothing is unpickled.
+
+Layout:
+    8 bytes   magic  b'SADBNDL1'
+    8 bytes   header length (little-endian uint64)
+    n bytes   JSON header (format version, model version, checksum, array table, scalars,
+              encoder classes, feature column order)
+    padding   to a 64-byte boundary
+    data      raw little-endian arrays, each starting on a 64-byte boundary
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+
+import numpy as np
+
+from forest_engine import FlatForest
+from preprocessing import CATEGORICAL_COLS, ArrayScaler, CategoricalEncoder
+
+MAGIC = b'SADBNDL1'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+FOREST_ARRAYS = {
+    'feature': '<i8',
+    'threshold': '<f8',
+    'children': '<i8',
+    'missing_left': '|b1',
+    'leaf_value': '<f8',
+    'roots': '<i8',
+}
+SCALER_ARRAYS = {
+    'scaler_mean': '<f8',
+    'scaler_scale': '<f8',
+}
+
+
+class BundleError(ValueError):
+    """The bundle file is missing, corrupt or from an unsupported format version"""
+
+
+class ModelBundle:
+    """An opened bundle: flattened forest, scaler arrays, compiled encoder and metadata"""
+
+    def __init__(self, forest, scaler, encoder, feature_cols, metadata, buffer=None):
+        self.forest = forest
+        self.scaler = scaler
+        self.encoder = encoder
+        self.feature_cols = feature_cols
+        self.metadata = metadata
+        self.version = metadata.get('model_version')
+        # Keeps the mapping alive for as long as the array views into it are in use
+        self._buffer = buffer
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_bundle(path, forest, scaler, encoder, feature_cols, model_version=None, extra=None):
+    """Write a bundle atomically (temporary file + rename) and return its metadata"""
+    arrays = {name: np.ascontiguousarray(getattr(forest, name), dtype=dtype)
+              for name, dtype in FOREST_ARRAYS.items()}
+    arrays['scaler_mean'] = np.ascontiguousarray(scaler.mean_, dtype=SCALER_ARRAYS['scaler_mean'])
+    arrays['scaler_scale'] = np.ascontiguousarray(scaler.scale_, dtype=SCALER_ARRAYS['scaler_scale'])
+
+    table = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = _align(offset)
+        table[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+
+    metadata = {
+        'format_version': FORMAT_VERSION,
+        'model_version': model_version,
+        'created_at': time.time(),
+        'data_size': offset,
+        'arrays': table,
+        'forest': {
+            'max_depth': int(forest.max_depth),
+            'normalizer': float(forest.normalizer),
+            'offset': float(forest.offset),
+            'n_features': int(forest.n_features),
+        },
+        'encoder_classes': {col: list(encoder.tables[col]) for col in CATEGORICAL_COLS if col in encoder.tables},
+        'feature_cols': list(feature_cols),
+    }
+    metadata.update(extra or {})
+
+    data = bytearray(offset)
+    for name, array in arrays.items():
+        start = table[name]['offset']
+        data[start:start + array.nbytes] = array.tobytes()
+    metadata['checksum'] = hashlib.sha256(data).hexdigest()
+
+    header = json.dumps(metadata).encode('utf-8')
+    prefix = MAGIC + struct.pack('<Q', len(header)) + header
+    padding = b'\0' * (_align(len(prefix)) - len(prefix))
+
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(prefix + padding)
+        f.write(data)
+    os.replace(tmp_path, path)
+    return metadata
+
+
+def read_bundle_header(path):
+    """Parse the header only; returns (metadata, data_start)"""
+    with open(path, 'rb') as f:
+        magic = f.read(len(MAGIC))
+        if magic != MAGIC:
+            raise BundleError(f"{path} is not a model bundle")
+        (header_len,) = struct.unpack('<Q', f.read(8))
+        metadata = json.loads(f.read(header_len).decode('utf-8'))
+    if metadata.get('format_version') != FORMAT_VERSION:
+        raise BundleError(f"Unsupported bundle format version: {metadata.get('format_version')}")
+    return metadata, _align(len(MAGIC) + 8 + header_len)
+
+
+def open_bundle(path, verify=True):
+    """
+    Memory-map a bundle read-only; arrays are zero-copy views into the shared page cache
+    verify=True checks the data checksum (touches every page once).
+    """
+    metadata, data_start = read_bundle_header(path)
+
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(buffer) < data_start + metadata['data_size']:
+        buffer.close()
+        raise BundleError(f"{path} is truncated")
+
+    data = memoryview(buffer)[data_start:data_start + metadata['data_size']]
+    if verify and hashlib.sha256(data).hexdigest() != metadata['checksum']:
+        data.release()
+        buffer.close()
+        raise BundleError(f"{path} failed checksum verification")
+
+    arrays = {}
+    for name, spec in metadata['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count,
+                                     offset=data_start + spec['offset']).reshape(spec['shape'])
+    data.release()
+
+    params = metadata['forest']
+    forest = FlatForest(
+        feature=arrays['feature'],
+        threshold=arrays['threshold'],
+        children=arrays['children'],
+        missing_left=arrays['missing_left'],
+        leaf_value=arrays['leaf_value'],
+        roots=arrays['roots'],
+        max_depth=params['max_depth'],
+        normalizer=params['normalizer'],
+        offset=params['offset'],
+        n_features=params['n_features']
+    )
+    scaler = ArrayScaler(arrays['scaler_mean'], arrays['scaler_scale'])
+    tables = {col: {c: code for code, c in enumerate(classes)}
+              for col, classes in metadata['encoder_classes'].items()}
+    encoder = CategoricalEncoder(tables)
+
+    return ModelBundle(forest, scaler, encoder, metadata['feature_cols'], metadata, buffer=buffer)
@@ -0,0 +1,346 @@
+"""
+Model Store
+Loads, validates and warms up model artifact sets, and watches the models directory for new ones
+"""
+
+import hashlib
+import os
+import threading
+import time
+
+import numpy as np
+
+import model_bundle
+import preprocessing
+from forest_engine import FlatForest
+
+MODEL_FILE = 'best_anomaly_model.pkl'
+SCALER_FILE = 'scaler.pkl'
+ENCODERS_FILE = 'label_encoders.pkl'
+ARTIFACT_FILES = (MODEL_FILE, SCALER_FILE, ENCODERS_FILE)
+BUNDLE_FILE = 'model_bundle.bin'
+MODEL_FORMATS = ('auto', 'bundle', 'pickle')
+INFERENCE_DTYPES = ('float64', 'float32')
+
+# Largest score difference between the float32 and float64 paths accepted when a set is loaded.
+# The float32 forest splits exactly as the float64 one on the same float32 input, so scores only
+# move by the leaf rounding (~1e-8) or where float32 scaling pushes a value across a threshold: one
+# such split in a 200-tree, 256-sample forest moves a score by up to ~3e-3.
+FLOAT32_SCORE_TOLERANCE = 5e-3
+
+# Synthetic rows drawn from the scaler's statistics for the load-time drift check
+DRIFT_CHECK_ROWS = 2048
+
+
+class ModelSet:
+    """
+    One consistent set of serving artifacts: model, scaler, label encoders and their compiled forms
+    Requests hold on to a ModelSet for their whole lifetime, so a reload never mixes versions.
+    """
+
+    def __init__(self, model, scaler, label_encoders, version=None, source_dir=None, encoder=None, forest=None,
+                 dtype='float64'):
+        if str(dtype) not in INFERENCE_DTYPES:
+            raise ValueError(f"Unknown inference dtype: {dtype}")
+        self.model = model
+        self.scaler = scaler
+        self.label_encoders = label_encoders
+        self.version = version
+        self.source_dir = source_dir
+        self.encoder = encoder or preprocessing.CategoricalEncoder.from_label_encoders(label_encoders)
+        if forest is None and FlatForest.supports(model):
+            forest = FlatForest.from_isolation_forest(model)
+        # float32 serves encoding, scaling and the forest in single precision: half the bytes per batch
+        self.dtype = np.dtype(dtype)
+        self.reference_forest = forest
+        self.forest = forest.as_float32() if forest is not None and self.dtype == np.float32 else forest
+        self.float32_scaler = _float32_scaler(scaler) if self.dtype == np.float32 else None
+        # score_drift() of the float32 path against the float64 one, when it has been checked
+        self.float32_drift = None
+        self.loaded_at = time.time()
+        # Seconds spent in each loading stage, filled in by load_model_set()
+        self.timings = {}
+
+    @classmethod
+    def from_bundle(cls, bundle, source_dir=None):
+        """Serve straight from an opened model bundle: the flattened forest is the model"""
+        return cls(
+            bundle.forest,
+            bundle.scaler,
+            bundle.encoder.tables,
+            version=bundle.version,
+            source_dir=source_dir,
+            encoder=bundle.encoder,
+            forest=bundle.forest
+        )
+
+    def with_dtype(self, dtype):
+        """The same artifacts served in another precision"""
+        models = ModelSet(self.model, self.scaler, self.label_encoders, version=self.version,
+                          source_dir=self.source_dir, encoder=self.encoder, forest=self.reference_forest, dtype=dtype)
+        models.timings = dict(self.timings)
+        return models
+
+    def matches(self, model, scaler, label_encoders):
+        """True if this set wraps exactly these objects"""
+        return self.model is model and self.scaler is scaler and self.label_encoders is label_encoders
+
+    def encode(self, data):
+        """Unscaled feature matrix for a record (dict) or DataFrame"""
+        # Single records skip pandas entirely; batches are encoded column by column
+        if isinstance(data, dict):
+            return preprocessing.build_feature_vector(data, self.encoder, self.dtype)
+        return preprocessing.build_feature_matrix(data, self.encoder, self.dtype)
+
+    def scale(self, X):
+        if self.float32_scaler is not None:
+            return preprocessing.scale_features(self.float32_scaler, np.asarray(X, dtype=np.float32))
+        if self.dtype == np.float32:
+            return np.asarray(preprocessing.scale_features(self.scaler, X), dtype=np.float32)
+        return preprocessing.scale_features(self.scaler, X)
+
+    def score(self, X_scaled):
+        """Return (predictions, raw_scores) for a preprocessed feature matrix"""
+        if self.forest is not None:
+            # One traversal of the flattened forest gives both the score and the label
+            raw_scores, predictions = self.forest.score(X_scaled)
+            return predictions, raw_scores
+        return self.model.predict(X_scaled), self.model.score_samples(X_scaled)
+
+    def info(self):
+        return {
+            'version': self.version,
+            'model_type': type(self.model).__name__,
+            'loaded_at': self.loaded_at,
+            'flattened_forest': self.forest is not None,
+            'dtype': self.dtype.name,
+            'float32_drift': self.float32_drift
+        }
+
+
+def _float32_scaler(scaler):
+    """float32 mean/scale arrays for a StandardScaler-like scaler, or None if it has to run its own transform"""
+    if not (isinstance(scaler, preprocessing.ArrayScaler) or preprocessing.is_standard_scaler(scaler)):
+        return None
+    n_features = len(scaler.mean_) if scaler.mean_ is not None else len(scaler.scale_)
+    mean = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+    scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+    return preprocessing.ArrayScaler(np.asarray(mean, dtype=np.float32), np.asarray(scale, dtype=np.float32))
+
+
+def artifact_paths(models_dir):
+    return [os.path.join(models_dir, name) for name in ARTIFACT_FILES]
+
+
+def artifact_version(paths):
+    """Short content hash identifying a set of model artifact files"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def artifact_signature(models_dir):
+    """Cheap change detector: (name, mtime, size) of every artifact file that exists"""
+    signature = []
+    for name in ARTIFACT_FILES + (BUNDLE_FILE,):
+        try:
+            stat = os.stat(os.path.join(models_dir, name))
+        except OSError:
+            continue
+        signature.append((name, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def signature_complete(signature):
+    """True if the signature covers a loadable set: all pickles, or a bundle"""
+    names = {entry[0] for entry in signature}
+    return set(ARTIFACT_FILES) <= names or BUNDLE_FILE in names
+
+
+def validate_model_set(models):
+    """Raise ValueError if the artifacts are not a usable, mutually consistent set"""
+    n_features = len(preprocessing.FEATURE_COLS)
+    for name, obj in [('model', models.model), ('scaler', models.scaler)]:
+        n_in = getattr(obj, 'n_features_in_', getattr(obj, 'n_features', n_features))
+        if n_in != n_features:
+            raise ValueError(f"{name} expects {n_in} features, serving code provides {n_features}")
+    if not hasattr(models.model, 'predict') or not hasattr(models.model, 'score_samples'):
+        raise ValueError(f"{type(models.model).__name__} has no predict/score_samples")
+    missing = [col for col in preprocessing.CATEGORICAL_COLS if col not in models.label_encoders]
+    if missing:
+        raise ValueError(f"Label encoders missing for: {', '.join(missing)}")
+
+
+def warm_up(models, rows=64):
+    """Push synthetic records through the full pipeline once, so the first real request is not the slow one"""
+    record = {col: next(iter(models.encoder.tables[col]), '') for col in preprocessing.CATEGORICAL_COLS}
+    means = getattr(models.scaler, 'mean_', None)
+    for i, col in enumerate(preprocessing.NUMERIC_COLS, start=len(preprocessing.CATEGORICAL_COLS)):
+        record[col] = float(means[i]) if means is not None else 0.0
+
+    X = models.scale(models.encode(record))
+    predictions, raw_scores = models.score(np.repeat(X, rows, axis=0))
+    if not np.all(np.isfinite(raw_scores)) or not set(np.unique(predictions)) <= {-1, 1}:
+        raise ValueError("Warm-up produced invalid scores")
+
+
+def probe_matrix(models, rows=DRIFT_CHECK_ROWS, seed=0):
+    """Unscaled feature rows drawn around the scaler's mean and scale, with random known category codes"""
+    rng = np.random.default_rng(seed)
+    n_features = len(preprocessing.FEATURE_COLS)
+    mean = np.asarray(getattr(models.scaler, 'mean_', None) if getattr(models.scaler, 'mean_', None) is not None
+                      else np.zeros(n_features), dtype=np.float64)
+    scale = np.asarray(getattr(models.scaler, 'scale_', None) if getattr(models.scaler, 'scale_', None) is not None
+                       else np.ones(n_features), dtype=np.float64)
+    X = mean + scale * rng.standard_normal((rows, n_features))
+    for i, col in enumerate(preprocessing.CATEGORICAL_COLS):
+        X[:, i] = rng.integers(0, max(len(models.encoder.tables.get(col, ())), 1), rows)
+    return X
+
+
+def score_drift(reference, candidate, X):
+    """
+    Score an unscaled float64 feature matrix through two sets end to end and compare
+    The candidate gets X in its own dtype, as its encode() would have produced it.
+    """
+    reference_labels, reference_scores = reference.score(reference.scale(X))
+    labels, scores = candidate.score(candidate.scale(np.asarray(X, dtype=candidate.dtype)))
+    drift = np.abs(scores - reference_scores)
+    return {
+        'rows': len(X),
+        'max_score_drift': float(drift.max()) if len(drift) else 0.0,
+        'mean_score_drift': float(drift.mean()) if len(drift) else 0.0,
+        'label_agreement': float(np.mean(labels == reference_labels)) if len(drift) else 1.0
+    }
+
+
+def use_float32(models, X=None, tolerance=FLOAT32_SCORE_TOLERANCE):
+    """
+    The float32 version of a loaded set, if its scores stay within tolerance of the float64 path
+    on X (default: probe_matrix rows); otherwise models itself, with a warning
+    """
+    candidate = models.with_dtype('float32')
+    drift = score_drift(models, candidate, probe_matrix(models) if X is None else X)
+    models.float32_drift = candidate.float32_drift = drift
+    if drift['max_score_drift'] > tolerance:
+        print(f"⚠️  float32 scores drift up to {drift['max_score_drift']:.2e} (> {tolerance:.0e}): serving float64")
+        return models
+    print(f"✓ Serving float32: max score drift {drift['max_score_drift']:.2e}, "
+          f"label agreement {drift['label_agreement']:.2%} on {drift['rows']} probe rows")
+    return candidate
+
+
+def load_bundle_set(bundle_path, source_dir=None):
+    """Memory-map a model bundle and wrap it in a ModelSet"""
+    print(f"Loading model bundle from: {bundle_path}")
+    bundle = model_bundle.open_bundle(bundle_path)
+    if bundle.feature_cols != preprocessing.FEATURE_COLS:
+        raise ValueError("Bundle feature columns do not match the serving feature order")
+    return ModelSet.from_bundle(bundle, source_dir=source_dir)
+
+
+def load_model_set(models_dir, model_format='auto', dtype='float64'):
+    """
+    Load, validate and warm up the artifact set in models_dir
+    model_format: 'bundle' (memory-mapped model_bundle.bin), 'pickle' (joblib artifacts),
+    or 'auto' (the bundle when present, pickles otherwise).
+    dtype 'float32' serves the set in single precision if it passes the drift check (use_float32).
+    """
+    if model_format not in MODEL_FORMATS:
+        raise ValueError(f"Unknown model format: {model_format}")
+    if dtype not in INFERENCE_DTYPES:
+        raise ValueError(f"Unknown inference dtype: {dtype}")
+    models = _load_model_set(models_dir, model_format)
+    return use_float32(models) if dtype == 'float32' else models
+
+
+def _load_model_set(models_dir, model_format):
+    if not os.path.exists(models_dir):
+        raise FileNotFoundError(f"Models directory not found: {models_dir}")
+
+    bundle_path = os.path.join(models_dir, BUNDLE_FILE)
+    if model_format == 'bundle' or (model_format == 'auto' and os.path.exists(bundle_path)):
+        if not os.path.exists(bundle_path):
+            raise FileNotFoundError(f"Model file not found: {bundle_path}")
+        started = time.perf_counter()
+        models = load_bundle_set(bundle_path, source_dir=models_dir)
+        return _validate_and_warm_up(models, started)
+
+    model_path, scaler_path, encoders_path = artifact_paths(models_dir)
+    print(f"Loading model from: {model_path}")
+    print(f"Loading scaler from: {scaler_path}")
+    print(f"Loading encoders from: {encoders_path}")
+
+    for path in [model_path, scaler_path, encoders_path]:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Model file not found: {path}")
+
+    # joblib (and sklearn, pulled in by unpickling) is only imported when pickles are actually served
+    import joblib
+
+    started = time.perf_counter()
+    version = artifact_version([model_path, scaler_path, encoders_path])
+    models = ModelSet(
+        joblib.load(model_path),
+        joblib.load(scaler_path),
+        joblib.load(encoders_path),
+        version=version,
+        source_dir=models_dir
+    )
+    return _validate_and_warm_up(models, started)
+
+
+def _validate_and_warm_up(models, started):
+    loaded = time.perf_counter()
+    validate_model_set(models)
+    warm_up(models)
+    models.timings = {
+        'load_s': round(loaded - started, 4),
+        'warm_up_s': round(time.perf_counter() - loaded, 4)
+    }
+    return models
+
+
+class ModelWatcher:
+    """
+    Polls the models directory and calls on_change() when a new artifact set has been written
+    A change is only reported once the files have stopped changing for one poll interval,
+    so a training run that is still writing its pickles is not picked up half-way.
+    """
+
+    def __init__(self, models_dir, on_change, interval=5.0):
+        self.models_dir = models_dir
+        self.on_change = on_change
+        self.interval = interval
+        self._seen = artifact_signature(models_dir)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def poll(self, previous):
+        """One polling step; returns the signature to compare against next time"""
+        current = artifact_signature(self.models_dir)
+        if current != self._seen and current == previous and signature_complete(current):
+            self._seen = current
+            self.on_change()
+        return current
+
+    def _run(self):
+        previous = self._seen
+        while not self._stop.wait(self.interval):
+            try:
+                previous = self.poll(previous)
+            except Exception as e:
+                print(f"⚠️  Model watcher error: {e}")
@@ -0,0 +1,269 @@
+"""
+Online Feature Updates
+Running per-student aggregates for VLE click and assessment events ingested by the API. Each event
+updates its student's count, sum, mean, M2 (Welford) and min/max in O(1), so the event-derived
+features can be rescored at once instead of re-aggregating the whole event history.
+
+State for a student is seeded from its feature store row on its first event. The aggregates match
+aggregation.py's batch definitions: sample standard deviations, 0 for fewer than two values.
+"""
+
+import math
+import threading
+
+from feature_store import ASSESSMENT_EVENTS, VLE_EVENTS
+
+VLE = 'vle'
+ASSESSMENT = 'assessment'
+
+# Event fields per kind; 'type' may be omitted when the fields make the kind unambiguous
+EVENT_FIELDS = {
+    VLE: ('date', 'sum_click'),
+    ASSESSMENT: ('date_submitted', 'score'),
+}
+
+# Rejected events reported back per request
+MAX_ERRORS = 20
+
+
+class RunningStat:
+    """Count, sum, mean, M2 and min/max of a stream of values, updated in O(1) per value"""
+
+    __slots__ = ('count', 'total', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    @classmethod
+    def from_summary(cls, count, mean=math.nan, std=0.0, low=math.nan, high=math.nan, total=None):
+        """State equivalent to count values with the given mean, sample std and range"""
+        stat = cls()
+        stat.count = int(count)
+        stat.mean = float(mean)
+        stat.total = float(total) if total is not None else stat.mean * stat.count
+        stat.m2 = float(std) ** 2 * (stat.count - 1) if stat.count > 1 else 0.0
+        stat.min = float(low)
+        stat.max = float(high)
+        return stat
+
+    def add(self, value):
+        if value is None or math.isnan(value):
+            return
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def std(self):
+        """Sample standard deviation; 0 for fewer than two values, as the training features"""
+        return math.sqrt(max(self.m2, 0.0) / (self.count - 1)) if self.count > 1 else 0.0
+
+
+class StudentAggregates:
+    """The four running statistics behind one student's event features"""
+
+    __slots__ = ('score', 'submission', 'clicks', 'access')
+
+    def __init__(self):
+        self.score = RunningStat()
+        self.submission = RunningStat()
+        self.clicks = RunningStat()
+        self.access = RunningStat()
+
+    @classmethod
+    def from_features(cls, features, observed):
+        """
+        Seed from a student's stored features
+        Tables the student had no rows in (median-filled at training) start empty.
+        """
+        state = cls()
+        f = features
+        if observed & ASSESSMENT_EVENTS and f['num_assessments'] > 0:
+            n = f['num_assessments']
+            state.score = RunningStat.from_summary(n, f['avg_score'], f['std_score'], f['min_score'], f['max_score'])
+            # num_assessments counts scores; OULAD has a submission date on every assessment row
+            state.submission = RunningStat.from_summary(n, f['avg_submission_date'], f['std_submission_date'])
+        if observed & VLE_EVENTS and f['num_interactions'] > 0:
+            n = f['num_interactions']
+            state.clicks = RunningStat.from_summary(n, f['avg_clicks'], f['std_clicks'], high=f['max_clicks'],
+                                                    total=f['total_clicks'])
+            state.access = RunningStat.from_summary(n, low=f['first_access'], high=f['last_access'])
+        return state
+
+    def add(self, kind, values):
+        if kind == VLE:
+            date, sum_click = values
+            self.access.add(date)
+            self.clicks.add(sum_click)
+        else:
+            date_submitted, score = values
+            self.submission.add(date_submitted)
+            self.score.add(score)
+
+    def features(self):
+        """Event features as aggregation.py computes them; tables without values are left out"""
+        features = {}
+        if self.score.count:
+            features.update({
+                'avg_score': self.score.mean,
+                'std_score': self.score.std(),
+                'min_score': self.score.min,
+                'max_score': self.score.max,
+                'num_assessments': self.score.count,
+                'score_range': self.score.max - self.score.min,
+            })
+        if self.submission.count:
+            features['avg_submission_date'] = self.submission.mean
+            features['std_submission_date'] = self.submission.std()
+        if self.clicks.count:
+            features.update({
+                'total_clicks': self.clicks.total,
+                'avg_clicks': self.clicks.mean,
+                'std_clicks': self.clicks.std(),
+                'max_clicks': self.clicks.max,
+            })
+        if self.access.count:
+            features.update({
+                'num_interactions': self.access.count,
+                'first_access': self.access.min,
+                'last_access': self.access.max,
+                'access_duration': self.access.max - self.access.min,
+            })
+        return features
+
+
+def _number(event, field):
+    value = event.get(field)
+    if value is None or value == '' or value == '?':
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a number, got {value!r}")
+
+
+def parse_event(event):
+    """Return (kind, id_student, values) for one event dict, or raise ValueError"""
+    if not isinstance(event, dict):
+        raise ValueError("Event is not an object")
+    kind = event.get('type')
+    if kind is None:
+        kind = VLE if 'sum_click' in event else ASSESSMENT if 'score' in event else None
+    if kind not in EVENT_FIELDS:
+        raise ValueError(f"Unknown event type: {kind!r} (expected 'vle' or 'assessment')")
+    raw_id = event.get('id_student')
+    try:
+        student_id = int(raw_id)
+        if student_id != float(raw_id):
+            raise ValueError
+    except (TypeError, ValueError):
+        raise ValueError(f"id_student must be an integer, got {raw_id!r}")
+    values = tuple(_number(event, field) for field in EVENT_FIELDS[kind])
+    if all(math.isnan(value) for value in values):
+        raise ValueError(f"{kind} event has none of {', '.join(EVENT_FIELDS[kind])}")
+    return kind, student_id, values
+
+
+class OnlineFeatures:
+    """
+    Live event aggregates for the students of one feature store
+    Only students in the store are accepted, since scoring needs their stored static features.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.events = {VLE: 0, ASSESSMENT: 0}
+        self.rejected = 0
+        self._students = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._students)
+
+    def _state(self, student_id):
+        state = self._students.get(student_id)
+        if state is None:
+            row = self.store.find(student_id)
+            if row is None:
+                return None
+            features = dict(zip(self.store.numeric_cols, self.store.numeric[row].tolist()))
+            state = StudentAggregates.from_features(features, self.store.observed_at(row))
+            self._students[student_id] = state
+        return state
+
+    def ingest(self, events):
+        """
+        Apply a batch of events
+        events may be a generator over the request body: the whole batch is read and parsed before
+        the lock is taken, so a slow client does not hold up other ingests and feature reads.
+        Returns {'accepted': {kind: count}, 'rejected': count, 'errors': first MAX_ERRORS messages,
+        'student_ids': students updated, in first-seen order}.
+        """
+        parsed, failures, rejected = [], [], 0
+        for index, event in enumerate(events):
+            try:
+                parsed.append((index, *parse_event(event)))
+            except ValueError as e:
+                rejected += 1
+                if len(failures) < MAX_ERRORS:
+                    failures.append((index, e))
+
+        accepted, touched, unknown = {VLE: 0, ASSESSMENT: 0}, {}, []
+        with self._lock:
+            for index, kind, student_id, values in parsed:
+                state = self._state(student_id)
+                if state is None:
+                    rejected += 1
+                    if len(unknown) < MAX_ERRORS:
+                        unknown.append((index, f"Unknown id_student: {student_id}"))
+                    continue
+                state.add(kind, values)
+                accepted[kind] += 1
+                touched[student_id] = True
+            for kind, count in accepted.items():
+                self.events[kind] += count
+            self.rejected += rejected
+        errors = [f"Event {index}: {e}" for index, e in sorted(failures + unknown, key=lambda f: f[0])[:MAX_ERRORS]]
+        return {'accepted': accepted, 'rejected': rejected, 'errors': errors, 'student_ids': list(touched)}
+
+    def features(self, student_id):
+        """Live event features for one student, or None if no events were ingested for it"""
+        with self._lock:
+            state = self._students.get(student_id)
+            return state.features() if state is not None else None
+
+    def apply(self, record):
+        """Overlay live features on a stored record (dict) in place and return it"""
+        live = self.features(record['id_student'])
+        if live:
+            record.update(live)
+        return record
+
+    def apply_frame(self, df):
+        """Overlay live features on a DataFrame of stored rows in place and return it"""
+        if not self._students:
+            return df
+        with self._lock:
+            updates = [(i, self._students[student_id].features())
+                       for i, student_id in enumerate(df['id_student'].tolist()) if student_id in self._students]
+        for i, live in updates:
+            for col, value in live.items():
+                df.iat[i, df.columns.get_loc(col)] = value
+        return df
+
+    def stats(self):
+        return {
+            'students': len(self._students),
+            'vle_events': self.events[VLE],
+            'assessment_events': self.events[ASSESSMENT],
+            'rejected_events': self.rejected,
+            'store_version': self.store.version
+        }
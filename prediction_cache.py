@@ -0,0 +1,92 @@
+"""
+Prediction Cache
+Bounded LRU + TTL cache of model outputs keyed by feature vector and model version
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def feature_keys(X, version):
+    """
+    Canonical cache key for every row of an unscaled feature matrix
+    -0.0 and every NaN payload hash the same as 0.0 and NaN
+    """
+    X = np.asarray(X, dtype=np.float64) + 0.0
+    X[np.isnan(X)] = np.nan
+    X = np.ascontiguousarray(X)
+    prefix = str(version).encode('utf-8') + b'\0'
+    return [hashlib.blake2b(prefix + row.tobytes(), digest_size=16).digest() for row in X]
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with per-entry time-to-live and hit/miss counters"""
+
+    def __init__(self, maxsize=10000, ttl=300.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_many(self, keys):
+        """Look up all keys in one pass; returns the cached value or None for each key"""
+        now = self.clock()
+        values = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] <= now:
+                    del self._entries[key]
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    values.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    values.append(entry[1])
+        return values
+
+    def put_many(self, items):
+        """Store (key, value) pairs, evicting the least recently used entries beyond maxsize"""
+        if self.maxsize <= 0:
+            return
+        expires_at = self.clock() + self.ttl
+        with self._lock:
+            for key, value in items:
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def put(self, key, value):
+        self.put_many([(key, value)])
+
+    def clear(self):
+        """Drop every entry (e.g. when a new model is loaded); counters are kept"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
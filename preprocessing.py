@@ -0,0 +1,158 @@
+"""
+Feature Preprocessing
+Compiled categorical encoding and feature-matrix construction shared by the API and training
+"""
+
+import sys
+
+import numpy as np
+
+CATEGORICAL_COLS = ['code_module', 'code_presentation', 'gender', 'region',
+                    'highest_education', 'imd_band', 'age_band', 'disability']
+
+NUMERIC_COLS = [
+    'studied_credits', 'num_of_prev_attempts',
+    'avg_score', 'std_score', 'min_score', 'max_score', 'num_assessments',
+    'avg_submission_date', 'std_submission_date', 'score_range',
+    'total_clicks', 'avg_clicks', 'std_clicks', 'max_clicks',
+    'num_interactions', 'first_access', 'last_access', 'access_duration',
+    'avg_registration_date', 'num_unregistrations'
+]
+
+# Model input order (must match training order)
+FEATURE_COLS = [col + '_encoded' for col in CATEGORICAL_COLS] + NUMERIC_COLS
+
+# Code used for unseen or missing categories, matching the API's historical default. It is the
+# first fitted class of each LabelEncoder, not a bucket of its own: the scaler and forest never saw
+# an "unknown" value, so an unseen category is scored exactly as that class (unknown_categories()
+# names it, and /predict reports it in unknownCategories)
+UNKNOWN_CODE = 0
+
+
+class CategoricalEncoder:
+    """
+    LabelEncoders compiled into hashed lookup tables
+    Unknown values fall into UNKNOWN_CODE (the column's first class) row by row instead of failing
+    the whole column
+    """
+
+    def __init__(self, tables, source=None):
+        self.tables = tables
+        self.classes = {col: list(table) for col, table in tables.items()}
+        self.source = source
+        self._indexes = {}
+
+    @classmethod
+    def from_label_encoders(cls, label_encoders):
+        """Compile {column: LabelEncoder} into {column: {class: code}}"""
+        tables = {}
+        for col in CATEGORICAL_COLS:
+            if label_encoders is not None and col in label_encoders:
+                classes = [str(c) for c in label_encoders[col].classes_]
+                tables[col] = {c: code for code, c in enumerate(classes)}
+        return cls(tables, source=label_encoders)
+
+    def encode_value(self, col, value):
+        """Code for a single value, or None if it is unknown"""
+        return self.tables[col].get(str(value))
+
+    def class_name(self, col, code):
+        """The fitted class a code stands for (None if the column has no such class)"""
+        classes = self.classes[col]
+        return classes[code] if 0 <= code < len(classes) else None
+
+    def encode_column(self, col, values):
+        """Codes for a column of values plus the mask of rows that fell into the unknown bucket"""
+        # pandas is only needed for whole columns, so single-record scoring never imports it
+        import pandas as pd
+
+        if col not in self._indexes:
+            self._indexes[col] = pd.Index(self.classes[col])
+        codes = self._indexes[col].get_indexer(pd.Index(values).astype(str))
+        unknown = codes < 0
+        codes[unknown] = UNKNOWN_CODE
+        return codes, unknown
+
+
+def unknown_categories(record, encoder):
+    """{column: class it is scored as} for each categorical value of a record the encoders never saw"""
+    unknown = {}
+    for col in CATEGORICAL_COLS:
+        if col in record and col in encoder.tables and encoder.encode_value(col, record[col]) is None:
+            unknown[col] = encoder.class_name(col, UNKNOWN_CODE)
+    return unknown
+
+
+def build_feature_vector(record, encoder, dtype=np.float64):
+    """Single-record fast path: write a dict straight into a (1, n_features) row without pandas"""
+    X = np.zeros((1, len(FEATURE_COLS)), dtype=dtype)
+    row = X[0]
+
+    for i, col in enumerate(CATEGORICAL_COLS):
+        if col in record and col in encoder.tables:
+            code = encoder.encode_value(col, record[col])
+            if code is None:
+                print(f"⚠️  Unknown value for {col}: scored as {encoder.class_name(col, UNKNOWN_CODE)!r}")
+                code = UNKNOWN_CODE
+            row[i] = code
+
+    offset = len(CATEGORICAL_COLS)
+    for i, col in enumerate(NUMERIC_COLS, start=offset):
+        value = record.get(col, 0)
+        row[i] = np.nan if value is None else float(value)
+
+    return X
+
+
+def build_feature_matrix(df, encoder, dtype=np.float64):
+    """Batch path: build the (n_rows, n_features) matrix from a DataFrame in FEATURE_COLS order"""
+    X = np.zeros((len(df), len(FEATURE_COLS)), dtype=dtype)
+
+    for i, col in enumerate(CATEGORICAL_COLS):
+        if col in df.columns and col in encoder.tables:
+            codes, unknown = encoder.encode_column(col, df[col])
+            n_unknown = int(unknown.sum())
+            if n_unknown:
+                print(f"⚠️  {n_unknown} unknown value(s) for {col}: "
+                      f"scored as {encoder.class_name(col, UNKNOWN_CODE)!r}")
+            X[:, i] = codes
+
+    offset = len(CATEGORICAL_COLS)
+    for i, col in enumerate(NUMERIC_COLS, start=offset):
+        if col in df.columns:
+            X[:, i] = np.asarray(df[col], dtype=dtype)
+
+    return X
+
+
+class ArrayScaler:
+    """StandardScaler stand-in backed by plain mean/scale arrays (e.g. memory-mapped from a model bundle)"""
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+        self.with_mean = True
+        self.with_std = True
+        self.n_features_in_ = len(mean)
+
+    def transform(self, X):
+        return scale_features(self, np.asarray(X, dtype=self.mean_.dtype))
+
+
+def is_standard_scaler(scaler):
+    """isinstance(scaler, StandardScaler) without importing sklearn (an unpickled scaler already has)"""
+    module = sys.modules.get('sklearn.preprocessing')
+    return module is not None and isinstance(scaler, module.StandardScaler)
+
+
+def scale_features(scaler, X):
+    """Apply the fitted scaler to a feature matrix"""
+    if isinstance(scaler, ArrayScaler) or is_standard_scaler(scaler):
+        # Same arithmetic as StandardScaler.transform, minus the DataFrame/validation overhead
+        X = X.copy()
+        if scaler.with_mean:
+            X -= scaler.mean_
+        if scaler.with_std:
+            X /= scaler.scale_
+        return X
+    return scaler.transform(X)
@@ -0,0 +1,174 @@
+"""
+Request Profiling
+Opt-in profiling of single requests: a stack sampler (or cProfile) plus tracemalloc, written to a
+local directory as flame-graph input and the top allocation sites
+"""
+
+import cProfile
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+
+MODES = ('sampling', 'cprofile')
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack every `interval` seconds from a background thread
+    Stacks are counted in collapsed form ("outer;inner;leaf"), the input format of flamegraph.pl
+    and speedscope.
+    """
+
+    def __init__(self, thread_id, interval=0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if frames:
+                self.stacks[';'.join(reversed(frames))] += 1
+
+    def folded(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileSession:
+    """One profiled request: started and stopped on the request's own thread"""
+
+    def __init__(self, profiler, label):
+        self.profiler = profiler
+        self.label = label
+        self.profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.started = None
+        self._cprofile = None
+        self._sampler = None
+        self._started_tracemalloc = False
+
+    def start(self):
+        if self.profiler.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start(self.profiler.traceback_depth)
+            self._started_tracemalloc = True
+        if self.profiler.mode == 'cprofile':
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        else:
+            self._sampler = StackSampler(threading.get_ident(), self.profiler.interval).start()
+        self.started = time.perf_counter()
+        return self
+
+    def stop(self):
+        """Stop profiling, write the output files and return their paths"""
+        elapsed = time.perf_counter() - self.started
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        snapshot, peak = None, None
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        os.makedirs(self.profiler.output_dir, exist_ok=True)
+        base = os.path.join(self.profiler.output_dir, self.profile_id)
+        paths = []
+
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(base + '.prof')
+            paths.append(base + '.prof')
+        else:
+            with open(base + '.folded', 'w') as f:
+                f.write(self._sampler.folded())
+            paths.append(base + '.folded')
+
+        with open(base + '.txt', 'w') as f:
+            f.write(f"request: {self.label}\n")
+            f.write(f"mode: {self.profiler.mode}\n")
+            f.write(f"wall time: {elapsed * 1000:.2f} ms\n")
+            if self._sampler is not None:
+                f.write(f"samples: {sum(self._sampler.stacks.values())} every {self.profiler.interval * 1000:g} ms\n")
+            if peak is not None:
+                f.write(f"peak traced memory: {peak / 1024:.1f} KiB\n")
+            if snapshot is not None:
+                # tracemalloc is process-wide: allocations from concurrent requests are included
+                snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+                f.write(f"\ntop {self.profiler.top_allocations} allocation sites (live at end of request):\n")
+                for stat in snapshot.statistics('lineno')[:self.profiler.top_allocations]:
+                    frame = stat.traceback[0]
+                    f.write(f"{stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  {frame.filename}:{frame.lineno}\n")
+        paths.append(base + '.txt')
+
+        self.profiler.profiled += 1
+        return paths
+
+
+class RequestProfiler:
+    """
+    Decides which requests are profiled and runs one profile at a time
+    A request is profiled when it asks for it (the caller checks authorization) or when it falls
+    in the random `sample_rate` fraction. While another profile is running, requests are skipped.
+    """
+
+    def __init__(self, output_dir, sample_rate=0.0, mode='sampling', interval=0.001,
+                 trace_allocations=True, top_allocations=25, traceback_depth=1):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.mode = mode
+        self.interval = interval
+        self.trace_allocations = trace_allocations
+        self.top_allocations = top_allocations
+        self.traceback_depth = traceback_depth
+        self.profiled = 0
+        self._busy = threading.Lock()
+
+    def wants(self, requested):
+        return requested or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def start(self, label):
+        """Start a session, or return None if another request is being profiled"""
+        if not self._busy.acquire(blocking=False):
+            return None
+        try:
+            return ProfileSession(self, label).start()
+        except Exception:
+            self._busy.release()
+            raise
+
+    def finish(self, session):
+        try:
+            return session.stop()
+        finally:
+            self._busy.release()
+
+    def stats(self):
+        return {
+            'mode': self.mode,
+            'sample_rate': self.sample_rate,
+            'output_dir': self.output_dir,
+            'profiled': self.profiled
+        }
@@ -0,0 +1,239 @@
+"""
+Out-of-core Training
+Trains the Isolation Forest from a stream of merged per-student feature rows instead of one
+in-memory DataFrame. One pass over the rows collects everything the preprocessing needs (numeric
+moments, category counts, a median sample) and a uniform reservoir sample of the training rows
+the trees are grown on; a second pass scores the holdout rows chunk by chunk. Memory is set by
+the sample sizes and the chunk size, not by the number of students.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from aggregation import CHUNK_ROWS, GroupedMoments
+from data_cache import CachedTable, csv_na_values
+from preprocessing import CATEGORICAL_COLS, FEATURE_COLS, NUMERIC_COLS, CategoricalEncoder, build_feature_matrix
+
+# Rows kept to estimate the fill medians (exact while the population is no larger)
+MEDIAN_SAMPLE_ROWS = 200000
+
+# Fraction of students held out for evaluation, as train_model.py's train_test_split
+TEST_FRACTION = 0.3
+SEED = 42
+
+
+def _merge_key(chunk):
+    return chunk.assign(_all=0)
+
+
+class ReservoirSample:
+    """
+    Uniform sample without replacement of at most size rows from a stream of DataFrame chunks
+    Every row gets a random priority and the size lowest are kept, so the sample does not depend on
+    how the stream was chunked and never holds more than size + one chunk of rows.
+    """
+
+    def __init__(self, size, seed=SEED):
+        self.size = size
+        self.rows = 0
+        self._rng = np.random.default_rng(seed)
+        self._keys = np.empty(0)
+        self._frame = None
+
+    def update(self, chunk):
+        keys = self._rng.random(len(chunk))
+        self.rows += len(chunk)
+        if self._frame is not None and len(self._frame) >= self.size:
+            # Full: only rows that beat the current worst priority can get in
+            candidates = keys < self._keys.max()
+            chunk, keys = chunk[candidates], keys[candidates]
+            if not len(chunk):
+                return self
+        frame = chunk if self._frame is None else pd.concat([self._frame, chunk], ignore_index=True)
+        keys = np.concatenate([self._keys, keys])
+        if len(frame) > self.size:
+            keep = np.sort(np.argpartition(keys, self.size - 1)[:self.size])
+            frame, keys = frame.iloc[keep].reset_index(drop=True), keys[keep]
+        self._frame, self._keys = frame, keys
+        return self
+
+    def frame(self):
+        return self._frame if self._frame is not None else pd.DataFrame()
+
+
+def holdout_mask(ids, fraction=TEST_FRACTION, seed=SEED):
+    """
+    True for students in the holdout: a hash of id_student, so a student lands on the same side in
+    every pass and every run, whatever the chunking
+    """
+    x = np.asarray(ids, dtype=np.int64).astype(np.uint64) + np.uint64(seed * 0x9E3779B97F4A7C15 % 2 ** 64)
+    # splitmix64 finalizer
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    x = x ^ (x >> np.uint64(31))
+    return (x >> np.uint64(11)).astype(np.float64) * 2.0 ** -53 < fraction
+
+
+def student_chunks(source, chunk_rows=None):
+    """studentInfo in chunks, from a cached table or a CSV path (parsed as data_cache.read_table does)"""
+    if isinstance(source, CachedTable):
+        return source.chunks(None, chunk_rows or CHUNK_ROWS)
+    return pd.read_csv(source, na_values=csv_na_values(source), chunksize=chunk_rows or CHUNK_ROWS)
+
+
+def merged_rows(students, aggregates, chunk_rows=None):
+    """
+    Merged per-student rows with the is_anomaly label, chunk by chunk
+    aggregates are the per-student feature frames (aggregation.py), joined on id_student.
+    """
+    for chunk in student_chunks(students, chunk_rows):
+        for features in aggregates:
+            chunk = chunk.merge(features, on='id_student', how='left')
+        chunk['is_anomaly'] = ((chunk['final_result'] == 'Fail') |
+                               (chunk['final_result'] == 'Withdrawn')).astype(int)
+        yield chunk
+
+
+class FeatureStats:
+    """
+    Everything preprocessing needs, collected in one pass: moments of the observed numeric values,
+    per-category counts and a row sample for the fill medians
+    """
+
+    def __init__(self, median_sample_rows=MEDIAN_SAMPLE_ROWS, seed=SEED):
+        self.moments = GroupedMoments('_all', NUMERIC_COLS)
+        self.category_counts = {col: {} for col in CATEGORICAL_COLS}
+        self.category_values = {col: [] for col in CATEGORICAL_COLS}
+        self.median_sample = ReservoirSample(median_sample_rows, seed=seed + 1)
+        self.rows = 0
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+        self.moments.update(_merge_key(chunk[NUMERIC_COLS]))
+        self.median_sample.update(chunk[NUMERIC_COLS])
+        for col in CATEGORICAL_COLS:
+            # The same strings LabelEncoder is fitted on in train_model.py
+            values = chunk[col].astype(str)
+            counts = self.category_counts[col]
+            for value, count in values.value_counts(dropna=False).items():
+                key = str(value)
+                if key not in counts:
+                    self.category_values[col].append(value)
+                counts[key] = counts.get(key, 0) + int(count)
+        return self
+
+    def medians(self):
+        sample = self.median_sample.frame()
+        return {col: float(sample[col].median()) for col in NUMERIC_COLS}
+
+    def label_encoders(self):
+        return {col: LabelEncoder().fit(pd.Series(self.category_values[col], dtype=object))
+                for col in CATEGORICAL_COLS}
+
+    def scaler(self, medians, label_encoders):
+        """
+        StandardScaler of the filled, encoded feature matrix, without materializing it
+        Categorical code moments come from the category counts; each numeric column's observed
+        moments are merged with its missing rows, which are filled with the median.
+        """
+        n = self.rows
+        means, variances = [], []
+        encoder = CategoricalEncoder.from_label_encoders(label_encoders)
+        for col in CATEGORICAL_COLS:
+            counts = self.category_counts[col]
+            codes = np.array([encoder.tables[col][key] for key in counts], dtype=np.float64)
+            weights = np.array(list(counts.values()), dtype=np.float64)
+            mean = float(np.dot(weights, codes) / n)
+            means.append(mean)
+            variances.append(float(np.dot(weights, (codes - mean) ** 2) / n))
+        for col in NUMERIC_COLS:
+            n_observed = float(self.moments.count[col].iloc[0])
+            n_missing = n - n_observed
+            median = medians[col]
+            mean_observed = float(self.moments.total[col].iloc[0]) / n_observed if n_observed else 0.0
+            mean = (mean_observed * n_observed + median * n_missing) / n
+            m2 = (float(self.moments.m2[col].iloc[0]) + n_observed * (mean_observed - mean) ** 2
+                  + n_missing * (median - mean) ** 2)
+            means.append(mean)
+            variances.append(m2 / n)
+
+        scaler = StandardScaler()
+        scaler.mean_ = np.array(means)
+        scaler.var_ = np.array(variances)
+        # StandardScaler leaves constant features unscaled
+        scaler.scale_ = np.where(scaler.var_ > 0, np.sqrt(scaler.var_), 1.0)
+        scaler.n_samples_seen_ = n
+        scaler.n_features_in_ = len(FEATURE_COLS)
+        scaler.feature_names_in_ = np.array(FEATURE_COLS, dtype=object)
+        return scaler
+
+
+def feature_matrix(chunk, medians, encoder, scaler):
+    """Filled, encoded and scaled features of a chunk of merged rows"""
+    chunk = chunk.fillna({col: medians[col] for col in NUMERIC_COLS})
+    X = build_feature_matrix(chunk, encoder)
+    return (X - scaler.mean_) / scaler.scale_
+
+
+def train(rows, params, sample_rows=None, median_sample_rows=MEDIAN_SAMPLE_ROWS,
+          test_fraction=TEST_FRACTION, seed=SEED):
+    """
+    Fit the forest from rows, a callable returning a fresh iterator of merged-row chunks
+    (called twice: one pass to collect statistics and the training sample, one to evaluate).
+    params are IsolationForest settings; contamination None means the training label rate.
+    The training sample holds n_estimators x max_samples rows by default, so each tree draws its
+    max_samples rows from a uniform sample as large as all trees use together.
+    Returns (model, scaler, label_encoders, report).
+    """
+    params = dict(params)
+    sample_rows = sample_rows or params['n_estimators'] * params['max_samples']
+    stats = FeatureStats(median_sample_rows, seed=seed)
+    sample = ReservoirSample(sample_rows, seed=seed)
+    train_rows = train_anomalies = 0
+
+    started = time.perf_counter()
+    for chunk in rows():
+        stats.update(chunk)
+        training = chunk[~holdout_mask(chunk['id_student'], test_fraction, seed)]
+        sample.update(training[CATEGORICAL_COLS + NUMERIC_COLS])
+        train_rows += len(training)
+        train_anomalies += int(training['is_anomaly'].sum())
+    print(f"✓ Pass 1: {stats.rows} students, {train_rows} for training, "
+          f"{len(sample.frame())}-row sample ({time.perf_counter() - started:.1f}s)")
+
+    medians = stats.medians()
+    label_encoders = stats.label_encoders()
+    scaler = stats.scaler(medians, label_encoders)
+    encoder = CategoricalEncoder.from_label_encoders(label_encoders)
+
+    if params.get('contamination') is None:
+        params['contamination'] = min(train_anomalies / max(train_rows, 1), 0.5)
+    X_sample = feature_matrix(sample.frame(), medians, encoder, scaler)
+    model = IsolationForest(**params, random_state=seed, verbose=0).fit(X_sample)
+
+    started = time.perf_counter()
+    confusion = np.zeros((2, 2), dtype=np.int64)
+    for chunk in rows():
+        holdout = chunk[holdout_mask(chunk['id_student'], test_fraction, seed)]
+        if not len(holdout):
+            continue
+        predicted = (model.predict(feature_matrix(holdout, medians, encoder, scaler)) == -1).astype(int)
+        np.add.at(confusion, (holdout['is_anomaly'].to_numpy(), predicted), 1)
+    tp, fp, fn = confusion[1, 1], confusion[0, 1], confusion[1, 0]
+    report = {
+        'rows': stats.rows,
+        'train_rows': train_rows,
+        'sample_rows': len(X_sample),
+        'test_rows': int(confusion.sum()),
+        'contamination': params['contamination'],
+        'confusion': confusion.tolist(),
+        'precision': float(tp / (tp + fp)) if tp + fp else 0.0,
+        'recall': float(tp / (tp + fn)) if tp + fn else 0.0,
+        'f1': float(2 * tp / (2 * tp + fp + fn)) if tp else 0.0
+    }
+    print(f"✓ Pass 2: evaluated {report['test_rows']} holdout students ({time.perf_counter() - started:.1f}s)")
+    return model, scaler, label_encoders, report
@@ -0,0 +1,67 @@
+"""
+Batch Response Formats
+Content negotiation for /predict_batch and the encoders of its compact columnar format.
+
+- rows (default): {"summary", "predictions": [record, ...], "modelVersion"}, what batch.html reads
+- columns: the same results as one array per field (risk_engine.build_batch_columns()), with the
+  repeated texts replaced by indexes into a string table sent once, as JSON
+- msgpack: the columns body as MessagePack
+
+The format is picked by ?format=rows|columns|msgpack, or else by the Accept header
+(application/msgpack, or COLUMNS_MIMETYPE for JSON columns). MessagePack is written by the msgpack
+package.
+"""
+
+import msgpack
+import numpy as np
+
+ROWS = 'rows'
+COLUMNS = 'columns'
+MSGPACK = 'msgpack'
+FORMATS = (ROWS, COLUMNS, MSGPACK)
+
+JSON_MIMETYPE = 'application/json'
+COLUMNS_MIMETYPE = 'application/vnd.student-risk.columns+json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+MSGPACK_MIMETYPES = (MSGPACK_MIMETYPE, 'application/x-msgpack', 'application/vnd.msgpack')
+
+
+def negotiate(format_param, accept):
+    """
+    Response format for a request, or ValueError for an unknown ?format=
+    accept is the request's Accept header (werkzeug MIMEAccept); JSON rows win ties, so */* and
+    plain application/json keep the original format.
+    """
+    if format_param:
+        if format_param not in FORMATS:
+            raise ValueError(f"Unknown format: {format_param} (expected one of {', '.join(FORMATS)})")
+        return format_param
+    best = accept.best_match((JSON_MIMETYPE, COLUMNS_MIMETYPE) + MSGPACK_MIMETYPES) if accept else None
+    if best in MSGPACK_MIMETYPES:
+        return MSGPACK
+    if best == COLUMNS_MIMETYPE:
+        return COLUMNS
+    return ROWS
+
+
+def to_builtin(value):
+    """Numpy arrays and scalars in a body replaced by lists and Python numbers, for JSON"""
+    if isinstance(value, dict):
+        return {key: to_builtin(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_builtin(item) for item in value]
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    return value
+
+
+def _msgpack_default(value):
+    """msgpack hook for the numpy columns and scalars of a body"""
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    raise TypeError(f"Cannot encode {type(value).__name__} as MessagePack")
+
+
+def packb(body):
+    """MessagePack encoding of a body (numpy arrays become MessagePack arrays)"""
+    return msgpack.packb(body, default=_msgpack_default)
@@ -0,0 +1,410 @@
+"""
+Columnar Risk Engine
+Vectorized versions of the per-student risk rules in app.py, applied to a whole batch at once
+"""
+
+import numpy as np
+
+import metrics
+
+# Names of every risk factor analyze_risk_factors() can report, in the order it reports them
+RISK_FACTORS = (
+    'Very Low Average Score',
+    'Low Average Score',
+    'Very Low Platform Engagement',
+    'Low Platform Engagement',
+    'Few Assessments Completed',
+    'Multiple Previous Attempts',
+    'Consistently Late Submissions',
+    'Very Low Learning Activity',
+    'Suspicious Pattern: High Scores with Low Engagement',
+    'Late Course Start',
+)
+
+RECOMMENDATION_LOW = "Student appears to be performing well. Continue standard monitoring."
+RECOMMENDATION_URGENT = "⚠️ Immediate intervention recommended. Primary concerns: {}"
+RECOMMENDATION_URGENT_GENERIC = "⚠️ Immediate intervention recommended. Student showing multiple risk factors."
+RECOMMENDATION_CHECK_IN = "Schedule check-in with student within 1 week to address concerns."
+RECOMMENDATION_MONITOR = "Monitor closely and consider reaching out to offer support."
+
+RISK_LEVELS = ('High', 'Medium', 'Low')
+
+_FACTOR_BITS = 1 << np.arange(len(RISK_FACTORS), dtype=np.int64)
+
+
+def _column(frame, name, default):
+    """Read a numeric column, using the default where it is missing or null (like dict.get)"""
+    if name not in frame:
+        return np.full(len(frame), default, dtype=np.float64)
+    values = np.asarray(frame[name], dtype=np.float64)
+    return np.where(np.isnan(values), default, values)
+
+
+def compute_risk_scores(raw_scores, predictions, frame):
+    """Columnar equivalent of calculate_risk_score_advanced() for every row of frame"""
+    raw_scores = np.asarray(raw_scores, dtype=np.float64)
+    predictions = np.asarray(predictions)
+
+    base_risk = np.select(
+        [raw_scores >= -0.45, raw_scores >= -0.50, raw_scores >= -0.55, raw_scores >= -0.60,
+         raw_scores >= -0.70, raw_scores >= -0.80, raw_scores >= -1.0],
+        [0, 10, 25, 40, 55, 70, 85],
+        default=95
+    )
+
+    avg_score = _column(frame, 'avg_score', 50)
+    total_clicks = _column(frame, 'total_clicks', 500)
+    num_assessments = _column(frame, 'num_assessments', 5)
+    num_interactions = _column(frame, 'num_interactions', 10)
+    prev_attempts = _column(frame, 'num_of_prev_attempts', 0)
+
+    risk_adjustment = np.select(
+        [avg_score < 30, avg_score < 40, avg_score < 50, avg_score > 85, avg_score > 75],
+        [25, 15, 8, -15, -10]
+    )
+    risk_adjustment += np.select(
+        [total_clicks < 200, total_clicks < 400, total_clicks < 600, total_clicks > 1200, total_clicks > 900],
+        [20, 12, 5, -15, -10]
+    )
+    risk_adjustment += np.select(
+        [num_assessments < 3, num_assessments < 5, num_assessments >= 8],
+        [12, 5, -8]
+    )
+    risk_adjustment += np.select(
+        [num_interactions < 5, num_interactions < 8, num_interactions >= 15],
+        [10, 5, -8]
+    )
+    risk_adjustment += np.select(
+        [prev_attempts >= 3, prev_attempts >= 2, prev_attempts >= 1],
+        [15, 10, 5]
+    )
+    risk_adjustment += np.where((avg_score > 85) & (total_clicks < 300), 20, 0)
+
+    final_risk = np.clip(base_risk + risk_adjustment, 0, 100)
+
+    # Overrides, applied in the same order as the per-row function
+    keep_low = (predictions == 1) & (avg_score > 70) & (total_clicks > 800)
+    final_risk = np.where(keep_low, np.minimum(final_risk, 30), final_risk)
+    force_high = (predictions == -1) & ((avg_score < 40) | (total_clicks < 300))
+    final_risk = np.where(force_high, np.maximum(final_risk, 60), final_risk)
+
+    return final_risk.astype(np.float64)
+
+
+def detect_risk_factors(frame):
+    """
+    Columnar equivalent of analyze_risk_factors()
+    Returns (flags, high_severity): boolean matrices with one column per entry of RISK_FACTORS
+    """
+    avg_score = _column(frame, 'avg_score', 50)
+    total_clicks = _column(frame, 'total_clicks', 0)
+    num_assessments = _column(frame, 'num_assessments', 0)
+    prev_attempts = _column(frame, 'num_of_prev_attempts', 0)
+    avg_submission = _column(frame, 'avg_submission_date', 0)
+    num_interactions = _column(frame, 'num_interactions', 0)
+    first_access = _column(frame, 'first_access', 0)
+
+    flags = np.column_stack([
+        avg_score < 40,
+        (avg_score >= 40) & (avg_score < 60),
+        total_clicks < 200,
+        (total_clicks >= 200) & (total_clicks < 500),
+        num_assessments < 3,
+        prev_attempts > 1,
+        avg_submission > 150,
+        num_interactions < 5,
+        (avg_score > 85) & (total_clicks < 300),
+        first_access > 50,
+    ]).reshape(len(avg_score), len(RISK_FACTORS))
+
+    high_severity = flags.copy()
+    high_severity[:, [1, 3, 5, 6, 9]] = False
+    high_severity[:, 4] &= num_assessments < 2
+
+    return flags, high_severity
+
+
+def _factor_bits(flags):
+    """Pack each row of a factor matrix into an integer bitmask"""
+    return flags.astype(np.int64) @ _FACTOR_BITS
+
+
+def _names_for_bits(bits, limit):
+    """Names of the first `limit` factors set in a bitmask"""
+    return [name for i, name in enumerate(RISK_FACTORS) if bits >> i & 1][:limit]
+
+
+def top_risk_factor_sets(flags, limit=3):
+    """
+    Distinct top-factor lists and each row's index into them
+    Names are computed once per distinct factor pattern.
+    """
+    patterns, inverse = np.unique(_factor_bits(flags), return_inverse=True)
+    return [_names_for_bits(int(bits), limit) for bits in patterns], inverse.ravel()
+
+
+def top_risk_factors(flags, limit=3):
+    """Names of the first `limit` risk factors of every row"""
+    names, inverse = top_risk_factor_sets(flags, limit)
+    return [names[i] for i in inverse]
+
+
+def recommendation_codes(risk_scores, high_severity):
+    """select_recommendations() as (texts, each row's index into texts); a text may appear twice"""
+    risk_scores = np.asarray(risk_scores, dtype=np.float64)
+    texts = [RECOMMENDATION_LOW, RECOMMENDATION_CHECK_IN, RECOMMENDATION_MONITOR]
+    codes = np.select([risk_scores < 30, (risk_scores > 50) & (risk_scores <= 70)], [0, 1], default=2)
+
+    urgent = risk_scores > 70
+    if urgent.any():
+        patterns, inverse = np.unique(_factor_bits(high_severity[urgent]), return_inverse=True)
+        for bits in patterns:
+            main_issues = _names_for_bits(int(bits), 2)
+            if main_issues:
+                texts.append(RECOMMENDATION_URGENT.format(', '.join(main_issues)))
+            else:
+                texts.append(RECOMMENDATION_URGENT_GENERIC)
+        codes[urgent] = 3 + inverse.ravel()
+
+    return texts, codes
+
+
+def select_recommendations(risk_scores, high_severity):
+    """Columnar equivalent of generate_recommendation(), returned as an object array of strings"""
+    texts, codes = recommendation_codes(risk_scores, high_severity)
+    return np.array(texts, dtype=object)[codes]
+
+
+def risk_level_codes(risk_scores):
+    """Index into RISK_LEVELS of every risk score"""
+    risk_scores = np.asarray(risk_scores, dtype=np.float64)
+    return np.select([risk_scores > 70, risk_scores > 40], [0, 1], default=2)
+
+
+def risk_levels(risk_scores):
+    """'High' / 'Medium' / 'Low' label for every risk score"""
+    return np.array(RISK_LEVELS, dtype=object)[risk_level_codes(risk_scores)]
+
+
+def score_batch(frame, raw_scores, predictions):
+    """
+    Run the full rule set over a batch and return the per-row columns
+    The text columns come with their dictionary encodings too (factorSets + topRiskFactorCodes,
+    recommendations + recommendationCodes), which the columnar response format sends instead.
+    """
+    risk_scores = compute_risk_scores(raw_scores, predictions, frame)
+    flags, high_severity = detect_risk_factors(frame)
+    factor_sets, factor_codes = top_risk_factor_sets(flags)
+    texts, codes = recommendation_codes(risk_scores, high_severity)
+    return {
+        'riskScore': risk_scores,
+        'isAtRisk': risk_scores >= 50,
+        'riskLevel': risk_levels(risk_scores),
+        'numRiskFactors': flags.sum(axis=1),
+        'topRiskFactors': [factor_sets[i] for i in factor_codes],
+        'recommendation': np.array(texts, dtype=object)[codes],
+        'factorSets': factor_sets,
+        'topRiskFactorCodes': factor_codes,
+        'recommendations': texts,
+        'recommendationCodes': codes,
+    }
+
+
+def _echo_column(frame, name):
+    """Raw input values echoed back in batch results, 0 where missing"""
+    if name not in frame:
+        return [0] * len(frame)
+    return frame[name].fillna(0).tolist()
+
+
+def build_batch_results(frame, columns, raw_scores, predictions, student_ids):
+    """Build the /predict_batch result records from the columns returned by score_batch()"""
+    return [
+        {
+            'student_id': student_id,
+            'isAtRisk': is_at_risk,
+            'riskScore': risk_score,
+            'anomalyScore': anomaly_score,
+            'prediction': prediction,
+            'confidence': 0.85,
+            'riskLevel': risk_level,
+            'numRiskFactors': num_factors,
+            'topRiskFactors': top_factors,
+            'recommendation': recommendation,
+            'avg_score': avg_score,
+            'total_clicks': total_clicks,
+            'num_assessments': num_assessments
+        }
+        for (student_id, is_at_risk, risk_score, anomaly_score, prediction, risk_level, num_factors,
+             top_factors, recommendation, avg_score, total_clicks, num_assessments) in zip(
+            student_ids,
+            columns['isAtRisk'].tolist(),
+            columns['riskScore'].tolist(),
+            np.asarray(raw_scores, dtype=np.float64).tolist(),
+            np.asarray(predictions).astype(int).tolist(),
+            columns['riskLevel'].tolist(),
+            columns['numRiskFactors'].tolist(),
+            columns['topRiskFactors'],
+            columns['recommendation'].tolist(),
+            _echo_column(frame, 'avg_score'),
+            _echo_column(frame, 'total_clicks'),
+            _echo_column(frame, 'num_assessments')
+        )
+    ]
+
+
+def _echo_array(frame, name):
+    """_echo_column() as an array when the column is numeric"""
+    if name in frame and frame[name].dtype.kind in 'biuf':
+        return frame[name].fillna(0).to_numpy()
+    return _echo_column(frame, name)
+
+
+class StringTable:
+    """Distinct strings in first-seen order, each with its index"""
+
+    def __init__(self, strings=()):
+        self.strings = []
+        self.index = {}
+        for string in strings:
+            self.add(string)
+
+    def add(self, string):
+        code = self.index.get(string)
+        if code is None:
+            code = self.index[string] = len(self.strings)
+            self.strings.append(string)
+        return code
+
+
+def build_batch_columns(frame, columns, raw_scores, predictions, student_ids):
+    """
+    The /predict_batch results as columns instead of records
+    riskLevel and recommendation are indexes into one string table, sent once; topRiskFactors
+    indexes factorSets, the distinct factor lists, each a list of string indexes. Columns are numpy
+    arrays where the values allow; batch_results_from_columns() turns this back into the records.
+    """
+    strings = StringTable(RISK_LEVELS + RISK_FACTORS)
+    recommendation_index = np.array([strings.add(text) for text in columns['recommendations']], dtype=np.int64)
+    factor_sets = [[strings.add(name) for name in names] for names in columns['factorSets']]
+    return {
+        'rows': len(columns['riskScore']),
+        'strings': strings.strings,
+        'factorSets': factor_sets,
+        'constants': {'confidence': 0.85},
+        'columns': {
+            'student_id': student_ids,
+            'isAtRisk': np.asarray(columns['isAtRisk'], dtype=bool),
+            'riskScore': np.asarray(columns['riskScore'], dtype=np.float64),
+            'anomalyScore': np.asarray(raw_scores, dtype=np.float64),
+            'prediction': np.asarray(predictions).astype(np.int64),
+            'riskLevel': risk_level_codes(columns['riskScore']),
+            'numRiskFactors': np.asarray(columns['numRiskFactors'], dtype=np.int64),
+            'topRiskFactors': np.asarray(columns['topRiskFactorCodes'], dtype=np.int64),
+            'recommendation': recommendation_index[columns['recommendationCodes']],
+            'avg_score': _echo_array(frame, 'avg_score'),
+            'total_clicks': _echo_array(frame, 'total_clicks'),
+            'num_assessments': _echo_array(frame, 'num_assessments')
+        }
+    }
+
+
+def _values(column):
+    return column.tolist() if isinstance(column, np.ndarray) else list(column)
+
+
+def batch_results_from_columns(body):
+    """The result records of a columnar body (build_batch_columns() output, or its decoded JSON/MessagePack)"""
+    strings = body['strings']
+    factor_sets = [[strings[i] for i in codes] for codes in body['factorSets']]
+    columns = {name: _values(column) for name, column in body['columns'].items()}
+    confidence = body['constants']['confidence']
+    return [
+        {
+            'student_id': student_id,
+            'isAtRisk': is_at_risk,
+            'riskScore': risk_score,
+            'anomalyScore': anomaly_score,
+            'prediction': prediction,
+            'confidence': confidence,
+            'riskLevel': strings[risk_level],
+            'numRiskFactors': num_factors,
+            'topRiskFactors': factor_sets[factor_set],
+            'recommendation': strings[recommendation],
+            'avg_score': avg_score,
+            'total_clicks': total_clicks,
+            'num_assessments': num_assessments
+        }
+        for (student_id, is_at_risk, risk_score, anomaly_score, prediction, risk_level, num_factors,
+             factor_set, recommendation, avg_score, total_clicks, num_assessments) in zip(
+            *(columns[name] for name in ('student_id', 'isAtRisk', 'riskScore', 'anomalyScore', 'prediction',
+                                         'riskLevel', 'numRiskFactors', 'topRiskFactors', 'recommendation',
+                                         'avg_score', 'total_clicks', 'num_assessments'))
+        )
+    ]
+
+
+def score_students(frame, models, first_index=0, columnar=False, predict=None):
+    """
+    Score a DataFrame of students with a ModelSet and return (risk columns, results)
+    The one pipeline behind /predict_batch, /predict_stream, /events and batch jobs: the model
+    (models.encode/scale/score, or predict(frame, models), e.g. the API's prediction cache), then
+    the columnar risk rules. results are the result records, or the build_batch_columns() body.
+    Rows without a student_id are numbered from first_index.
+    """
+    if 'student_id' in frame.columns:
+        student_ids = frame['student_id'].tolist()
+    else:
+        student_ids = list(range(first_index, first_index + len(frame)))
+
+    if predict is None:
+        predictions, raw_scores = models.score(models.scale(models.encode(frame)))
+    else:
+        predictions, raw_scores = predict(frame, models)
+
+    with metrics.stage('risk_batch'):
+        columns = score_batch(frame, raw_scores, predictions)
+        build = build_batch_columns if columnar else build_batch_results
+        results = build(frame, columns, raw_scores, predictions, student_ids)
+    return columns, results
+
+
+class BatchSummary:
+    """Running totals for the summary block, so chunked batches can be summarized incrementally"""
+
+    def __init__(self):
+        self.total = 0
+        self.at_risk = 0
+        self.high_risk = 0
+        self.medium_risk = 0
+        self.low_risk = 0
+        self.risk_sum = 0.0
+
+    def update(self, risk_scores, is_at_risk):
+        """Add one chunk of risk scores"""
+        risk_scores = np.asarray(risk_scores, dtype=np.float64)
+        self.total += len(risk_scores)
+        self.at_risk += int(np.count_nonzero(is_at_risk))
+        self.high_risk += int(np.count_nonzero(risk_scores > 70))
+        self.medium_risk += int(np.count_nonzero((risk_scores > 40) & (risk_scores <= 70)))
+        self.low_risk += int(np.count_nonzero(risk_scores <= 40))
+        self.risk_sum += float(risk_scores.sum())
+        return self
+
+    def as_dict(self):
+        """Summary block of a batch response"""
+        total = self.total
+        return {
+            'total_students': total,
+            'at_risk_count': self.at_risk,
+            'at_risk_percentage': round((self.at_risk / total) * 100, 1) if total else 0.0,
+            'high_risk_count': self.high_risk,
+            'medium_risk_count': self.medium_risk,
+            'low_risk_count': self.low_risk,
+            'average_risk_score': round(self.risk_sum / total, 1) if total else 0.0
+        }
+
+
+def summarize_batch(risk_scores, is_at_risk):
+    """Summary block of a /predict_batch response"""
+    return BatchSummary().update(risk_scores, is_at_risk).as_dict()
@@ -0,0 +1,184 @@
+"""
+Sharded Scoring
+Splits very large batches across a process pool: the feature matrix, the flattened forest and the
+outputs all live in shared memory, so shards exchange only names and row ranges
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from forest_engine import FlatForest
+
+FOREST_ARRAYS = ('feature', 'threshold', 'children', 'missing_left', 'leaf_value', 'roots')
+FOREST_PARAMS = ('max_depth', 'normalizer', 'offset', 'n_features')
+
+# Per pool process: the forest attached for the current model, reused across shards
+_worker_forest = {'key': None, 'forest': None, 'blocks': []}
+
+
+def available_cpus():
+    """CPUs this process may run on (respects taskset/cgroup affinity where the OS exposes it)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class SharedArray:
+    """A NumPy array backed by a named shared memory block"""
+
+    def __init__(self, shape, dtype, name=None):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        nbytes = max(1, int(np.prod(self.shape)) * self.dtype.itemsize)
+        if name is None:
+            self.block = shared_memory.SharedMemory(create=True, size=nbytes)
+            self.owner = True
+        else:
+            # Pool processes share the parent's resource tracker, so attaching does not change who unlinks
+            self.block = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.block.buf)
+
+    @classmethod
+    def copy_of(cls, array):
+        shared = cls(array.shape, array.dtype)
+        shared.array[...] = array
+        return shared
+
+    @property
+    def spec(self):
+        """What another process needs to attach: (name, shape, dtype)"""
+        return self.block.name, self.shape, self.dtype.str
+
+    def close(self):
+        self.array = None
+        self.block.close()
+        if self.owner:
+            self.block.unlink()
+
+
+def _score_shard(forest_key, forest_specs, params, inputs, outputs, start, stop):
+    """Pool task: score rows [start, stop) of the shared input into the shared outputs"""
+    if _worker_forest['key'] != forest_key:
+        # Drop the old forest first: its arrays are views into the blocks being closed
+        _worker_forest['forest'] = None
+        for shared in _worker_forest['blocks']:
+            shared.close()
+        blocks = {name: SharedArray(shape, dtype, name=shm) for name, (shm, shape, dtype) in forest_specs.items()}
+        _worker_forest.update(
+            key=forest_key,
+            forest=FlatForest(**{name: blocks[name].array for name in FOREST_ARRAYS}, **params),
+            blocks=list(blocks.values())
+        )
+
+    X = SharedArray(*inputs[1:], name=inputs[0])
+    raw_scores = SharedArray(*outputs[0][1:], name=outputs[0][0])
+    labels = SharedArray(*outputs[1][1:], name=outputs[1][0])
+    try:
+        raw_scores.array[start:stop], labels.array[start:stop] = _worker_forest['forest'].score(X.array[start:stop])
+    finally:
+        for shared in (X, raw_scores, labels):
+            shared.close()
+    return stop - start
+
+
+class ShardedScorer:
+    """
+    Scores large scaled feature matrices across `workers` processes
+    Batches below min_rows (or when only one worker is available, or the model has no flattened
+    forest) are scored in-process. Each shard writes its own slice of the output arrays, so
+    results come back in input order without a merge step.
+    """
+
+    def __init__(self, workers=0, min_rows=20000, shards_per_worker=2):
+        self.workers = workers if workers > 0 else available_cpus()
+        self.min_rows = min_rows
+        self.shards_per_worker = shards_per_worker
+        self.batches = 0
+        self.rows = 0
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+        self._forest = None
+        self._forest_blocks = {}
+
+    def should_shard(self, n_rows, models):
+        return self.workers > 1 and n_rows >= self.min_rows and models.forest is not None
+
+    def _executor(self):
+        if self._pool is None or self._pid != os.getpid():
+            # spawn: pool processes never inherit locks or threads from a multi-threaded server
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context('spawn'))
+            self._pid = os.getpid()
+            self._forest = None
+            self._forest_blocks = {}
+        return self._pool
+
+    def _publish(self, forest):
+        """Copy a forest into shared memory once; pool processes attach to it by name"""
+        if self._forest is not forest:
+            for shared in self._forest_blocks.values():
+                shared.close()
+            self._forest_blocks = {name: SharedArray.copy_of(np.asarray(getattr(forest, name)))
+                                   for name in FOREST_ARRAYS}
+            self._forest = forest
+        return {name: shared.spec for name, shared in self._forest_blocks.items()}
+
+    def score(self, models, X_scaled):
+        """Return (predictions, raw_scores) like ModelSet.score, sharded when the batch is large"""
+        if not self.should_shard(len(X_scaled), models):
+            return models.score(X_scaled)
+
+        with self._lock:
+            pool = self._executor()
+            forest = models.forest
+            forest_specs = self._publish(forest)
+            forest_key = forest_specs['feature'][0]
+            params = {name: getattr(forest, name) for name in FOREST_PARAMS}
+
+            n_rows = len(X_scaled)
+            X = SharedArray.copy_of(np.ascontiguousarray(X_scaled, dtype=np.float32))
+            raw_scores = SharedArray((n_rows,), np.float64)
+            labels = SharedArray((n_rows,), np.int64)
+            try:
+                bounds = np.linspace(0, n_rows, self.workers * self.shards_per_worker + 1).astype(int)
+                futures = [
+                    pool.submit(_score_shard, forest_key, forest_specs, params,
+                                X.spec, [raw_scores.spec, labels.spec], int(start), int(stop))
+                    for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start
+                ]
+                scored = sum(future.result() for future in futures)
+                if scored != n_rows:
+                    raise RuntimeError(f"Sharded scoring covered {scored} of {n_rows} rows")
+                result = labels.array.copy(), raw_scores.array.copy()
+            finally:
+                for shared in (X, raw_scores, labels):
+                    shared.close()
+
+            self.batches += 1
+            self.rows += n_rows
+            return result
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.shutdown()
+            self._pool = None
+            for shared in self._forest_blocks.values():
+                shared.close()
+            self._forest_blocks = {}
+            self._forest = None
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'min_rows': self.min_rows,
+            'batches': self.batches,
+            'rows': self.rows
+        }
@@ -0,0 +1,292 @@
+"""
+Sharded Forest Training
+Fits one Isolation Forest shard per (code_module, code_presentation) partition in parallel worker
+processes and merges the shards into a single servable IsolationForest.
+
+- Each shard's seed comes from its partition name, and its tree count from its number of training
+  rows, so the merged ensemble samples partitions in proportion to their size, as one forest
+  fitted on all rows would.
+- The merged forest's offset_ is recalibrated on the scores of all training rows: each shard's own
+  threshold means nothing for the ensemble.
+- The preprocessing (fill medians, label encoders, scaler) and a fingerprint of every shard's
+  input are kept in the shard directory. A later run reuses them, so a partition whose rows did
+  not change keeps its trees and only new or changed partitions are fitted again.
+
+Layout:
+    <shard_dir>/preprocessing.pkl   medians, label encoders and scaler of the first full run
+    <shard_dir>/manifest.json       parameters, rows per tree, per-shard rows, seed, trees, fingerprint
+    <shard_dir>/<shard>.pkl         each shard's fitted IsolationForest
+"""
+
+import copy
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from preprocessing import CATEGORICAL_COLS, FEATURE_COLS, NUMERIC_COLS, CategoricalEncoder, build_feature_matrix
+from reservoir_training import SEED, TEST_FRACTION, holdout_mask
+
+SHARD_KEYS = ['code_module', 'code_presentation']
+
+# Partitions with fewer training rows than max_samples are fitted together in this shard, so every
+# tree is grown on max_samples rows and the merged ensemble keeps one path-length normalizer
+# (see partition() for a pool that is still too small)
+SMALL_SHARD = '_small'
+
+FORMAT_VERSION = 1
+
+
+def shard_name(module, presentation):
+    return f"{module}-{presentation}"
+
+
+def shard_seed(name, seed=SEED):
+    """Deterministic per-shard seed (Python's hash() is salted per process)"""
+    digest = hashlib.blake2b(f"{seed}:{name}".encode('utf-8'), digest_size=4).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class Preprocessor:
+    """Fill medians, label encoders and scaler, fitted once and reused by incremental runs"""
+
+    def __init__(self, medians, label_encoders, scaler):
+        self.medians = medians
+        self.label_encoders = label_encoders
+        self.scaler = scaler
+        self.encoder = CategoricalEncoder.from_label_encoders(label_encoders)
+
+    @classmethod
+    def fit(cls, df):
+        """The in-memory preprocessing of train_model.py"""
+        medians = {col: float(df[col].median()) for col in NUMERIC_COLS}
+        label_encoders = {col: LabelEncoder().fit(df[col].astype(str)) for col in CATEGORICAL_COLS}
+        preprocessor = cls(medians, label_encoders, None)
+        preprocessor.scaler = StandardScaler().fit(
+            pd.DataFrame(preprocessor.encode(preprocessor.fill(df)), columns=FEATURE_COLS))
+        return preprocessor
+
+    def extend(self, df):
+        """
+        Add categories first seen in df, or return False if that would change existing codes
+        A new value that sorts after every known one (e.g. the next presentation) gets the next
+        code, so rows already encoded keep their codes.
+        """
+        for col in CATEGORICAL_COLS:
+            classes = [str(c) for c in self.label_encoders[col].classes_]
+            values = df[col].astype(str)
+            new = sorted(set(str(v) for v in values.unique()) - set(classes))
+            if not new:
+                continue
+            encoder = LabelEncoder().fit(pd.concat([pd.Series(self.label_encoders[col].classes_, dtype=object),
+                                                    values], ignore_index=True))
+            if [str(c) for c in encoder.classes_[:len(classes)]] != classes:
+                return False
+            self.label_encoders[col] = encoder
+        self.encoder = CategoricalEncoder.from_label_encoders(self.label_encoders)
+        return True
+
+    def fill(self, df):
+        return df.fillna({col: self.medians[col] for col in NUMERIC_COLS})
+
+    def encode(self, df):
+        return build_feature_matrix(df, self.encoder)
+
+    def transform(self, df):
+        """(filled DataFrame, scaled feature matrix)"""
+        filled = self.fill(df)
+        X = self.encode(filled)
+        return filled, (X - self.scaler.mean_) / self.scaler.scale_
+
+    def save(self, path):
+        joblib.dump({'medians': self.medians, 'label_encoders': self.label_encoders, 'scaler': self.scaler}, path)
+
+    @classmethod
+    def load(cls, path):
+        state = joblib.load(path)
+        return cls(state['medians'], state['label_encoders'], state['scaler'])
+
+
+def partition(df, mask, max_samples):
+    """
+    {shard name: row positions} of the rows in mask, small partitions pooled into SMALL_SHARD
+    A pool that is itself smaller than max_samples joins the smallest full shard instead: sklearn
+    would grow its trees on fewer rows, and they could not be merged with the others.
+    """
+    rows = np.flatnonzero(mask)
+    groups = df.iloc[rows].groupby(SHARD_KEYS, sort=True, observed=True).indices
+    shards, small = {}, []
+    for (module, presentation), positions in groups.items():
+        if len(positions) >= max_samples:
+            shards[shard_name(module, presentation)] = rows[positions]
+        else:
+            small.append(rows[positions])
+    if small:
+        pooled = np.concatenate(small)
+        if len(pooled) >= max_samples or not shards:
+            shards[SMALL_SHARD] = np.sort(pooled)
+        else:
+            host = min(shards, key=lambda name: (len(shards[name]), name))
+            shards[host] = np.sort(np.concatenate([shards[host], pooled]))
+    return shards
+
+
+def fingerprint(X, params):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+    digest.update(np.ascontiguousarray(X, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def fit_shard(X, params):
+    """One shard's forest; offsets are recalibrated after merging, so contamination is left at 'auto'"""
+    return IsolationForest(**params, contamination='auto', n_jobs=1).fit(X)
+
+
+def merge_forests(forests, X_train, contamination):
+    """
+    One IsolationForest from the shards' trees, with offset_ recalibrated on X_train
+    Every shard must share max_samples and max_features, so the path-length normalizer applies to
+    all trees. (estimators_samples_ is not meaningful on the result.)
+    """
+    first = forests[0]
+    for forest in forests[1:]:
+        if forest._max_samples != first._max_samples or forest._max_features != first._max_features:
+            raise ValueError("Shards must share max_samples and max_features to be merged")
+    merged = copy.deepcopy(first)
+    merged.estimators_ = [tree for forest in forests for tree in forest.estimators_]
+    merged.estimators_features_ = [features for forest in forests for features in forest.estimators_features_]
+    merged._seeds = np.concatenate([forest._seeds for forest in forests])
+    merged._average_path_length_per_tree = tuple(
+        value for forest in forests for value in forest._average_path_length_per_tree)
+    merged._decision_path_lengths = tuple(value for forest in forests for value in forest._decision_path_lengths)
+    merged.n_estimators = len(merged.estimators_)
+    merged.random_state = None
+    merged.contamination = contamination
+    merged.offset_ = -0.5 if contamination == 'auto' else \
+        float(np.percentile(merged.score_samples(X_train), 100.0 * contamination))
+    return merged
+
+
+def _load_manifest(shard_dir):
+    try:
+        with open(os.path.join(shard_dir, 'manifest.json')) as f:
+            manifest = json.load(f)
+        return manifest if manifest.get('format_version') == FORMAT_VERSION else None
+    except (OSError, ValueError):
+        return None
+
+
+def train(df, params, shard_dir, workers=None, rebuild=False, test_fraction=TEST_FRACTION, seed=SEED):
+    """
+    Fit (or update) the shards for the merged, unfilled rows in df and merge them
+    params are IsolationForest settings (n_estimators is the total for a full run; contamination
+    None means the training label rate). Students are held out by a hash of id_student, so the
+    holdout of existing partitions does not move when new rows arrive.
+    Returns (model, scaler, label_encoders, filled df, report).
+    """
+    params = dict(params)
+    os.makedirs(shard_dir, exist_ok=True)
+    preprocessing_path = os.path.join(shard_dir, 'preprocessing.pkl')
+    manifest = None if rebuild else _load_manifest(shard_dir)
+    tree_params = {'max_samples': params['max_samples'], 'max_features': params['max_features']}
+    if manifest is not None and (manifest['params'] != tree_params or not os.path.exists(preprocessing_path)):
+        print("⚠️  Shard parameters changed: rebuilding every shard")
+        manifest = None
+
+    preprocessor = Preprocessor.load(preprocessing_path) if manifest is not None else None
+    if preprocessor is not None and not preprocessor.extend(df):
+        print("⚠️  New categories change existing codes: rebuilding every shard")
+        manifest, preprocessor = None, None
+    if preprocessor is None:
+        preprocessor = Preprocessor.fit(df)
+    preprocessor.save(preprocessing_path)
+
+    filled, X = preprocessor.transform(df)
+    y = df['is_anomaly'].to_numpy()
+    holdout = holdout_mask(df['id_student'], test_fraction, seed)
+    shards = partition(df, ~holdout, params['max_samples'])
+    n_train = int((~holdout).sum())
+    rows_per_tree = manifest['rows_per_tree'] if manifest is not None else n_train / params['n_estimators']
+
+    known = manifest['shards'] if manifest is not None else {}
+    entries, pending, forests = {}, {}, {}
+    for name, rows in shards.items():
+        entry = {
+            'rows': len(rows),
+            'trees': max(1, int(round(len(rows) / rows_per_tree))),
+            'seed': shard_seed(name, seed)
+        }
+        shard_params = {**tree_params, 'n_estimators': entry['trees'], 'random_state': entry['seed']}
+        # Rows in id order, so the fingerprint and the fit do not depend on the input order
+        order = rows[np.argsort(df['id_student'].to_numpy()[rows], kind='stable')]
+        entry['fingerprint'] = fingerprint(X[order], shard_params)
+        path = os.path.join(shard_dir, f"{name}.pkl")
+        if known.get(name, {}).get('fingerprint') == entry['fingerprint'] and os.path.exists(path):
+            forests[name] = joblib.load(path)
+        else:
+            pending[name] = (X[order], shard_params)
+        entries[name] = entry
+
+    started = time.perf_counter()
+    if pending:
+        workers = min(workers or os.cpu_count() or 1, len(pending))
+        print(f"🔬 Fitting {len(pending)} of {len(shards)} shards on {workers} workers")
+        # Forked workers, so train_model.py (a script without a __main__ guard) is not re-run
+        context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            fitted = pool.map(fit_shard, *zip(*pending.values()))
+            for name, forest in zip(pending, fitted):
+                joblib.dump(forest, os.path.join(shard_dir, f"{name}.pkl"))
+                forests[name] = forest
+    print(f"✓ Shards: {len(pending)} fitted, {len(shards) - len(pending)} reused "
+          f"({time.perf_counter() - started:.1f}s)")
+
+    for entry in os.listdir(shard_dir):
+        if entry.endswith('.pkl') and entry != 'preprocessing.pkl' and entry[:-4] not in shards:
+            os.remove(os.path.join(shard_dir, entry))
+
+    names = sorted(shards)
+    contamination = params.get('contamination')
+    if contamination is None:
+        contamination = min(float(y[~holdout].mean()), 0.5)
+    model = merge_forests([forests[name] for name in names], X[~holdout], contamination)
+
+    predicted = (model.predict(X[holdout]) == -1).astype(int)
+    actual = y[holdout]
+    tp = int(np.sum((predicted == 1) & (actual == 1)))
+    fp = int(np.sum((predicted == 1) & (actual == 0)))
+    fn = int(np.sum((predicted == 0) & (actual == 1)))
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'params': tree_params,
+        'rows_per_tree': rows_per_tree,
+        'shards': entries,
+        'updated_at': time.time()
+    }
+    tmp = os.path.join(shard_dir, f"manifest.json.tmp{os.getpid()}")
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(shard_dir, 'manifest.json'))
+
+    report = {
+        'shards': len(shards),
+        'fitted': sorted(pending),
+        'trees': model.n_estimators,
+        'train_rows': n_train,
+        'test_rows': int(holdout.sum()),
+        'contamination': contamination,
+        'precision': tp / (tp + fp) if tp + fp else 0.0,
+        'recall': tp / (tp + fn) if tp + fn else 0.0,
+        'f1': 2 * tp / (2 * tp + fp + fn) if tp else 0.0
+    }
+    return model, preprocessor.scaler, preprocessor.label_encoders, filled, report
@@ -0,0 +1,72 @@
+"""
+Streaming Batch Input
+Incremental NDJSON / CSV readers that feed /predict_stream in fixed-size chunks
+"""
+
+import csv
+import io
+import json
+
+from preprocessing import CATEGORICAL_COLS
+
+CSV_MIMETYPES = ('text/csv', 'application/csv')
+
+
+def _parse_csv_value(value):
+    """Type a CSV cell the way batch.html's Papa.parse(dynamicTyping) does"""
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def iter_ndjson_records(stream):
+    """Yield one dict per non-empty line of an NDJSON byte stream"""
+    for line_number, line in enumerate(io.TextIOWrapper(stream, encoding='utf-8'), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"Invalid JSON on line {line_number}: {e}")
+        if not isinstance(record, dict):
+            raise ValueError(f"Line {line_number} is not a JSON object")
+        yield record
+
+
+def iter_csv_records(stream):
+    """Yield one dict per row of a CSV byte stream with a header line"""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8', newline=''))
+    for row in reader:
+        record = {}
+        for key, value in row.items():
+            if key is None:
+                continue
+            record[key] = value if key in CATEGORICAL_COLS else _parse_csv_value(value)
+        yield record
+
+
+def iter_records(stream, mimetype):
+    """Pick the reader for a request body based on its mimetype"""
+    if mimetype in CSV_MIMETYPES:
+        return iter_csv_records(stream)
+    return iter_ndjson_records(stream)
+
+
+def iter_chunks(records, chunk_size):
+    """Group an iterable of records into lists of at most chunk_size"""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
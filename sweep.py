@@ -0,0 +1,238 @@
+"""
+Hyperparameter Sweep
+Fits a grid of IsolationForest settings in parallel over scaled train/test matrices that are built
+once, saved as .npy files and memory-mapped read-only by every worker process. Each configuration
+records F1 on the test split, single-row inference latency and the size of the flattened forest
+the API serves; the Pareto-best configuration is picked from the results.
+
+    python sweep.py models/sweep --grid '{"n_estimators": [100, 200]}' --workers 4
+re-runs a sweep over the matrices a TRAIN_SWEEP=1 training run saved, without redoing the
+feature engineering.
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+MATRICES = ('X_train', 'X_test', 'y_train', 'y_test')
+
+# contamination 'label' is the training label rate (capped at 0.5), what train_model.py uses by default
+DEFAULT_GRID = {
+    'n_estimators': [100, 200, 400],
+    'max_samples': [128, 256, 512],
+    'max_features': [0.5, 0.75, 1.0],
+    'contamination': ['label', 0.1, 0.2, 0.3],
+}
+RANDOM_STATE = 42
+
+# Configurations within this much F1 of the best are treated as equally accurate when picking
+F1_TOLERANCE = 0.005
+
+# Single-row scoring calls timed per configuration
+LATENCY_CALLS = 200
+
+# Objectives: (result key, True if higher is better)
+OBJECTIVES = (('f1', True), ('latency_ms', False), ('model_bytes', False))
+
+
+def save_matrices(directory, X_train, X_test, y_train, y_test, feature_cols=None):
+    """Write the scaled split as .npy files for the workers to memory-map"""
+    os.makedirs(directory, exist_ok=True)
+    arrays = {'X_train': X_train, 'X_test': X_test, 'y_train': y_train, 'y_test': y_test}
+    for name, array in arrays.items():
+        tmp = os.path.join(directory, f"{name}.tmp.npy")
+        np.save(tmp, np.ascontiguousarray(np.asarray(array)))
+        os.replace(tmp, os.path.join(directory, f"{name}.npy"))
+    meta = {
+        'rows_train': len(X_train),
+        'rows_test': len(X_test),
+        'label_rate': float(np.mean(y_train)),
+        'feature_cols': list(feature_cols) if feature_cols is not None else None,
+        'created_at': time.time()
+    }
+    with open(os.path.join(directory, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def load_matrices(directory):
+    """{name: read-only memory-mapped array} plus the meta dict"""
+    with open(os.path.join(directory, 'meta.json')) as f:
+        meta = json.load(f)
+    return {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r') for name in MATRICES}, meta
+
+
+def parameter_grid(grid, label_rate):
+    """Every combination of the grid's values, with contamination 'label' resolved"""
+    grid = {**DEFAULT_GRID, **(grid or {})}
+    names = list(grid)
+    configs = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        params = dict(zip(names, values))
+        if params['contamination'] == 'label':
+            params['contamination'] = round(min(label_rate, 0.5), 6)
+        if params not in configs:
+            configs.append(params)
+    return configs
+
+
+def _structure(params):
+    """The settings that shape the trees; contamination only moves the decision threshold"""
+    return tuple((name, value) for name, value in params.items() if name != 'contamination')
+
+
+def _offset(train_scores, contamination):
+    """IsolationForest.offset_ for a contamination value, from the training scores"""
+    if contamination == 'auto':
+        return -0.5
+    return float(np.percentile(train_scores, 100.0 * contamination))
+
+
+def _f1(y_true, y_pred):
+    tp = int(np.sum((y_pred == 1) & (y_true == 1)))
+    fp = int(np.sum((y_pred == 1) & (y_true == 0)))
+    fn = int(np.sum((y_pred == 0) & (y_true == 1)))
+    return 2 * tp / (2 * tp + fp + fn) if tp else 0.0
+
+
+_worker_matrices = None
+
+
+def _init_worker(directory):
+    global _worker_matrices
+    _worker_matrices = load_matrices(directory)[0]
+
+
+def evaluate(structure, contaminations):
+    """
+    Fit one forest and score it for each contamination value
+    The trees do not depend on contamination (it only sets offset_), so one fit serves all of them.
+    """
+    from sklearn.ensemble import IsolationForest
+    from forest_engine import FlatForest
+
+    m = _worker_matrices
+    params = dict(structure)
+    started = time.perf_counter()
+    model = IsolationForest(**params, random_state=RANDOM_STATE, n_jobs=1).fit(m['X_train'])
+    fit_s = time.perf_counter() - started
+
+    forest = FlatForest.from_isolation_forest(model)
+    model_bytes = sum(array.nbytes for array in (forest.feature, forest.threshold, forest.children,
+                                                 forest.missing_left, forest.leaf_value, forest.roots))
+    train_scores = forest.score_samples(m['X_train'])
+    started = time.perf_counter()
+    test_scores = forest.score_samples(m['X_test'])
+    batch_s = time.perf_counter() - started
+
+    rows = np.asarray(m['X_test'][:LATENCY_CALLS])
+    timings = []
+    for i in range(LATENCY_CALLS):
+        row = rows[i % len(rows):i % len(rows) + 1]
+        started = time.perf_counter()
+        forest.score(row)
+        timings.append(time.perf_counter() - started)
+
+    y_test = np.asarray(m['y_test'])
+    results = []
+    for contamination in contaminations:
+        y_pred = (test_scores - _offset(train_scores, contamination) < 0).astype(int)
+        results.append({
+            'params': {**params, 'contamination': contamination},
+            'f1': round(_f1(y_test, y_pred), 6),
+            'latency_ms': round(float(np.median(timings)) * 1000, 4),
+            'batch_rows_per_s': round(len(test_scores) / batch_s, 1) if batch_s > 0 else None,
+            'model_bytes': int(model_bytes),
+            'fit_s': round(fit_s, 4)
+        })
+    return results
+
+
+def run_sweep(directory, configs, workers=None):
+    """Evaluate configs over the matrices in directory across worker processes; returns the results"""
+    groups = {}
+    for params in configs:
+        groups.setdefault(_structure(params), []).append(params['contamination'])
+    workers = min(workers or os.cpu_count() or 1, len(groups))
+    print(f"🔬 Sweeping {len(configs)} configurations ({len(groups)} fits) on {workers} workers")
+
+    results = []
+    started = time.perf_counter()
+    # Forked workers, so a script that calls this without a __main__ guard (train_model.py) is not re-run
+    context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                             initargs=(directory,)) as pool:
+        for group in pool.map(evaluate, groups, groups.values()):
+            results.extend(group)
+            best = max(group, key=lambda result: result['f1'])
+            print(f"  {best['params']}: F1 {best['f1']:.4f}, {best['latency_ms']:.3f} ms/row, "
+                  f"{best['model_bytes'] / 1024:.0f} KB")
+    print(f"⏱️ Sweep finished in {time.perf_counter() - started:.1f}s")
+    return results
+
+
+def dominates(a, b):
+    """True if a is at least as good as b on every objective and better on one"""
+    at_least = all((a[key] >= b[key]) if higher else (a[key] <= b[key]) for key, higher in OBJECTIVES)
+    better = any((a[key] > b[key]) if higher else (a[key] < b[key]) for key, higher in OBJECTIVES)
+    return at_least and better
+
+
+def pareto_front(results):
+    """Results no other result dominates, best F1 first"""
+    front = [r for r in results if not any(dominates(other, r) for other in results)]
+    return sorted(front, key=lambda r: (-r['f1'], r['latency_ms'], r['model_bytes']))
+
+
+def pick_best(results, tolerance=F1_TOLERANCE):
+    """
+    The Pareto-best configuration
+    From the Pareto front, the fastest (then smallest) result within tolerance of the best F1.
+    """
+    front = pareto_front(results)
+    top = front[0]['f1']
+    close = [r for r in front if r['f1'] >= top - tolerance]
+    return min(close, key=lambda r: (r['latency_ms'], r['model_bytes']))
+
+
+def write_results(path, results, best):
+    report = {'best': best, 'pareto_front': pareto_front(results), 'results': results,
+              'objectives': [key for key, _ in OBJECTIVES], 'f1_tolerance': F1_TOLERANCE}
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def print_front(results, best):
+    print("\nPareto front (F1 / ms per row / KB):")
+    for r in pareto_front(results):
+        marker = '→' if r is best else ' '
+        print(f" {marker} {r['f1']:.4f}  {r['latency_ms']:7.3f}  {r['model_bytes'] / 1024:8.0f}  {r['params']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('matrices', help='directory written by save_matrices() (train_model.py: models/sweep)')
+    parser.add_argument('--grid', help='JSON {parameter: [values]} overriding DEFAULT_GRID entries')
+    parser.add_argument('--workers', type=int, default=0, help='worker processes (0 = one per CPU)')
+    parser.add_argument('--output', help='results JSON (default <matrices>/results.json)')
+    args = parser.parse_args()
+
+    _, meta = load_matrices(args.matrices)
+    configs = parameter_grid(json.loads(args.grid) if args.grid else None, meta['label_rate'])
+    results = run_sweep(args.matrices, configs, args.workers or None)
+    best = pick_best(results)
+    print_front(results, best)
+    output = args.output or os.path.join(args.matrices, 'results.json')
+    write_results(output, results, best)
+    print(f"\n✓ Best: {best['params']} (F1 {best['f1']:.4f}); results saved to {output}")
+
+
+if __name__ == '__main__':
+    main()
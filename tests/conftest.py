@@ -0,0 +1,62 @@
+import sys
+import os
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+# Tests import app for its functions and patch models in themselves: skip loading models/ at import time
+os.environ.setdefault('APP_LAZY_INIT', '1')
+
+# Add parent directory to path to allow importing the modules under test
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+import model_store  # noqa: E402
+from preprocessing import CATEGORICAL_COLS, NUMERIC_COLS, FEATURE_COLS  # noqa: E402
+
+CSV_PATH = os.path.join(ROOT, 'test.csv')
+
+
+@pytest.fixture(scope='module')
+def cohort():
+    """Students shaped like test.csv, with real encoders, scaler and model fitted on them"""
+    rng = np.random.default_rng(0)
+    base = pd.read_csv(CSV_PATH)
+    df = base.sample(400, replace=True, random_state=0).reset_index(drop=True)
+    df['student_id'] = [f'S{i:04d}' for i in range(len(df))]
+    for col in NUMERIC_COLS:
+        df[col] = (df[col] * rng.uniform(0.5, 1.5, len(df))).round()
+
+    label_encoders = {}
+    encoded = df.copy()
+    for col in CATEGORICAL_COLS:
+        le = LabelEncoder()
+        encoded[col + '_encoded'] = le.fit_transform(df[col].astype(str))
+        label_encoders[col] = le
+    scaler = StandardScaler().fit(encoded[FEATURE_COLS])
+    model = IsolationForest(n_estimators=50, contamination=0.3, random_state=42)
+    model.fit(scaler.transform(encoded[FEATURE_COLS]))
+    return df, model, scaler, label_encoders
+
+
+def _write_artifacts(models_dir, seed, n_features=len(FEATURE_COLS)):
+    """Train a tiny model set and save it the way train_model.py does"""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(300, n_features))
+    scaler = StandardScaler().fit(X)
+    model = IsolationForest(n_estimators=10, random_state=seed).fit(scaler.transform(X))
+    label_encoders = {col: LabelEncoder().fit(['a', 'b', 'c']) for col in CATEGORICAL_COLS}
+
+    os.makedirs(models_dir, exist_ok=True)
+    joblib.dump(model, os.path.join(models_dir, model_store.MODEL_FILE))
+    joblib.dump(scaler, os.path.join(models_dir, model_store.SCALER_FILE))
+    joblib.dump(label_encoders, os.path.join(models_dir, model_store.ENCODERS_FILE))
+
+
+@pytest.fixture
+def write_artifacts():
+    """write_artifacts(models_dir, seed, n_features=...): a tiny model set saved like train_model.py does"""
+    return _write_artifacts
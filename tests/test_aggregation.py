@@ -0,0 +1,111 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add parent directory and benchmarks/ to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'benchmarks'))
+
+from aggregation import GroupedMoments, assessment_features, vle_features, registration_features
+from synthetic import write_oulad
+
+
+@pytest.fixture(scope='module')
+def oulad(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp('data')
+    write_oulad(str(data_dir), 300, seed=4, vle_rows_per_student=30)
+    # Missing values, the way OULAD writes them
+    path = data_dir / 'studentAssessment.csv'
+    assessments = pd.read_csv(path)
+    assessments['score'] = assessments['score'].astype(object)
+    assessments.loc[::17, 'score'] = '?'
+    assessments.to_csv(path, index=False)
+    return data_dir
+
+
+def reference_features(data_dir):
+    """The in-memory groupby aggregation train_model.py used before chunking"""
+    assessments = pd.read_csv(data_dir / 'studentAssessment.csv', na_values=['?'])
+    vle = pd.read_csv(data_dir / 'studentVle.csv')
+    registration = pd.read_csv(data_dir / 'studentRegistration.csv')
+
+    assessment_agg = assessments.groupby('id_student').agg({
+        'score': ['mean', 'std', 'min', 'max', 'count'],
+        'date_submitted': ['mean', 'std']
+    }).reset_index()
+    assessment_agg.columns = ['id_student', 'avg_score', 'std_score', 'min_score', 'max_score',
+                              'num_assessments', 'avg_submission_date', 'std_submission_date']
+    assessment_agg['score_range'] = assessment_agg['max_score'] - assessment_agg['min_score']
+    assessment_agg['std_score'] = assessment_agg['std_score'].fillna(0)
+    assessment_agg['std_submission_date'] = assessment_agg['std_submission_date'].fillna(0)
+
+    vle_agg = vle.groupby('id_student').agg({
+        'sum_click': ['sum', 'mean', 'std', 'max'],
+        'date': ['count', 'min', 'max']
+    }).reset_index()
+    vle_agg.columns = ['id_student', 'total_clicks', 'avg_clicks', 'std_clicks',
+                       'max_clicks', 'num_interactions', 'first_access', 'last_access']
+    vle_agg['access_duration'] = vle_agg['last_access'] - vle_agg['first_access']
+    vle_agg['std_clicks'] = vle_agg['std_clicks'].fillna(0)
+
+    reg_features = registration.groupby('id_student').agg({
+        'date_registration': 'mean',
+        'date_unregistration': lambda x: x.notna().sum()
+    }).reset_index()
+    reg_features.columns = ['id_student', 'avg_registration_date', 'num_unregistrations']
+    return assessment_agg, vle_agg, reg_features
+
+
+def assert_same_features(actual, expected):
+    assert list(actual.columns) == list(expected.columns)
+    assert (actual['id_student'].to_numpy() == expected['id_student'].to_numpy()).all()
+    for col in expected.columns:
+        np.testing.assert_allclose(actual[col].to_numpy(dtype=float), expected[col].to_numpy(dtype=float),
+                                   rtol=1e-12, atol=1e-9, equal_nan=True, err_msg=col)
+
+
+@pytest.mark.parametrize('chunk_rows', [97, 1000, 10 ** 6])
+def test_chunked_features_match_groupby(oulad, chunk_rows):
+    expected = reference_features(oulad)
+
+    assert_same_features(assessment_features(oulad / 'studentAssessment.csv', chunk_rows)[0], expected[0])
+    assert_same_features(vle_features(oulad / 'studentVle.csv', chunk_rows)[0], expected[1])
+    assert_same_features(registration_features(oulad / 'studentRegistration.csv', chunk_rows)[0], expected[2])
+
+
+def test_row_counts_are_reported(oulad):
+    _, rows = vle_features(oulad / 'studentVle.csv', chunk_rows=50)
+    assert rows == len(pd.read_csv(oulad / 'studentVle.csv'))
+
+
+def test_merge_order_does_not_matter():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'k': rng.integers(0, 20, 1000), 'x': rng.normal(50, 10, 1000)})
+    df.loc[rng.choice(1000, 100, replace=False), 'x'] = np.nan
+
+    forward, backward = GroupedMoments('k', ['x']), GroupedMoments('k', ['x'])
+    for start in range(0, 1000, 90):
+        forward.update(df.iloc[start:start + 90])
+    for start in reversed(range(0, 1000, 90)):
+        backward.update(df.iloc[start:start + 90])
+
+    expected = df.groupby('k')['x'].agg(['count', 'mean', 'std', 'min', 'max'])
+    for moments in (forward, backward):
+        np.testing.assert_allclose(moments.count['x'].sort_index(), expected['count'])
+        np.testing.assert_allclose(moments.mean()['x'].sort_index(), expected['mean'], rtol=1e-12)
+        np.testing.assert_allclose(moments.std()['x'].sort_index(), expected['std'], rtol=1e-10)
+        np.testing.assert_allclose(moments.min['x'].sort_index(), expected['min'])
+        np.testing.assert_allclose(moments.max['x'].sort_index(), expected['max'])
+
+
+def test_single_value_and_all_missing_groups():
+    chunk = pd.DataFrame({'k': [1, 2, 2], 'x': [5.0, np.nan, np.nan]})
+    moments = GroupedMoments('k', ['x']).update(chunk).update(pd.DataFrame({'k': [3], 'x': [1.0]}))
+
+    assert moments.count['x'].to_dict() == {1: 1, 2: 0, 3: 1}
+    assert np.isnan(moments.std()['x'][1])
+    assert np.isnan(moments.mean()['x'][2])
+    assert np.isnan(moments.min['x'][2]) and np.isnan(moments.max['x'][2])
@@ -0,0 +1,99 @@
+import sys
+import os
+import json
+import time
+import pytest
+from unittest.mock import patch
+
+# Add parent directory to path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+import batch_jobs
+
+
+@pytest.fixture(scope='module')
+def job_manager(tmp_path_factory):
+    manager = batch_jobs.JobManager(str(tmp_path_factory.mktemp('jobs')), max_workers=1, chunk_size=64)
+    yield manager
+    if manager._pool is not None:
+        manager._pool.shutdown()
+
+
+@pytest.fixture
+def client(cohort, job_manager):
+    _, model, scaler, label_encoders = cohort
+    with patch('app.model', model), patch('app.scaler', scaler), patch('app.label_encoders', label_encoders), \
+            patch('app.model_version', 'test-v1'), patch('app.job_manager', job_manager):
+        with app_module.app.test_client() as client:
+            yield client
+
+
+def wait_for_job(client, job_id, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = client.get(f'/jobs/{job_id}').get_json()
+        if status['state'] in batch_jobs.TERMINAL_STATES:
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def fetch_all(client, job_id, limit):
+    pages, cursor = [], None
+    while True:
+        url = f'/jobs/{job_id}/results?limit={limit}' + (f'&cursor={cursor}' if cursor else '')
+        page = client.get(url).get_json()
+        pages.append(page)
+        cursor = page['next_cursor']
+        if cursor is None:
+            return pages
+
+
+def test_job_results_match_predict_batch(client, cohort):
+    students = json.loads(cohort[0].to_json(orient='records'))
+
+    response = client.post('/jobs', json={'students': students})
+    assert response.status_code == 202
+    job = response.get_json()
+    assert job['total'] == len(students) and job['state'] == 'queued'
+
+    status = wait_for_job(client, job['job_id'])
+    assert status['state'] == 'succeeded', status['error']
+    assert status['processed'] == len(students)
+
+    pages = fetch_all(client, job['job_id'], limit=150)
+    assert [len(p['predictions']) for p in pages] == [150, 150, 100]
+
+    batch = client.post('/predict_batch', json={'students': students}).get_json()
+    assert [r for p in pages for r in p['predictions']] == batch['predictions']
+    assert pages[-1]['summary'] == batch['summary']
+    assert pages[-1]['modelVersion'] == 'test-v1'
+
+
+def test_csv_job_and_errors(client, cohort):
+    df = cohort[0].head(50)
+    job = client.post('/jobs', data=df.to_csv(index=False), content_type='text/csv').get_json()
+    assert wait_for_job(client, job['job_id'])['state'] == 'succeeded'
+    records = fetch_all(client, job['job_id'], limit=1000)[0]['predictions']
+    assert [r['student_id'] for r in records] == df['student_id'].tolist()
+
+    assert client.get('/jobs/' + '0' * 32).status_code == 404
+    assert client.get('/jobs/../../etc').status_code == 404
+    assert client.get(f"/jobs/{job['job_id']}/results?limit=0").status_code == 400
+    assert client.get(f"/jobs/{job['job_id']}/results?cursor=abc").status_code == 400
+    assert client.post('/jobs', data='{not json\n', content_type='application/x-ndjson').status_code == 400
+
+    assert client.delete(f"/jobs/{job['job_id']}").status_code == 204
+    assert client.get(f"/jobs/{job['job_id']}").status_code == 404
+
+
+def test_finished_jobs_expire(tmp_path):
+    manager = batch_jobs.JobManager(str(tmp_path), retention=60)
+    for job_id, finished_at in [('a' * 32, 1000.0), ('b' * 32, 1050.0), ('c' * 32, None)]:
+        os.makedirs(manager.job_dir(job_id))
+        batch_jobs._write_json(os.path.join(manager.job_dir(job_id), batch_jobs.STATUS_FILE),
+                               {'job_id': job_id, 'state': 'running', 'finished_at': finished_at})
+
+    assert manager.purge_expired(now=1100.0) == 1
+    assert sorted(os.listdir(str(tmp_path))) == ['b' * 32, 'c' * 32]
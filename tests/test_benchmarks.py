@@ -0,0 +1,66 @@
+import sys
+import os
+import pandas as pd
+
+# Add parent directory and benchmarks/ to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'benchmarks'))
+
+from preprocessing import CATEGORICAL_COLS, NUMERIC_COLS
+from synthetic import generate_cohort, write_oulad, REGIONS
+from run_benchmarks import compare, metric
+
+
+def test_cohort_matches_api_schema():
+    df = generate_cohort(500, seed=1)
+    expected = list(pd.read_csv(os.path.join(ROOT, 'test.csv'), nrows=1).columns)
+
+    assert list(df.columns) == expected
+    assert len(CATEGORICAL_COLS) + len(NUMERIC_COLS) == 28
+    assert set(df['region']) <= set(REGIONS)
+    assert (df['score_range'] - (df['max_score'] - df['min_score'])).abs().max() < 0.11
+    assert (df['access_duration'] == df['last_access'] - df['first_access']).all()
+    assert df[NUMERIC_COLS].notna().all().all()
+
+
+def test_cohort_is_deterministic():
+    pd.testing.assert_frame_equal(generate_cohort(50, seed=3), generate_cohort(50, seed=3))
+
+
+def test_oulad_csvs_share_students(tmp_path):
+    rows = write_oulad(str(tmp_path), 200, vle_rows_per_student=10)
+
+    info = pd.read_csv(tmp_path / 'studentInfo.csv')
+    vle = pd.read_csv(tmp_path / 'studentVle.csv')
+    assert rows['studentInfo.csv'] == 200
+    assert info['id_student'].is_unique
+    assert set(vle['id_student']) <= set(info['id_student'])
+    assert set(info['final_result']) <= {'Pass', 'Distinction', 'Fail', 'Withdrawn'}
+    assert pd.read_csv(tmp_path / 'studentRegistration.csv')['date_unregistration'].isna().any()
+
+
+def test_compare_flags_regressions_in_either_direction():
+    baseline = {
+        'predict_p99_ms': metric(10, 'ms', 'lower'),
+        'predict_batch_100_rows_per_s': metric(1000, 'rows/s', 'higher'),
+        'train_1000_students_s': metric(5, 's', 'lower'),
+    }
+    current = {
+        'predict_p99_ms': metric(13, 'ms', 'lower'),
+        'predict_batch_100_rows_per_s': metric(700, 'rows/s', 'higher'),
+        'train_1000_students_s': metric(4, 's', 'lower'),
+    }
+
+    rows = {row[0]: row for row in compare(current, baseline, threshold=0.2)}
+    assert rows['predict_p99_ms'][4]
+    assert rows['predict_batch_100_rows_per_s'][4]
+    assert not rows['train_1000_students_s'][4]
+
+    relaxed = {row[0]: row for row in compare(current, baseline, 0.2, budgets={'predict_p99_ms': 0.5})}
+    assert not relaxed['predict_p99_ms'][4]
+
+
+def test_compare_skips_metrics_missing_on_one_side():
+    rows = compare({'a': metric(1, 's', 'lower')}, {'b': metric(1, 's', 'lower')})
+    assert rows == []
@@ -0,0 +1,65 @@
+import sys
+import os
+import threading
+import numpy as np
+import pytest
+
+# Add parent directory to path to allow importing the project modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from coalescer import RequestCoalescer
+
+
+def fake_model(X):
+    """Deterministic per-row scores: prediction from the sign of the row sum"""
+    sums = X.sum(axis=1)
+    return np.where(sums < 0, -1, 1), sums
+
+
+def test_concurrent_calls_are_batched_and_routed_back():
+    batch_sizes = []
+
+    def score_fn(X):
+        batch_sizes.append(len(X))
+        return fake_model(X)
+
+    coalescer = RequestCoalescer(score_fn, window=0.05, max_batch=16)
+    rows = np.random.default_rng(0).normal(size=(40, 5))
+    results = [None] * len(rows)
+    barrier = threading.Barrier(len(rows))
+
+    def call(i):
+        barrier.wait()
+        results[i] = coalescer.score(rows[i])
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(rows))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    expected_predictions, expected_scores = fake_model(rows)
+    assert [r[0] for r in results] == expected_predictions.tolist()
+    np.testing.assert_allclose([r[1] for r in results], expected_scores)
+    assert sum(batch_sizes) == len(rows)
+    assert max(batch_sizes) <= 16
+    assert len(batch_sizes) < len(rows)
+    assert coalescer.stats()['rows'] == len(rows)
+
+
+def test_lone_request_flushes_after_window():
+    coalescer = RequestCoalescer(fake_model, window=0.001, max_batch=64)
+    prediction, raw_score = coalescer.score(np.array([-1.0, -2.0]))
+    assert prediction == -1
+    assert raw_score == -3.0
+
+
+def test_errors_reach_every_caller():
+    def failing(X):
+        raise RuntimeError('model exploded')
+
+    coalescer = RequestCoalescer(failing, window=0.01)
+    futures = [coalescer.submit(np.zeros(3)) for _ in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match='model exploded'):
+            future.result(timeout=5)
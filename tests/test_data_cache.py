@@ -0,0 +1,133 @@
+import sys
+import os
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import LabelEncoder
+
+# Add parent directory and benchmarks/ to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'benchmarks'))
+
+from data_cache import DataCache, CachedTable, read_table, TABLE_SCHEMAS
+from aggregation import assessment_features, vle_features, registration_features
+from synthetic import write_oulad
+from reservoir_training import student_chunks
+
+TABLES = list(TABLE_SCHEMAS)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    write_oulad(str(tmp_path / 'data'), 200, seed=7, vle_rows_per_student=20)
+    return tmp_path / 'data'
+
+
+def paths(data_dir):
+    return [str(data_dir / name) for name in TABLES]
+
+
+def test_cached_tables_round_trip(data_dir, tmp_path):
+    tables = DataCache(str(tmp_path / 'cache'), chunk_rows=500).load(paths(data_dir))
+
+    for name in TABLES:
+        assert isinstance(tables[name], CachedTable)
+        cached = tables[name].frame()
+        original = pd.read_csv(data_dir / name)
+        assert list(cached.columns) == list(original.columns)
+        for col in original.columns:
+            if TABLE_SCHEMAS[name][col] == 'category':
+                assert isinstance(cached[col].dtype, pd.CategoricalDtype)
+                assert cached[col].astype(object).where(cached[col].notna(), None).tolist() == \
+                    original[col].astype(object).where(original[col].notna(), None).tolist()
+            else:
+                np.testing.assert_array_equal(cached[col].to_numpy(dtype=float), original[col].to_numpy(dtype=float))
+
+
+def test_columns_are_compact(data_dir, tmp_path):
+    table = DataCache(str(tmp_path / 'cache')).load(paths(data_dir))['studentVle.csv']
+    columns = {col['name']: col for col in table.meta['columns']}
+
+    assert columns['code_module']['dtype'] == '|i1'
+    modules = pd.read_csv(data_dir / 'studentVle.csv')['code_module'].unique()
+    assert sorted(columns['code_module']['categories']) == sorted(modules)
+    assert columns['id_student']['dtype'] == '<i4'
+    assert isinstance(table.column('id_student'), np.memmap)
+
+
+def test_features_from_cache_match_csv(data_dir, tmp_path):
+    tables = DataCache(str(tmp_path / 'cache')).load(paths(data_dir))
+
+    for features, name in ((assessment_features, 'studentAssessment.csv'), (vle_features, 'studentVle.csv'),
+                           (registration_features, 'studentRegistration.csv')):
+        from_csv, rows = features(str(data_dir / name), chunk_rows=300)
+        from_cache, cached_rows = features(tables[name], chunk_rows=300)
+        assert rows == cached_rows
+        pd.testing.assert_frame_equal(from_cache, from_csv)
+
+
+def test_rebuilds_only_changed_sources(data_dir, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    DataCache(cache_dir).load(paths(data_dir))
+    before = set(os.listdir(cache_dir))
+
+    info = pd.read_csv(data_dir / 'studentInfo.csv')
+    info.loc[0, 'studied_credits'] = 240
+    info.to_csv(data_dir / 'studentInfo.csv', index=False)
+
+    cache = DataCache(cache_dir)
+    built = {os.path.basename(path): cache.table(path)[1] for path in paths(data_dir)}
+    assert built == {'studentInfo.csv': True, 'studentAssessment.csv': False,
+                     'studentVle.csv': False, 'studentRegistration.csv': False}
+    after = set(os.listdir(cache_dir))
+    assert len([entry for entry in after if entry.startswith('studentInfo-')]) == 1
+    assert after - before and not [entry for entry in after if '.tmp-' in entry]
+    assert read_table(cache.table(str(data_dir / 'studentInfo.csv'))[0])['studied_credits'][0] == 240
+
+
+def test_unchanged_files_are_not_rehashed(data_dir, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / 'cache')
+    DataCache(cache_dir).load(paths(data_dir))
+    with open(os.path.join(cache_dir, 'hashes.json')) as f:
+        assert len(json.load(f)) == len(TABLES)
+
+    import data_cache
+    monkeypatch.setattr(data_cache, 'file_hash', lambda path: pytest.fail(f"re-hashed {path}"))
+    tables = DataCache(cache_dir).load(paths(data_dir))
+    assert all(isinstance(table, CachedTable) for table in tables.values())
+
+
+def test_uncacheable_table_falls_back_to_csv(data_dir, tmp_path):
+    # A missing value in a column the schema stores as an integer cannot be cached
+    info = pd.read_csv(data_dir / 'studentInfo.csv')
+    info['studied_credits'] = info['studied_credits'].astype(object)
+    info.loc[3, 'studied_credits'] = '?'
+    info.to_csv(data_dir / 'studentInfo.csv', index=False)
+
+    tables = DataCache(str(tmp_path / 'cache')).load(paths(data_dir))
+    assert tables['studentInfo.csv'] == str(data_dir / 'studentInfo.csv')
+    assert len(read_table(tables['studentInfo.csv'])) == 200
+    assert not [entry for entry in os.listdir(tmp_path / 'cache') if entry.startswith('studentInfo')]
+
+
+def test_question_marks_are_missing_only_in_numeric_columns(data_dir, tmp_path):
+    info_path, assessment_path = data_dir / 'studentInfo.csv', data_dir / 'studentAssessment.csv'
+    info = pd.read_csv(info_path)
+    info.loc[:4, 'imd_band'] = '?'
+    info.to_csv(info_path, index=False)
+    assessments = pd.read_csv(assessment_path)
+    assessments['score'] = assessments['score'].astype(object)
+    assessments.loc[:2, 'score'] = '?'
+    assessments.to_csv(assessment_path, index=False)
+    tables = DataCache(str(tmp_path / 'cache')).load([str(info_path), str(assessment_path)])
+
+    # '?' is an OULAD imd_band value: training fits it as a class, as it did from the raw CSV
+    for frame in (read_table(tables['studentInfo.csv']), read_table(str(info_path)),
+                  pd.concat(student_chunks(str(info_path), chunk_rows=50))):
+        assert (frame['imd_band'].astype(str) == '?').sum() == 5
+        assert '?' in LabelEncoder().fit(frame['imd_band'].astype(str)).classes_
+    # A '?' score is a missing number
+    for frame in (read_table(tables['studentAssessment.csv']), read_table(str(assessment_path))):
+        assert frame['score'][:3].isna().all() and frame['score'].dtype.kind == 'f'
@@ -0,0 +1,162 @@
+import sys
+import os
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+
+# Add parent directory to path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from feature_store import FeatureStore, FeatureStoreError, write_feature_store, normalize_ids
+from preprocessing import CATEGORICAL_COLS, NUMERIC_COLS, CategoricalEncoder, build_feature_matrix
+
+
+@pytest.fixture
+def students(cohort):
+    df = cohort[0].copy()
+    df['id_student'] = np.arange(len(df)) * 7 + 1000
+    return df
+
+
+@pytest.fixture
+def store(students, tmp_path):
+    path = str(tmp_path / 'feature_store.bin')
+    write_feature_store(path, students.sample(frac=1, random_state=3), version='v1')
+    return FeatureStore(path, cache_size=2)
+
+
+@pytest.fixture
+def client(cohort, store):
+    _, model, scaler, label_encoders = cohort
+    app_module.app.config['TESTING'] = True
+    with patch('app.model', model), patch('app.scaler', scaler), patch('app.label_encoders', label_encoders), \
+         patch('app.feature_store', store):
+        with app_module.app.test_client() as client:
+            yield client
+
+
+def test_frame_returns_rows_in_request_order(students, store):
+    ids = [students['id_student'][5], 3, students['id_student'][0], 'abc']
+    df, missing = store.frame(ids)
+
+    assert missing == [3, 'abc']
+    assert df['id_student'].tolist() == [students['id_student'][5], students['id_student'][0]]
+    expected = students.iloc[[5, 0]].reset_index(drop=True)
+    np.testing.assert_array_equal(df[NUMERIC_COLS].to_numpy(), expected[NUMERIC_COLS].to_numpy(dtype=float))
+    assert df[CATEGORICAL_COLS].values.tolist() == expected[CATEGORICAL_COLS].astype(str).values.tolist()
+
+
+def test_stored_features_encode_like_training(cohort, students, store):
+    encoder = CategoricalEncoder.from_label_encoders(cohort[3])
+    df, _ = store.frame(students['id_student'])
+
+    np.testing.assert_array_equal(build_feature_matrix(df, encoder), build_feature_matrix(students, encoder))
+
+
+def test_latest_presentation_wins_and_missing_categories_match_training(students, tmp_path):
+    df = students.iloc[:3].copy()
+    older = df.iloc[[0]].assign(code_presentation='2013B', avg_score=1.0)
+    newer = df.iloc[[0]].assign(code_presentation='2014J', avg_score=99.0, imd_band=np.nan)
+    path = str(tmp_path / 'store.bin')
+    write_feature_store(path, pd.concat([newer, df.iloc[1:], older]))
+
+    record = FeatureStore(path).get(df['id_student'].iloc[0])
+    assert record['code_presentation'] == '2014J' and record['avg_score'] == 99.0
+    assert record['imd_band'] == 'nan'
+    assert len(FeatureStore(path)) == 3
+
+
+def test_hot_cache_is_bounded(students, store):
+    ids = students['id_student'].tolist()
+    first = store.get(ids[0])
+    first['avg_score'] = -1
+    assert store.get(ids[0])['avg_score'] != -1
+    store.get(str(ids[1]))
+    store.get(ids[2])
+
+    stats = store.stats()
+    assert stats['cache_entries'] == 2
+    assert stats['cache_hit_rate'] == 0.25
+    assert store.get(12345678) is None
+
+
+def test_normalize_ids():
+    assert normalize_ids([5, '7', 8.0, 8.5, None, 'x']).tolist() == [5, 7, 8, -1, -1, -1]
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'bogus.bin'
+    path.write_bytes(b'not a store')
+    with pytest.raises(FeatureStoreError):
+        FeatureStore(str(path))
+
+
+def test_predict_by_id_matches_full_payload(client, students):
+    record = json.loads(students.iloc[[4]].to_json(orient='records'))[0]
+    full = client.post('/predict', json=record).get_json()
+    by_id = client.post('/predict', json={'id_student': record['id_student']}).get_json()
+
+    assert by_id['anomalyScore'] == pytest.approx(full['anomalyScore'])
+    assert by_id['riskScore'] == full['riskScore']
+    assert by_id['riskFactors'] == full['riskFactors']
+
+
+def test_predict_by_id_with_override(client, students):
+    student_id = int(students['id_student'][4])
+    response = client.post('/predict', json={'id_student': student_id, 'avg_score': 5, 'num_assessments': 1})
+    assert response.status_code == 200
+    assert any('Score' in factor['factor'] for factor in response.get_json()['riskFactors'])
+
+
+def test_predict_reports_unseen_categories(client, cohort, students):
+    record = json.loads(students.iloc[[4]].to_json(orient='records'))[0]
+    first = cohort[3]['region'].classes_[0]
+    unseen = client.post('/predict', json={**record, 'region': 'Atlantis'}).get_json()
+    as_first = client.post('/predict', json={**record, 'region': first}).get_json()
+
+    assert client.post('/predict', json=record).get_json()['unknownCategories'] == {}
+    assert unseen['unknownCategories'] == {'region': first}
+    assert unseen['anomalyScore'] == as_first['anomalyScore']
+
+
+def test_predict_unknown_id(client):
+    response = client.post('/predict', json={'id_student': 1})
+    assert response.status_code == 404
+
+
+def test_predict_batch_by_ids(client, students):
+    ids = students['id_student'].tolist()[:50]
+    by_ids = client.post('/predict_batch', json={'student_ids': ids + [1]}).get_json()
+    full = client.post('/predict_batch', json={
+        'students': json.loads(students.iloc[:50].assign(student_id=ids).to_json(orient='records'))
+    }).get_json()
+
+    assert by_ids['missing_ids'] == [1]
+    assert by_ids['summary'] == full['summary']
+    assert [p['student_id'] for p in by_ids['predictions']] == ids
+    assert [p['riskScore'] for p in by_ids['predictions']] == [p['riskScore'] for p in full['predictions']]
+
+
+def test_ids_without_store(cohort):
+    _, model, scaler, label_encoders = cohort
+    with patch('app.model', model), patch('app.scaler', scaler), patch('app.label_encoders', label_encoders), \
+         patch('app.feature_store', None):
+        client = app_module.app.test_client()
+        assert client.post('/predict', json={'id_student': 1}).status_code == 503
+        assert client.post('/predict_batch', json={'student_ids': [1]}).status_code == 503
+
+
+def test_removed_store_is_dropped(students, tmp_path):
+    path = str(tmp_path / 'feature_store.bin')
+    write_feature_store(path, students, version='v1')
+
+    with patch('app.FEATURE_STORE_PATH', path), patch('app.feature_store', None):
+        assert app_module.load_feature_store()
+        assert app_module.feature_store.rows == len(students)
+        os.remove(path)
+        # A streaming retrain removes the stale store: the next load stops serving it
+        assert not app_module.load_feature_store()
+        assert app_module.feature_store is None
@@ -0,0 +1,75 @@
+import sys
+import os
+import numpy as np
+import pytest
+from unittest.mock import patch
+
+# Add parent directory to path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+import model_store
+from forest_engine import FlatForest
+from model_bundle import write_bundle
+from preprocessing import FEATURE_COLS, CategoricalEncoder
+
+
+@pytest.fixture
+def models(cohort):
+    _, model, scaler, label_encoders = cohort
+    return model_store.ModelSet(model, scaler, label_encoders, version='ref')
+
+
+def test_float32_scores_stay_within_the_drift_bound(cohort, models):
+    """Parity over the reference cohort: every stage of the float32 path against the float64 one"""
+    df = cohort[0]
+    models32 = models.with_dtype('float32')
+
+    X = models.encode(df)
+    X32 = models32.encode(df)
+    assert X32.dtype == np.float32 and models32.scale(X32).dtype == np.float32
+    np.testing.assert_array_equal(X32, X.astype(np.float32))
+    np.testing.assert_allclose(models32.scale(X32), models.scale(X), rtol=1e-6, atol=1e-6)
+
+    labels, scores = models.score(models.scale(X))
+    labels32, scores32 = models32.score(models32.scale(X32))
+    drift = np.abs(scores32 - scores)
+    assert drift.max() <= model_store.FLOAT32_SCORE_TOLERANCE
+    # A label can only change for a student whose score is within the drift of the threshold
+    changed = labels32 != labels
+    assert np.all(np.abs(scores[changed] - models.forest.offset) <= drift[changed])
+
+    report = model_store.score_drift(models, models32, X)
+    assert report['max_score_drift'] == pytest.approx(drift.max())
+    assert report['label_agreement'] == pytest.approx(1 - changed.mean())
+
+
+def test_float32_set_is_only_served_within_tolerance(models):
+    served = model_store.use_float32(models)
+    assert served.dtype == np.float32 and served.forest.threshold.dtype == np.float32
+    assert served.float32_drift['rows'] == model_store.DRIFT_CHECK_ROWS
+    assert served.float32_drift['max_score_drift'] <= model_store.FLOAT32_SCORE_TOLERANCE
+
+    assert model_store.use_float32(models, tolerance=-1.0) is models
+
+
+def test_load_model_set_in_float32(tmp_path, cohort):
+    df, model, scaler, label_encoders = cohort
+    write_bundle(str(tmp_path / model_store.BUNDLE_FILE), FlatForest.from_isolation_forest(model), scaler,
+                 CategoricalEncoder.from_label_encoders(label_encoders), FEATURE_COLS, model_version='v32')
+    models = model_store.load_model_set(str(tmp_path), dtype='float32')
+    assert models.dtype == np.float32 and models.info()['dtype'] == 'float32'
+
+    with pytest.raises(ValueError, match='dtype'):
+        model_store.load_model_set(str(tmp_path), dtype='float16')
+
+    app_module.app.config['TESTING'] = True
+    with patch('app.active_models', models), patch('app.model', models.model), patch('app.scaler', models.scaler), \
+         patch('app.label_encoders', models.label_encoders), patch('app.model_version', models.version):
+        client = app_module.app.test_client()
+        record = df.drop(columns='student_id').iloc[0].to_dict()
+        prediction = client.post('/predict', json=record).get_json()
+        assert prediction['modelVersion'] == 'v32'
+        info = client.get('/info').get_json()
+        assert info['inference_dtype'] == 'float32'
+        assert info['float32_drift']['max_score_drift'] <= model_store.FLOAT32_SCORE_TOLERANCE
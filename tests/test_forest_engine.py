@@ -0,0 +1,80 @@
+import sys
+import os
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest
+
+# Add parent directory to path to allow importing the project modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from forest_engine import FlatForest
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(0)
+    X_train = rng.normal(size=(3000, 28))
+    X_test = np.vstack([rng.normal(size=(1000, 28)), rng.normal(3, 2, size=(200, 28))])
+    return X_train, X_test
+
+
+@pytest.mark.parametrize('params', [
+    {'n_estimators': 200, 'max_samples': 256, 'contamination': 0.31},
+    {'n_estimators': 50, 'max_samples': 64, 'contamination': 'auto'},
+    {'n_estimators': 30, 'max_features': 0.5, 'contamination': 0.1},
+])
+def test_matches_sklearn(data, params):
+    """Scores match within floating-point tolerance and labels match exactly"""
+    X_train, X_test = data
+    model = IsolationForest(random_state=42, **params).fit(X_train)
+    forest = FlatForest.from_isolation_forest(model)
+
+    raw_scores, labels = forest.score(X_test)
+
+    np.testing.assert_allclose(raw_scores, model.score_samples(X_test), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(labels, model.predict(X_test))
+    np.testing.assert_allclose(forest.decision_function(X_test), model.decision_function(X_test), atol=1e-12)
+
+
+def test_missing_values_follow_sklearn(data):
+    X_train, X_test = data
+    model = IsolationForest(n_estimators=50, random_state=0).fit(X_train)
+    forest = FlatForest.from_isolation_forest(model)
+    X_test = X_test.copy()
+    X_test[::7, 3] = np.nan
+
+    np.testing.assert_allclose(forest.score_samples(X_test), model.score_samples(X_test), atol=1e-12)
+
+
+def test_single_row_and_chunk_boundaries(data):
+    X_train, X_test = data
+    model = IsolationForest(n_estimators=200, random_state=1).fit(X_train)
+    forest = FlatForest.from_isolation_forest(model)
+
+    np.testing.assert_allclose(forest.score_samples(X_test[:1]), model.score_samples(X_test[:1]), atol=1e-12)
+    chunk = 65536 // 200
+    rows = X_test[:chunk * 2 + 1]
+    np.testing.assert_allclose(forest.score_samples(rows), model.score_samples(rows), atol=1e-12)
+
+
+def test_supports_only_fitted_isolation_forests():
+    assert not FlatForest.supports(IsolationForest())
+    assert not FlatForest.supports(object())
+
+
+def test_float32_forest_splits_like_float64(data):
+    X_train, X_test = data
+    model = IsolationForest(n_estimators=100, random_state=3).fit(X_train)
+    forest = FlatForest.from_isolation_forest(model)
+    forest32 = forest.as_float32()
+    assert forest32.threshold.dtype == np.float32 and forest32.leaf_value.dtype == np.float32
+
+    # The float32 values on either side of every threshold go the same way under both thresholds
+    internal = np.isfinite(forest.threshold)
+    rounded = forest.threshold[internal].astype(np.float32)
+    for x in (rounded, np.nextafter(rounded, np.float32(-np.inf)), np.nextafter(rounded, np.float32(np.inf))):
+        np.testing.assert_array_equal(x <= forest.threshold[internal], x <= forest32.threshold[internal])
+
+    X32 = X_test.astype(np.float32)
+    np.testing.assert_allclose(forest32.score_samples(X32), forest.score_samples(X32), rtol=0, atol=1e-7)
+    np.testing.assert_array_equal(forest32.predict(X32), forest.predict(X32))
@@ -0,0 +1,84 @@
+import sys
+import os
+import json
+import re
+import threading
+import time
+from unittest.mock import patch
+
+# Add parent directory to path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+import metrics
+
+
+def sample_value(text, name, **labels):
+    """Value of one sample line in Prometheus text output"""
+    pattern = '^' + re.escape(name) + (r'\{' + ','.join(f'{k}="{re.escape(str(v))}"' for k, v in labels.items()) + r'\}'
+                                 if labels else '') + r' (\S+)$'
+    match = re.search(pattern, text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+def test_collectors_merge_threads_and_render():
+    counter = metrics.Counter('test_total', 'Test counter', ['kind'])
+    histogram = metrics.Histogram('test_seconds', 'Test histogram', buckets=(0.1, 1.0))
+
+    def work():
+        for value in (0.05, 0.5, 5.0):
+            counter.inc('a')
+            histogram.observe(value)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.inc('b', amount=2)
+
+    assert counter.values() == {('a',): 12, ('b',): 2}
+    # Finished threads are folded into one shard; totals are unchanged
+    assert len(counter._shards) == 1
+    assert counter.values() == {('a',): 12, ('b',): 2}
+
+    text = '\n'.join(histogram.render())
+    assert sample_value(text, 'test_seconds_bucket', le='0.1') == 4
+    assert sample_value(text, 'test_seconds_bucket', le='1.0') == 8
+    assert sample_value(text, 'test_seconds_bucket', le='+Inf') == 12
+    assert sample_value(text, 'test_seconds_count') == 12
+    assert '# TYPE test_seconds histogram' in text
+
+
+def test_observe_is_cheap():
+    histogram = metrics.Histogram('cheap_seconds', 'Overhead check', ['stage'])
+    n = 100000
+    started = time.perf_counter()
+    for _ in range(n):
+        histogram.observe(0.001, 'score')
+    assert (time.perf_counter() - started) / n < 5e-6
+
+
+def test_metrics_endpoint_reports_stages_and_requests(cohort):
+    df, model, scaler, label_encoders = cohort
+    students = json.loads(df.head(20).to_json(orient='records'))
+    with patch('app.model', model), patch('app.scaler', scaler), patch('app.label_encoders', label_encoders), \
+            patch('app.model_version', 'metrics-v1'):
+        client = app_module.app.test_client()
+        assert client.post('/predict', json=students[0]).status_code == 200
+        assert client.post('/predict_batch', json={'students': students}).status_code == 200
+        assert client.post('/predict_batch', json={}).status_code == 400
+
+        response = client.get('/metrics')
+    text = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+
+    for stage in ['json_parse', 'preprocess', 'scale', 'score', 'risk_score', 'risk_factors', 'serialize']:
+        assert sample_value(text, 'student_api_stage_seconds_count', stage=stage) >= 1, stage
+    assert sample_value(text, 'student_api_requests_total', endpoint='/predict', status='200') >= 1
+    assert sample_value(text, 'student_api_errors_total', endpoint='/predict_batch') >= 1
+    assert sample_value(text, 'student_api_model_info', version='metrics-v1') == 1
+    assert sample_value(text, 'student_api_batch_size_rows_bucket', le='32.0') >= 1
+    assert sample_value(text, 'student_api_rows_scored_total') >= 21
+    assert sample_value(text, 'student_api_rows_per_second') is not None
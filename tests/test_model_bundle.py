@@ -0,0 +1,95 @@
+import sys
+import os
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+# Add parent directory to path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import model_store
+from forest_engine import FlatForest
+from model_bundle import BundleError, open_bundle, write_bundle
+from preprocessing import CATEGORICAL_COLS, FEATURE_COLS, CategoricalEncoder
+
+
+@pytest.fixture(scope='module')
+def artifacts():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(500, len(FEATURE_COLS)))
+    scaler = StandardScaler().fit(X)
+    model = IsolationForest(n_estimators=25, contamination=0.1, random_state=0).fit(scaler.transform(X))
+    label_encoders = {col: LabelEncoder().fit(['a', 'b', 'c']) for col in CATEGORICAL_COLS}
+    return X, model, scaler, label_encoders
+
+
+def save_bundle(path, artifacts, version='abc123'):
+    _, model, scaler, label_encoders = artifacts
+    return write_bundle(
+        str(path),
+        FlatForest.from_isolation_forest(model),
+        scaler,
+        CategoricalEncoder.from_label_encoders(label_encoders),
+        FEATURE_COLS,
+        model_version=version
+    )
+
+
+def test_bundle_round_trip_matches_sklearn(tmp_path, artifacts):
+    X, model, scaler, label_encoders = artifacts
+    path = tmp_path / model_store.BUNDLE_FILE
+    save_bundle(path, artifacts)
+
+    bundle = open_bundle(str(path))
+    assert bundle.version == 'abc123'
+    assert bundle.feature_cols == FEATURE_COLS
+    assert bundle.encoder.tables == CategoricalEncoder.from_label_encoders(label_encoders).tables
+
+    X_scaled = bundle.scaler.transform(X)
+    np.testing.assert_allclose(X_scaled, scaler.transform(X), atol=1e-12)
+    raw_scores, labels = bundle.forest.score(X_scaled)
+    np.testing.assert_allclose(raw_scores, model.score_samples(X_scaled), atol=1e-12)
+    np.testing.assert_array_equal(labels, model.predict(X_scaled))
+
+
+def test_bundle_arrays_are_read_only_views(tmp_path, artifacts):
+    path = tmp_path / model_store.BUNDLE_FILE
+    save_bundle(path, artifacts)
+    bundle = open_bundle(str(path))
+
+    for array in [bundle.forest.threshold, bundle.forest.children, bundle.scaler.mean_]:
+        assert not array.flags.writeable
+        assert array.ctypes.data % 64 == 0
+
+
+def test_corrupt_bundle_is_rejected(tmp_path, artifacts):
+    path = tmp_path / model_store.BUNDLE_FILE
+    save_bundle(path, artifacts)
+
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with pytest.raises(BundleError, match='checksum'):
+        open_bundle(str(path))
+
+    path.write_bytes(b'not a bundle at all')
+    with pytest.raises(BundleError):
+        open_bundle(str(path))
+
+
+def test_load_model_set_prefers_bundle(tmp_path, artifacts):
+    X, model, scaler, _ = artifacts
+    save_bundle(tmp_path / model_store.BUNDLE_FILE, artifacts)
+
+    models = model_store.load_model_set(str(tmp_path))
+    assert models.version == 'abc123'
+    assert models.forest is models.model
+
+    record = {col: 'b' for col in CATEGORICAL_COLS}
+    X_scaled = models.scale(models.encode(record))
+    predictions, raw_scores = models.score(X_scaled)
+    np.testing.assert_allclose(raw_scores, model.score_samples(X_scaled), atol=1e-12)
+
+    with pytest.raises(FileNotFoundError):
+        model_store.load_model_set(str(tmp_path), 'pickle')
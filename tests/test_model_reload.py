@@ -0,0 +1,99 @@
+import sys
+import os
+import time
+import numpy as np
+import pytest
+from unittest.mock import patch
+
+# Add parent directory to path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+import model_store
+from preprocessing import FEATURE_COLS
+
+
+def wait_for_reload(timeout=10):
+    deadline = time.time() + timeout
+    while app_module.reload_status['state'] == 'loading' and time.time() < deadline:
+        time.sleep(0.01)
+    return app_module.reload_status['state']
+
+
+@pytest.fixture
+def models_dir(tmp_path):
+    """Point the app at a temporary models directory and restore the previous set afterwards"""
+    previous = app_module.current_models()
+    with patch('app.MODELS_DIR', str(tmp_path)), patch('app.ADMIN_TOKEN', 'secret'):
+        yield str(tmp_path)
+    app_module.activate_models(previous)
+
+
+def test_reload_swaps_atomically_and_keeps_in_flight_snapshot(models_dir, write_artifacts):
+    write_artifacts(models_dir, seed=1)
+    assert app_module.load_models()
+    old = app_module.current_models()
+
+    write_artifacts(models_dir, seed=2)
+    assert app_module.reload_models()
+    assert wait_for_reload() == 'succeeded'
+
+    new = app_module.current_models()
+    assert new.version != old.version
+    assert (app_module.model, app_module.scaler, app_module.label_encoders) == (new.model, new.scaler, new.label_encoders)
+    # A request that took its snapshot before the swap still scores with the old objects
+    assert old.model is not new.model
+    assert old.score(np.zeros((1, len(FEATURE_COLS))))[1].shape == (1,)
+
+    client = app_module.app.test_client()
+    assert client.get('/info').get_json()['model_version'] == new.version
+    assert client.get('/').get_json()['model_version'] == new.version
+    response = client.post('/predict', json={'avg_score': 50, 'total_clicks': 600})
+    assert response.get_json()['modelVersion'] == new.version
+
+
+def test_failed_validation_keeps_current_models(models_dir, write_artifacts):
+    write_artifacts(models_dir, seed=1)
+    assert app_module.load_models()
+    before = app_module.current_models()
+
+    write_artifacts(models_dir, seed=3, n_features=5)
+    assert app_module.reload_models()
+    assert wait_for_reload() == 'failed'
+    assert 'features' in app_module.reload_status['error']
+    assert app_module.current_models() is before
+
+
+def test_admin_endpoint_requires_token(models_dir, write_artifacts):
+    write_artifacts(models_dir, seed=1)
+    client = app_module.app.test_client()
+
+    assert client.post('/admin/reload').status_code == 403
+    assert client.post('/admin/reload', headers={'X-Admin-Token': 'wrong'}).status_code == 403
+
+    response = client.post('/admin/reload', headers={'X-Admin-Token': 'secret'})
+    assert response.status_code == 202
+    assert wait_for_reload() == 'succeeded'
+    status = client.get('/admin/reload', headers={'X-Admin-Token': 'secret'}).get_json()
+    assert status['active_version'] == status['reload']['version']
+
+
+def test_empty_admin_token_disables_admin(models_dir):
+    client = app_module.app.test_client()
+    with patch('app.ADMIN_TOKEN', ''):
+        assert client.post('/admin/reload').status_code == 403
+        assert client.get('/admin/reload').status_code == 403
+        assert client.post('/admin/reload', headers={'X-Admin-Token': ''}).status_code == 403
+
+
+def test_watcher_waits_for_files_to_settle(tmp_path, write_artifacts):
+    changes = []
+    watcher = model_store.ModelWatcher(str(tmp_path), lambda: changes.append(1))
+
+    write_artifacts(str(tmp_path), seed=1)
+    previous = watcher.poll(())          # files just appeared: not reported yet
+    assert changes == []
+    previous = watcher.poll(previous)    # unchanged since last poll: reported once
+    assert changes == [1]
+    watcher.poll(previous)
+    assert changes == [1]
@@ -0,0 +1,206 @@
+import sys
+import os
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+
+# Add parent directory and benchmarks/ to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'benchmarks'))
+
+import app as app_module
+from aggregation import assessment_features, vle_features
+from feature_store import ASSESSMENT_EVENTS, VLE_EVENTS, OBSERVED_COL, FeatureStore, write_feature_store
+from online_features import OnlineFeatures, StudentAggregates, parse_event
+from synthetic import write_oulad
+
+EVENT_FEATURES = ['avg_score', 'std_score', 'min_score', 'max_score', 'num_assessments',
+                  'avg_submission_date', 'std_submission_date', 'score_range',
+                  'total_clicks', 'avg_clicks', 'std_clicks', 'max_clicks',
+                  'num_interactions', 'first_access', 'last_access', 'access_duration']
+
+
+@pytest.fixture(scope='module')
+def events(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp('data')
+    write_oulad(str(data_dir), 60, seed=11, vle_rows_per_student=25)
+    vle = pd.read_csv(data_dir / 'studentVle.csv')[['id_student', 'date', 'sum_click']]
+    assessments = pd.read_csv(data_dir / 'studentAssessment.csv')[['id_student', 'date_submitted', 'score']]
+    return vle.assign(type='vle'), assessments.assign(type='assessment')
+
+
+def batch_features(tmp_path, vle, assessments):
+    """Per-student event features the way train_model.py computes them"""
+    vle_path, assessment_path = tmp_path / 'vle.csv', tmp_path / 'assessments.csv'
+    vle.drop(columns='type').to_csv(vle_path, index=False)
+    assessments.drop(columns='type').to_csv(assessment_path, index=False)
+    a, _ = assessment_features(str(assessment_path))
+    v, _ = vle_features(str(vle_path))
+    return a.merge(v, on='id_student', how='outer').set_index('id_student')
+
+
+def replay(states, frame):
+    for event in frame.to_dict(orient='records'):
+        kind, student_id, values = parse_event(event)
+        states.setdefault(student_id, StudentAggregates()).add(kind, values)
+
+
+def test_streamed_events_match_batch_aggregation(events, tmp_path):
+    vle, assessments = events
+    states = {}
+    replay(states, pd.concat([vle, assessments]).sample(frac=1, random_state=0))
+
+    expected = batch_features(tmp_path, vle, assessments)
+    live = pd.DataFrame({student_id: state.features() for student_id, state in states.items()}).T
+    live = live.loc[expected.index, EVENT_FEATURES].astype(float)
+    pd.testing.assert_frame_equal(live, expected[EVENT_FEATURES].astype(float), check_names=False,
+                                  check_index_type=False, rtol=1e-9)
+
+
+def test_seeded_state_continues_the_batch_aggregates(events, tmp_path):
+    vle, assessments = events
+    vle_split, assessment_split = len(vle) // 2, len(assessments) // 2
+    seed = batch_features(tmp_path, vle.iloc[:vle_split], assessments.iloc[:assessment_split])
+
+    states = {student_id: StudentAggregates.from_features(row, ASSESSMENT_EVENTS | VLE_EVENTS)
+              for student_id, row in seed.fillna(0).iterrows()}
+    replay(states, pd.concat([vle.iloc[vle_split:], assessments.iloc[assessment_split:]]))
+
+    expected = batch_features(tmp_path, vle, assessments)
+    for student_id in seed.index:
+        live = states[student_id].features()
+        for col in EVENT_FEATURES:
+            assert live[col] == pytest.approx(expected.loc[student_id, col], rel=1e-9, abs=1e-9), col
+
+
+def test_students_without_events_start_empty():
+    median_filled = {col: 50.0 for col in EVENT_FEATURES}
+    state = StudentAggregates.from_features(median_filled, observed=ASSESSMENT_EVENTS)
+    state.add('vle', (12.0, 3.0))
+
+    features = state.features()
+    assert features['num_interactions'] == 1 and features['total_clicks'] == 3.0
+    assert features['std_clicks'] == 0.0 and features['access_duration'] == 0.0
+    assert features['num_assessments'] == 50
+
+
+def test_parse_event():
+    assert parse_event({'id_student': '7', 'date': 3, 'sum_click': 4}) == ('vle', 7, (3.0, 4.0))
+    assert parse_event({'type': 'assessment', 'id_student': 7, 'score': '?', 'date_submitted': 20})[0] == 'assessment'
+    for bad in ({'id_student': 7}, {'type': 'forum', 'id_student': 7}, {'id_student': 7.5, 'score': 1},
+                {'id_student': 7, 'sum_click': 'many'}, {'type': 'vle', 'id_student': 7}, [1]):
+        with pytest.raises(ValueError):
+            parse_event(bad)
+
+
+@pytest.fixture
+def students(cohort):
+    df = cohort[0].copy()
+    df['id_student'] = np.arange(len(df)) + 500
+    df[OBSERVED_COL] = ASSESSMENT_EVENTS | VLE_EVENTS
+    return df
+
+
+@pytest.fixture
+def store(students, tmp_path):
+    path = str(tmp_path / 'feature_store.bin')
+    write_feature_store(path, students)
+    return FeatureStore(path)
+
+
+@pytest.fixture
+def client(cohort, store):
+    _, model, scaler, label_encoders = cohort
+    app_module.app.config['TESTING'] = True
+    with patch('app.model', model), patch('app.scaler', scaler), patch('app.label_encoders', label_encoders), \
+         patch('app.feature_store', store), patch('app.online_features', None):
+        with app_module.app.test_client() as client:
+            yield client
+
+
+def good_student(students):
+    return int(students.sort_values('avg_score')['id_student'].iloc[-1])
+
+
+def test_store_records_observed_tables(students, store, tmp_path):
+    df = students.assign(**{OBSERVED_COL: 0})
+    df.loc[df.index[:3], OBSERVED_COL] = VLE_EVENTS
+    path = str(tmp_path / 'observed.bin')
+    write_feature_store(path, df)
+
+    positions, _ = FeatureStore(path).positions(df['id_student'].iloc[[0, 5]])
+    assert [FeatureStore(path).observed_at(row) for row in positions] == [VLE_EVENTS, 0]
+    write_feature_store(path, students.drop(columns=OBSERVED_COL))
+    assert FeatureStore(path).observed_at(0) == ASSESSMENT_EVENTS | VLE_EVENTS
+
+
+def test_events_rescore_the_student(client, students):
+    student_id = good_student(students)
+    before = client.post('/predict', json={'id_student': student_id}).get_json()
+
+    failing = [{'type': 'assessment', 'id_student': student_id, 'score': 0, 'date_submitted': 250}] * 30
+    response = client.post('/events', json={'events': failing + [{'id_student': 1, 'score': 5}]})
+    body = response.get_json()
+
+    assert response.status_code == 200
+    assert body['accepted'] == {'vle': 0, 'assessment': 30}
+    assert body['rejected'] == 1 and 'Unknown id_student' in body['errors'][0]
+    assert [p['student_id'] for p in body['predictions']] == [student_id]
+    assert body['predictions'][0]['riskScore'] > before['riskScore']
+
+    # Later id lookups see the live features too
+    after = client.post('/predict', json={'id_student': student_id}).get_json()
+    assert after['riskScore'] == body['predictions'][0]['riskScore']
+    batch = client.post('/predict_batch', json={'student_ids': [student_id]}).get_json()
+    assert batch['predictions'][0]['riskScore'] == after['riskScore']
+
+
+def test_events_as_ndjson_without_rescoring(client, students):
+    student_id = good_student(students)
+    lines = ''.join(json.dumps({'id_student': student_id, 'date': day, 'sum_click': 1}) + '\n' for day in range(5))
+    response = client.post('/events?rescore=0', data=lines, content_type='application/x-ndjson')
+    body = response.get_json()
+
+    assert body['accepted']['vle'] == 5 and body['students_updated'] == 1
+    assert 'predictions' not in body
+    info = client.get('/info').get_json()['online_features']
+    assert info['students'] == 1 and info['vle_events'] == 5
+
+
+def test_new_feature_store_drops_live_state(client, students, store, tmp_path):
+    student_id = good_student(students)
+    client.post('/events?rescore=0', json={'id_student': student_id, 'score': 0, 'date_submitted': 1})
+    assert len(app_module.online_features) == 1
+
+    path = str(tmp_path / 'retrained.bin')
+    write_feature_store(path, students)
+    with patch('app.feature_store', FeatureStore(path)):
+        assert len(app_module.live_features()) == 0
+
+
+def test_ingest_reads_the_batch_before_locking(students, store):
+    online = OnlineFeatures(store)
+    student_id = good_student(students)
+
+    def body():
+        # A slow client: other ingests and feature reads must not wait for the body
+        for day in range(3):
+            assert not online._lock.locked()
+            yield {'id_student': student_id, 'date': day, 'sum_click': 2}
+        yield {'id_student': 1, 'score': 5}
+        yield {'id_student': student_id}
+
+    result = online.ingest(body())
+    assert result['accepted'] == {'vle': 3, 'assessment': 0} and result['rejected'] == 2
+    # Errors stay in event order, whichever step rejected them
+    assert [error.split(':')[0] for error in result['errors']] == ['Event 3', 'Event 4']
+    assert online.features(student_id)['total_clicks'] == store.get(student_id)['total_clicks'] + 6
+
+
+def test_events_without_store():
+    with patch('app.feature_store', None):
+        client = app_module.app.test_client()
+        assert client.post('/events', json={'id_student': 1, 'score': 1}).status_code == 503
@@ -0,0 +1,86 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+# Add parent directory to path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from prediction_cache import PredictionCache, feature_keys
+from preprocessing import FEATURE_COLS, NUMERIC_COLS
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_counters():
+    cache = PredictionCache(maxsize=2, ttl=60)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1          # 'a' becomes most recently used
+    cache.put('c', 3)                   # evicts 'b'
+
+    assert cache.get_many(['a', 'b', 'c']) == [1, None, 3]
+    assert cache.stats()['hits'] == 3
+    assert cache.stats()['misses'] == 1
+    assert len(cache) == 2
+
+
+def test_ttl_expiry():
+    clock = FakeClock()
+    cache = PredictionCache(maxsize=10, ttl=5, clock=clock)
+    cache.put('a', 1)
+    clock.now = 4.9
+    assert cache.get('a') == 1
+    clock.now = 5.0
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_zero_size_disables_storage():
+    cache = PredictionCache(maxsize=0)
+    cache.put('a', 1)
+    assert cache.get('a') is None
+
+
+def test_feature_keys_are_canonical_and_versioned():
+    X = np.array([[0.0, 1.0, np.nan], [-0.0, 1.0, float('nan')], [0.0, 2.0, np.nan]])
+    keys = feature_keys(X, 'v1')
+    assert keys[0] == keys[1]
+    assert keys[0] != keys[2]
+    assert feature_keys(X, 'v2')[0] != keys[0]
+
+
+def test_batch_scores_only_cache_misses():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.integers(0, 300, size=(60, len(NUMERIC_COLS))).astype(float), columns=NUMERIC_COLS)
+    X = np.hstack([np.zeros((len(df), len(FEATURE_COLS) - len(NUMERIC_COLS))), df.to_numpy()])
+    scaler = StandardScaler().fit(X)
+    model = IsolationForest(n_estimators=20, random_state=0).fit(scaler.transform(X))
+
+    scored_rows = []
+    original = app_module.score_samples
+
+    def spy(X_scaled, models=None):
+        scored_rows.append(len(X_scaled))
+        return original(X_scaled, models)
+
+    with patch('app.model', model), patch('app.scaler', scaler), patch('app.label_encoders', {}), \
+            patch('app.model_version', 'test'), patch('app.prediction_cache', PredictionCache(100, 60)), \
+            patch('app.score_samples', side_effect=spy):
+        first = app_module.predict_input(df.iloc[:40])
+        second = app_module.predict_input(df)
+
+        assert scored_rows == [40, 20]
+        np.testing.assert_array_equal(second[1][:40], first[1])
+        np.testing.assert_allclose(second[1], model.score_samples(scaler.transform(X)), atol=1e-12)
+        assert app_module.prediction_cache.stats()['hits'] == 40
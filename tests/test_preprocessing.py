@@ -0,0 +1,111 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+# Add parent directory to path to allow importing the project modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import preprocessing
+from preprocessing import CATEGORICAL_COLS, NUMERIC_COLS, FEATURE_COLS
+
+CATEGORIES = {
+    'code_module': ['AAA', 'BBB', 'CCC'],
+    'code_presentation': ['2013J', '2014B', '2014J'],
+    'gender': ['F', 'M'],
+    'region': ['East Anglian Region', 'Scotland', 'Wales'],
+    'highest_education': ['HE Qualification', 'Lower Than A Level'],
+    'imd_band': ['0-10%', '20-30%', '30-40%'],
+    'age_band': ['0-35', '35-55', '55<='],
+    'disability': ['N', 'Y'],
+}
+
+
+def make_students(n, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({col: rng.choice(values, n) for col, values in CATEGORIES.items()})
+    for col in NUMERIC_COLS:
+        df[col] = rng.integers(0, 300, n).astype(float)
+    return df
+
+
+def fit_artifacts(df):
+    """Fit encoders and scaler the way train_model.py does"""
+    label_encoders = {}
+    encoded = df.copy()
+    for col in CATEGORICAL_COLS:
+        le = LabelEncoder()
+        encoded[col + '_encoded'] = le.fit_transform(df[col].astype(str))
+        label_encoders[col] = le
+    scaler = StandardScaler().fit(encoded[FEATURE_COLS])
+    return label_encoders, scaler
+
+
+def reference_preprocess(df, label_encoders, scaler):
+    """The original pandas + LabelEncoder.transform pipeline"""
+    df = df.copy()
+    for col in CATEGORICAL_COLS:
+        df[col + '_encoded'] = label_encoders[col].transform(df[col].astype(str))
+    return scaler.transform(df[FEATURE_COLS])
+
+
+def test_batch_matches_label_encoder_pipeline():
+    df = make_students(300)
+    label_encoders, scaler = fit_artifacts(df)
+    encoder = preprocessing.CategoricalEncoder.from_label_encoders(label_encoders)
+
+    X = preprocessing.scale_features(scaler, preprocessing.build_feature_matrix(df, encoder))
+    np.testing.assert_array_equal(X, reference_preprocess(df, label_encoders, scaler))
+
+
+def test_single_record_matches_batch_path():
+    df = make_students(50, seed=1)
+    label_encoders, scaler = fit_artifacts(df)
+    encoder = preprocessing.CategoricalEncoder.from_label_encoders(label_encoders)
+    batch = preprocessing.build_feature_matrix(df, encoder)
+
+    for i, record in enumerate(df.to_dict('records')):
+        row = preprocessing.build_feature_vector(record, encoder)
+        assert row.shape == (1, len(FEATURE_COLS))
+        np.testing.assert_array_equal(row[0], batch[i])
+
+
+def test_unknown_values_only_affect_their_own_row():
+    df = make_students(20, seed=2)
+    label_encoders, _ = fit_artifacts(df)
+    encoder = preprocessing.CategoricalEncoder.from_label_encoders(label_encoders)
+    expected = label_encoders['region'].transform(df['region'])
+
+    df.loc[5, 'region'] = 'Atlantis'
+    codes, unknown = encoder.encode_column('region', df['region'])
+
+    assert unknown.tolist() == [i == 5 for i in range(len(df))]
+    assert codes[5] == preprocessing.UNKNOWN_CODE
+    np.testing.assert_array_equal(np.delete(codes, 5), np.delete(expected, 5))
+
+
+def test_missing_fields_default_to_zero():
+    df = make_students(10, seed=3)
+    label_encoders, _ = fit_artifacts(df)
+    encoder = preprocessing.CategoricalEncoder.from_label_encoders(label_encoders)
+
+    row = preprocessing.build_feature_vector({'code_module': 'BBB', 'avg_score': 55}, encoder)[0]
+
+    assert row[FEATURE_COLS.index('code_module_encoded')] == 1
+    assert row[FEATURE_COLS.index('avg_score')] == 55
+    assert np.count_nonzero(row) == 2
+
+
+def test_unseen_values_are_scored_as_the_first_class():
+    df = make_students(20, seed=4)
+    label_encoders, _ = fit_artifacts(df)
+    encoder = preprocessing.CategoricalEncoder.from_label_encoders(label_encoders)
+    first = label_encoders['region'].classes_[preprocessing.UNKNOWN_CODE]
+    record = df.iloc[0].to_dict()
+
+    # Not a bucket of its own: the row is exactly the one for the column's first fitted class
+    unseen = preprocessing.build_feature_vector({**record, 'region': 'Atlantis'}, encoder)
+    np.testing.assert_array_equal(unseen, preprocessing.build_feature_vector({**record, 'region': first}, encoder))
+    assert preprocessing.unknown_categories({**record, 'region': 'Atlantis'}, encoder) == {'region': first}
+    assert preprocessing.unknown_categories(record, encoder) == {}
@@ -0,0 +1,101 @@
+import sys
+import os
+import json
+import pstats
+import tracemalloc
+from unittest.mock import patch
+
+# Add parent directory to path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from profiling import RequestProfiler
+
+
+def patched_client(cohort, profiler):
+    _, model, scaler, label_encoders = cohort
+    patches = [patch('app.model', model), patch('app.scaler', scaler), patch('app.label_encoders', label_encoders),
+               patch('app.ADMIN_TOKEN', 'secret'), patch('app.request_profiler', profiler)]
+    for p in patches:
+        p.start()
+    return app_module.app.test_client(), patches
+
+
+def test_admin_header_profiles_one_request(cohort, tmp_path):
+    students = json.loads(cohort[0].to_json(orient='records'))
+    profiler = RequestProfiler(str(tmp_path), interval=0.0005)
+    client, patches = patched_client(cohort, profiler)
+    try:
+        response = client.post('/predict_batch', json={'students': students},
+                               headers={'X-Profile': '1', 'X-Admin-Token': 'secret'})
+        assert response.status_code == 200
+        profile_id = response.headers['X-Profile-Id']
+
+        folded = (tmp_path / f'{profile_id}.folded').read_text()
+        report = (tmp_path / f'{profile_id}.txt').read_text()
+        assert 'POST /predict_batch' in report
+        assert 'allocation sites' in report and 'peak traced memory' in report
+        assert folded
+        assert all(line.rsplit(' ', 1)[1].isdigit() for line in folded.splitlines())
+        assert not tracemalloc.is_tracing()
+
+        # Without the admin token the header is ignored
+        response = client.post('/predict_batch', json={'students': students[:5]}, headers={'X-Profile': '1'})
+        assert 'X-Profile-Id' not in response.headers
+        assert profiler.profiled == 1
+    finally:
+        for p in patches:
+            p.stop()
+
+
+def test_cprofile_mode_and_sampling_rate(cohort, tmp_path):
+    profiler = RequestProfiler(str(tmp_path), sample_rate=1.0, mode='cprofile', trace_allocations=False)
+    client, patches = patched_client(cohort, profiler)
+    try:
+        response = client.post('/predict', json={'avg_score': 40})
+        profile_id = response.headers['X-Profile-Id']
+        assert (tmp_path / f'{profile_id}.prof').stat().st_size > 0
+    finally:
+        for p in patches:
+            p.stop()
+
+
+def test_streamed_response_is_profiled_until_the_last_chunk(cohort, tmp_path):
+    profiler = RequestProfiler(str(tmp_path), sample_rate=1.0, mode='cprofile', trace_allocations=False)
+    client, patches = patched_client(cohort, profiler)
+    body = cohort[0].to_csv(index=False)
+    try:
+        response = client.post('/predict_stream?chunk_size=50', data=body, content_type='text/csv',
+                               buffered=False)
+        profile_id = response.headers['X-Profile-Id']
+        # Nothing is saved while the body is still being produced
+        assert profiler.profiled == 0
+        lines = response.get_data(as_text=True).splitlines()
+        response.close()
+
+        assert len(lines) == len(cohort[0]) + 1
+        assert profiler.profiled == 1
+        stats = pstats.Stats(str(tmp_path / f'{profile_id}.prof'))
+        assert any(name == 'score_students' for _, _, name in stats.stats)
+    finally:
+        for p in patches:
+            p.stop()
+
+
+def test_empty_admin_token_cannot_request_profiles(cohort, tmp_path):
+    profiler = RequestProfiler(str(tmp_path))
+    client, patches = patched_client(cohort, profiler)
+    try:
+        with patch('app.ADMIN_TOKEN', ''):
+            response = client.post('/predict', json={'avg_score': 40}, headers={'X-Profile': '1'})
+            assert response.status_code == 200
+            assert 'X-Profile-Id' not in response.headers
+            assert profiler.profiled == 0 and not os.listdir(tmp_path)
+    finally:
+        for p in patches:
+            p.stop()
+
+
+def test_profiling_off_by_default():
+    assert app_module.request_profiler.sample_rate == 0
+    assert not app_module.request_profiler.wants(False)
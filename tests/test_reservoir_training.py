@@ -0,0 +1,101 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+# Add parent directory and benchmarks/ to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'benchmarks'))
+
+import reservoir_training as rt
+from aggregation import assessment_features, vle_features, registration_features
+from forest_engine import FlatForest
+from preprocessing import CATEGORICAL_COLS, FEATURE_COLS
+from synthetic import write_oulad
+
+
+@pytest.fixture(scope='module')
+def oulad(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp('data')
+    write_oulad(str(data_dir), 1500, seed=5, vle_rows_per_student=10)
+    info = pd.read_csv(data_dir / 'studentInfo.csv')
+    info.loc[::13, 'imd_band'] = np.nan
+    info.to_csv(data_dir / 'studentInfo.csv', index=False)
+    aggregates = [assessment_features(str(data_dir / 'studentAssessment.csv'))[0],
+                  # Students without VLE rows get median-filled features
+                  vle_features(str(data_dir / 'studentVle.csv'))[0].iloc[::2],
+                  registration_features(str(data_dir / 'studentRegistration.csv'))[0]]
+    return str(data_dir / 'studentInfo.csv'), aggregates
+
+
+def in_memory(students, aggregates):
+    """train_model.py's in-memory steps 3-5"""
+    df = pd.read_csv(students)
+    for features in aggregates:
+        df = df.merge(features, on='id_student', how='left')
+    for col in df.select_dtypes(include=[np.number]).columns:
+        df[col] = df[col].fillna(df[col].median())
+    encoders = {}
+    for col in CATEGORICAL_COLS:
+        encoders[col] = LabelEncoder()
+        df[col + '_encoded'] = encoders[col].fit_transform(df[col].astype(str))
+    return df, encoders, StandardScaler().fit(df[FEATURE_COLS])
+
+
+def test_one_pass_statistics_match_in_memory_preprocessing(oulad):
+    students, aggregates = oulad
+    stats = rt.FeatureStats()
+    for chunk in rt.merged_rows(students, aggregates, chunk_rows=128):
+        stats.update(chunk)
+    df, encoders, scaler = in_memory(students, aggregates)
+
+    medians = stats.medians()
+    assert medians['total_clicks'] == pytest.approx(df['total_clicks'].median())
+    label_encoders = stats.label_encoders()
+    for col in CATEGORICAL_COLS:
+        assert [str(c) for c in label_encoders[col].classes_] == [str(c) for c in encoders[col].classes_]
+    streamed = stats.scaler(medians, label_encoders)
+    np.testing.assert_allclose(streamed.mean_, scaler.mean_, rtol=1e-10, atol=1e-10)
+    np.testing.assert_allclose(streamed.var_, scaler.var_, rtol=1e-10, atol=1e-10)
+    assert streamed.n_samples_seen_ == scaler.n_samples_seen_
+
+
+def test_reservoir_is_uniform_and_independent_of_chunking():
+    rows = pd.DataFrame({'value': np.arange(10000)})
+
+    def sample(chunk_rows):
+        reservoir = rt.ReservoirSample(500, seed=1)
+        for start in range(0, len(rows), chunk_rows):
+            reservoir.update(rows.iloc[start:start + chunk_rows])
+        return reservoir.frame()['value'].to_numpy()
+
+    values = sample(1000)
+    assert len(values) == 500 and len(set(values)) == 500
+    np.testing.assert_array_equal(np.sort(values), np.sort(sample(37)))
+    # Uniform: each decile holds about a tenth of the sample
+    assert np.histogram(values, bins=10, range=(0, 10000))[0].min() > 25
+    assert len(rt.ReservoirSample(50).update(rows.iloc[:20]).frame()) == 20
+
+
+def test_holdout_is_deterministic():
+    ids = np.arange(20000) * 3 + 11
+    mask = rt.holdout_mask(ids)
+    assert mask.mean() == pytest.approx(rt.TEST_FRACTION, abs=0.02)
+    np.testing.assert_array_equal(mask[5000:6000], rt.holdout_mask(ids[5000:6000]))
+    assert (mask != rt.holdout_mask(ids, seed=7)).any()
+
+
+def test_train_from_a_sample(oulad):
+    students, aggregates = oulad
+    params = {'n_estimators': 50, 'max_samples': 64, 'max_features': 1.0, 'contamination': None}
+    model, scaler, label_encoders, report = rt.train(
+        lambda: rt.merged_rows(students, aggregates, chunk_rows=200), params, sample_rows=400)
+
+    assert report['rows'] == 1500 and report['sample_rows'] == 400
+    assert report['train_rows'] + report['test_rows'] == 1500
+    assert 0 < report['contamination'] < 0.5 and report['f1'] > 0.4
+    assert FlatForest.supports(model) and model.n_features_in_ == len(FEATURE_COLS)
+    assert set(label_encoders) == set(CATEGORICAL_COLS) and scaler.mean_.shape == (len(FEATURE_COLS),)
@@ -0,0 +1,84 @@
+import sys
+import os
+import json
+import msgpack
+import numpy as np
+import pytest
+from unittest.mock import patch
+from werkzeug.datastructures import MIMEAccept
+
+# Add parent directory to path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+import response_format as rf
+from risk_engine import batch_results_from_columns
+
+
+@pytest.mark.parametrize('value', [
+    np.array([True, False, True]), np.arange(100), np.array([-5, 300, 70000]), np.array([2 ** 40, -1]),
+    np.array([2 ** 63 + 5], dtype=np.uint64), np.linspace(-1, 1, 33), np.array([0.5, np.inf], dtype=np.float32),
+    np.array([], dtype=np.int64), np.array(['a', 'b'], dtype=object), np.int64(7), np.float32(0.5),
+])
+def test_msgpack_numpy_values_decode_to_their_values(value):
+    assert msgpack.unpackb(rf.packb(value)) == value.tolist()
+
+
+def test_msgpack_nested_body():
+    body = {'a': np.arange(3), 'b': [np.int8(1), 'x', None], 'c': {'d': 0.25}}
+    assert msgpack.unpackb(rf.packb(body)) == {'a': [0, 1, 2], 'b': [1, 'x', None], 'c': {'d': 0.25}}
+
+
+def test_msgpack_rejects_unknown_values():
+    with pytest.raises(TypeError):
+        rf.packb(object())
+
+
+def test_negotiate():
+    assert rf.negotiate(None, MIMEAccept()) == rf.ROWS
+    assert rf.negotiate(None, MIMEAccept([('*/*', 1)])) == rf.ROWS
+    assert rf.negotiate(None, MIMEAccept([('application/json', 1), ('application/msgpack', 0.5)])) == rf.ROWS
+    assert rf.negotiate(None, MIMEAccept([('application/x-msgpack', 1)])) == rf.MSGPACK
+    assert rf.negotiate(None, MIMEAccept([(rf.COLUMNS_MIMETYPE, 1)])) == rf.COLUMNS
+    assert rf.negotiate('columns', MIMEAccept([('application/msgpack', 1)])) == rf.COLUMNS
+    with pytest.raises(ValueError):
+        rf.negotiate('xml', MIMEAccept())
+
+
+@pytest.fixture
+def client(cohort):
+    _, model, scaler, label_encoders = cohort
+    app_module.app.config['TESTING'] = True
+    with patch('app.model', model), patch('app.scaler', scaler), patch('app.label_encoders', label_encoders):
+        with app_module.app.test_client() as client:
+            yield client
+
+
+@pytest.fixture
+def students(cohort):
+    return json.loads(cohort[0].to_json(orient='records'))
+
+
+def test_columnar_formats_carry_the_same_results(client, students):
+    rows = client.post('/predict_batch', json={'students': students})
+    assert rows.mimetype == 'application/json' and 'predictions' in rows.get_json()
+    expected = rows.get_json()
+
+    columns = client.post('/predict_batch?format=columns', json={'students': students})
+    packed = client.post('/predict_batch', json={'students': students}, headers={'Accept': 'application/msgpack'})
+    assert packed.mimetype == rf.MSGPACK_MIMETYPE and 'Accept' in packed.headers['Vary']
+
+    for body in (columns.get_json(), msgpack.unpackb(packed.get_data())):
+        assert body['format'] == 'columns' and body['rows'] == len(students)
+        assert body['summary'] == expected['summary'] and body['modelVersion'] == expected['modelVersion']
+        assert batch_results_from_columns(body) == expected['predictions']
+        # Every distinct text is sent once
+        assert len(body['strings']) == len(set(body['strings']))
+
+    assert len(packed.get_data()) < len(columns.get_data()) < len(rows.get_data()) / 2
+
+
+def test_unknown_format_is_rejected(client, students):
+    response = client.post('/predict_batch?format=xml', json={'students': students})
+    assert response.status_code == 406
+    assert 'Unknown format' in response.get_json()['error']
@@ -0,0 +1,104 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import risk_engine
+from app import calculate_risk_score_advanced, analyze_risk_factors, generate_recommendation
+
+RULE_FIELDS = ['avg_score', 'total_clicks', 'num_assessments', 'num_interactions',
+               'num_of_prev_attempts', 'avg_submission_date', 'first_access']
+
+
+def make_cohort(n, seed=0):
+    """Random students spanning every rule boundary, with some fields left out"""
+    rng = np.random.default_rng(seed)
+    values = {
+        'avg_score': rng.integers(0, 101, n),
+        'total_clicks': rng.integers(0, 1500, n),
+        'num_assessments': rng.integers(0, 12, n),
+        'num_interactions': rng.integers(0, 25, n),
+        'num_of_prev_attempts': rng.integers(0, 5, n),
+        'avg_submission_date': rng.integers(0, 250, n),
+        'first_access': rng.integers(-20, 120, n),
+    }
+    students = []
+    for i in range(n):
+        student = {'student_id': f'S{i:05d}'}
+        for field in RULE_FIELDS:
+            if rng.random() > 0.1:
+                student[field] = int(values[field][i])
+        students.append(student)
+    raw_scores = rng.uniform(-1.1, -0.35, n)
+    predictions = np.where(rng.random(n) < 0.3, -1, 1)
+    return students, raw_scores, predictions
+
+
+def per_row_results(students, raw_scores, predictions):
+    """Reference results from the per-row functions in app.py"""
+    results = []
+    for student, raw_score, pred in zip(students, raw_scores, predictions):
+        risk_score = calculate_risk_score_advanced(raw_score, pred, student)
+        is_at_risk = risk_score >= 50
+        factors = analyze_risk_factors(student, is_at_risk, risk_score)
+        results.append({
+            'isAtRisk': bool(is_at_risk),
+            'riskScore': float(risk_score),
+            'riskLevel': 'High' if risk_score > 70 else 'Medium' if risk_score > 40 else 'Low',
+            'numRiskFactors': len(factors),
+            'topRiskFactors': [f['factor'] for f in factors[:3]],
+            'recommendation': generate_recommendation(is_at_risk, risk_score, factors),
+        })
+    return results
+
+
+def test_columnar_engine_matches_per_row_functions():
+    """Every column produced by the engine matches the per-row rules exactly"""
+    students, raw_scores, predictions = make_cohort(5000)
+    frame = pd.DataFrame(students)
+
+    columns = risk_engine.score_batch(frame, raw_scores, predictions)
+    expected = per_row_results(students, raw_scores, predictions)
+
+    for key in expected[0]:
+        actual = columns[key]
+        actual = actual.tolist() if hasattr(actual, 'tolist') else actual
+        assert actual == [row[key] for row in expected], f"Mismatch in {key}"
+
+
+def test_high_severity_matches_per_row_functions():
+    """High-severity factors drive the urgent recommendation text"""
+    students, _, _ = make_cohort(2000, seed=1)
+    _, high_severity = risk_engine.detect_risk_factors(pd.DataFrame(students))
+
+    for student, row in zip(students, high_severity):
+        factors = analyze_risk_factors(student, True, 80)
+        expected = [f['factor'] for f in factors if f['severity'] == 'high']
+        actual = [name for name, flag in zip(risk_engine.RISK_FACTORS, row) if flag]
+        assert actual == expected
+
+
+def test_batch_results_and_summary():
+    """Result records and summary match the per-row reference"""
+    students, raw_scores, predictions = make_cohort(500, seed=2)
+    frame = pd.DataFrame(students)
+    columns = risk_engine.score_batch(frame, raw_scores, predictions)
+    results = risk_engine.build_batch_results(frame, columns, raw_scores, predictions,
+                                              frame['student_id'].tolist())
+    expected = per_row_results(students, raw_scores, predictions)
+
+    for student, result, reference in zip(students, results, expected):
+        assert result['student_id'] == student['student_id']
+        assert result['avg_score'] == student.get('avg_score', 0)
+        assert result['total_clicks'] == student.get('total_clicks', 0)
+        for key, value in reference.items():
+            assert result[key] == value
+
+    summary = risk_engine.summarize_batch(columns['riskScore'], columns['isAtRisk'])
+    assert summary['total_students'] == len(students)
+    assert summary['at_risk_count'] == sum(r['isAtRisk'] for r in expected)
+    assert summary['high_risk_count'] + summary['medium_risk_count'] + summary['low_risk_count'] == len(students)
+    assert summary['average_risk_score'] == round(sum(r['riskScore'] for r in expected) / len(expected), 1)
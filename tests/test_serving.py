@@ -0,0 +1,79 @@
+import sys
+import os
+import runpy
+import signal
+import threading
+import pytest
+from unittest.mock import patch
+
+# Add parent directory to path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'deployment', 'gunicorn.conf.py')
+
+
+def test_gunicorn_config_reads_environment():
+    with patch.dict(os.environ, {'WORKERS': '3', 'THREADS': '1', 'MAX_REQUESTS': '500'}):
+        config = runpy.run_path(CONFIG_PATH)
+    assert config['preload_app'] is True
+    assert config['wsgi_app'] == 'app:create_app()'
+    assert config['workers'] == 3
+    assert config['worker_class'] == 'sync'
+    assert config['max_requests'] == 500 and config['max_requests_jitter'] == 50
+
+    with patch.dict(os.environ, {'THREADS': '8'}):
+        assert runpy.run_path(CONFIG_PATH)['worker_class'] == 'gthread'
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires fork')
+def test_forked_worker_scores_even_if_parent_held_the_lock(tmp_path, write_artifacts):
+    write_artifacts(str(tmp_path), seed=1)
+    previous = app_module.current_models()
+    with patch('app.MODELS_DIR', str(tmp_path)):
+        assert app_module.load_models()
+    client_record = {'avg_score': 40, 'total_clicks': 100}
+
+    # A parent background thread (e.g. a reload) holds the models lock at the moment of fork
+    held = threading.Event()
+    release = threading.Event()
+
+    def hold_lock():
+        with app_module.models_lock:
+            held.set()
+            release.wait()
+
+    thread = threading.Thread(target=hold_lock)
+    thread.start()
+    held.wait()
+    try:
+        pid = os.fork()
+        if pid == 0:
+            signal.alarm(10)
+            try:
+                app_module.after_fork()
+                response = app_module.app.test_client().post('/predict', json=client_record)
+                os._exit(0 if response.status_code == 200 else 1)
+            except BaseException:
+                os._exit(2)
+        _, status = os.waitpid(pid, 0)
+    finally:
+        release.set()
+        thread.join()
+        app_module.activate_models(previous)
+
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+
+
+def test_after_fork_resets_interrupted_reload():
+    assert app_module.reload_lock.acquire(blocking=False)
+    app_module.reload_status['state'] = 'loading'
+    try:
+        app_module.after_fork()
+        assert app_module.reload_lock.acquire(blocking=False)
+        app_module.reload_lock.release()
+        assert app_module.reload_status['state'] == 'idle'
+    finally:
+        app_module.reload_status.update(state='idle', error=None)
@@ -0,0 +1,58 @@
+import sys
+import os
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+# Add parent directory to path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_store import ModelSet
+from preprocessing import CATEGORICAL_COLS, FEATURE_COLS
+from sharded_scoring import ShardedScorer, available_cpus
+
+
+@pytest.fixture(scope='module')
+def models():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(1000, len(FEATURE_COLS)))
+    scaler = StandardScaler().fit(X)
+    model = IsolationForest(n_estimators=30, contamination=0.2, random_state=0).fit(scaler.transform(X))
+    label_encoders = {col: LabelEncoder().fit(['a', 'b']) for col in CATEGORICAL_COLS}
+    return ModelSet(model, scaler, label_encoders, version='v1')
+
+
+@pytest.fixture(scope='module')
+def scorer():
+    scorer = ShardedScorer(workers=2, min_rows=100)
+    yield scorer
+    scorer.close()
+
+
+def test_sharded_scores_match_in_input_order(models, scorer):
+    X = np.random.default_rng(1).normal(size=(2501, len(FEATURE_COLS)))
+    X[::7, 3] = np.nan
+
+    predictions, raw_scores = scorer.score(models, X)
+    expected_predictions, expected_scores = models.score(X)
+    np.testing.assert_array_equal(raw_scores, expected_scores)
+    np.testing.assert_array_equal(predictions, expected_predictions)
+    assert scorer.stats()['batches'] == 1
+
+    # A new model set is republished to the pool
+    other = ModelSet(IsolationForest(n_estimators=5, random_state=1).fit(X[:500]), models.scaler,
+                     models.label_encoders, version='v2')
+    np.testing.assert_array_equal(scorer.score(other, X)[1], other.score(X)[1])
+
+
+def test_small_batches_stay_in_process(models, scorer):
+    X = np.zeros((50, len(FEATURE_COLS)))
+    before = scorer.stats()['batches']
+    np.testing.assert_array_equal(scorer.score(models, X)[1], models.score(X)[1])
+    assert scorer.stats()['batches'] == before
+
+
+def test_pool_size_defaults_to_cpu_count():
+    assert ShardedScorer().workers == available_cpus()
+    assert not ShardedScorer(workers=1, min_rows=1).should_shard(10 ** 6, ModelSet(None, None, None))
@@ -0,0 +1,114 @@
+import sys
+import os
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import IsolationForest
+
+# Add parent directory and benchmarks/ to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'benchmarks'))
+
+import sharded_training as st
+from aggregation import assessment_features, vle_features, registration_features
+from forest_engine import FlatForest
+from preprocessing import NUMERIC_COLS
+from reservoir_training import merged_rows
+from synthetic import write_oulad
+
+PARAMS = {'n_estimators': 40, 'max_samples': 64, 'max_features': 1.0, 'contamination': None}
+
+
+@pytest.fixture(scope='module')
+def merged(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp('data')
+    write_oulad(str(data_dir), 3000, seed=9, vle_rows_per_student=5)
+    aggregates = [assessment_features(str(data_dir / 'studentAssessment.csv'))[0],
+                  vle_features(str(data_dir / 'studentVle.csv'))[0],
+                  registration_features(str(data_dir / 'studentRegistration.csv'))[0]]
+    return pd.concat(merged_rows(str(data_dir / 'studentInfo.csv'), aggregates), ignore_index=True)
+
+
+def test_merged_forest_averages_the_shards(merged):
+    _, X = st.Preprocessor.fit(merged).transform(merged)
+    forests = [IsolationForest(n_estimators=n, max_samples=64, random_state=seed).fit(X[part])
+               for n, seed, part in ((10, 1, slice(0, 1000)), (30, 2, slice(1000, None)))]
+    model = st.merge_forests(forests, X, 0.25)
+
+    assert model.n_estimators == 40
+    # Each shard's score is -2^(-mean depth / c), so the merged depth is the tree-weighted mean
+    depth = [np.log2(-forest.score_samples(X[:200])) * forest.n_estimators for forest in forests]
+    np.testing.assert_allclose(np.log2(-model.score_samples(X[:200])), sum(depth) / 40, rtol=1e-10)
+    # offset_ is the contamination percentile of the merged training scores
+    assert np.mean(model.predict(X) == -1) == pytest.approx(0.25, abs=1e-3)
+    # The flattened serving forest scores the merged model the same way
+    np.testing.assert_allclose(FlatForest.from_isolation_forest(model).score_samples(X[:200]),
+                               model.score_samples(X[:200]), atol=1e-12)
+
+
+def test_shards_are_deterministic(merged, tmp_path):
+    first, *_, report = st.train(merged, PARAMS, str(tmp_path / 'a'))
+    # Another directory and another row order give the same trees
+    second, *_ = st.train(merged.sample(frac=1, random_state=1), PARAMS, str(tmp_path / 'b'))
+
+    assert report['shards'] > 1 and report['trees'] >= report['shards']
+    _, X = st.Preprocessor.load(str(tmp_path / 'a' / 'preprocessing.pkl')).transform(merged.head(300))
+    np.testing.assert_array_equal(first.score_samples(X), second.score_samples(X))
+    assert first.offset_ == second.offset_
+    assert st.shard_seed('AAA-2013J') == st.shard_seed('AAA-2013J') != st.shard_seed('AAA-2014J')
+
+
+def test_new_partition_refits_only_its_shard(merged, tmp_path):
+    shard_dir = str(tmp_path / 'shards')
+    old = merged[merged['code_presentation'] != '2014J']
+    _, _, label_encoders, _, report = st.train(old, PARAMS, shard_dir)
+    assert len(report['fitted']) == report['shards']
+    assert st.train(old, PARAMS, shard_dir)[-1]['fitted'] == []
+
+    model, _, extended, filled, report = st.train(merged, PARAMS, shard_dir)
+    with open(os.path.join(shard_dir, 'manifest.json')) as f:
+        shards = set(json.load(f)['shards'])
+    # Partitions too small for a shard of their own refit the pooled one
+    assert {name for name in report['fitted'] if name != st.SMALL_SHARD} == \
+        {name for name in shards if name.endswith('2014J')} != set()
+    assert shards == {name[:-4] for name in os.listdir(shard_dir)
+                      if name.endswith('.pkl') and name != 'preprocessing.pkl'}
+    # Existing categories keep their codes
+    for col, encoder in label_encoders.items():
+        assert list(extended[col].classes_[:len(encoder.classes_)]) == list(encoder.classes_)
+    assert not filled[NUMERIC_COLS].isna().any().any()
+    assert model.n_estimators > PARAMS['n_estimators']
+
+
+def test_small_new_partition_joins_a_full_shard(merged, tmp_path):
+    shard_dir = str(tmp_path / 'shards')
+    # Only partitions big enough for a shard of their own
+    train_rows = ~st.holdout_mask(merged['id_student'], st.TEST_FRACTION, st.SEED)
+    sizes = merged[train_rows].groupby(st.SHARD_KEYS).size()
+    full = sizes[sizes >= PARAMS['max_samples']].index
+    base = merged[pd.MultiIndex.from_frame(merged[st.SHARD_KEYS]).isin(full)]
+    st.train(base, PARAMS, shard_dir)
+
+    # A new presentation with fewer rows than max_samples, and no other small partition to pool with
+    new = base.head(30).copy()
+    new['code_presentation'] = '2015B'
+    new['id_student'] = new['id_student'] + merged['id_student'].max() + 1
+    model, *_, report = st.train(pd.concat([base, new], ignore_index=True), PARAMS, shard_dir)
+
+    assert st.SMALL_SHARD not in report['fitted'] and len(report['fitted']) == 1
+    with open(os.path.join(shard_dir, 'manifest.json')) as f:
+        shards = json.load(f)['shards']
+    assert not any(name.endswith('2015B') for name in shards)
+    assert model.n_estimators == sum(entry['trees'] for entry in shards.values())
+
+
+def test_isolation_forest_keeps_the_attributes_merge_forests_rewrites():
+    # merge_forests() concatenates these private per-tree attributes; fail loudly if sklearn renames them
+    forest = IsolationForest(n_estimators=3, max_samples=16, random_state=0).fit(np.random.RandomState(0).rand(32, 2))
+    for name in ('_seeds', '_average_path_length_per_tree', '_decision_path_lengths', '_max_samples',
+                 '_max_features'):
+        assert hasattr(forest, name), f"IsolationForest no longer has {name}: update sharded_training.merge_forests"
+    for name in ('_seeds', '_average_path_length_per_tree', '_decision_path_lengths'):
+        assert len(getattr(forest, name)) == 3, name
@@ -0,0 +1,73 @@
+import sys
+import os
+import json
+import subprocess
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+# Add parent directory to path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from forest_engine import FlatForest
+from model_bundle import write_bundle
+from model_store import BUNDLE_FILE
+from preprocessing import CATEGORICAL_COLS, FEATURE_COLS, CategoricalEncoder
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold-start budget in seconds (override with STARTUP_BUDGET_SECONDS on slow machines)
+STARTUP_BUDGET = float(os.environ.get('STARTUP_BUDGET_SECONDS', 5.0))
+
+
+def run_cold(code, **env):
+    """Run code in a fresh interpreter and return the JSON it prints on its last line"""
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=ROOT, capture_output=True, text=True, timeout=120,
+        env={**os.environ, 'APP_LAZY_INIT': '1', **env}
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_lazy_import_is_cheap():
+    # pandas alone costs ~0.1-0.2s to import; only the batch endpoints need it
+    report = run_cold(
+        "import json, sys, time\n"
+        "started = time.perf_counter()\n"
+        "import app\n"
+        "print(json.dumps({'seconds': time.perf_counter() - started, 'initialized': app.initialized,\n"
+        "                  'sklearn': 'sklearn' in sys.modules, 'joblib': 'joblib' in sys.modules,\n"
+        "                  'pandas': 'pandas' in sys.modules}))"
+    )
+    assert report['seconds'] < STARTUP_BUDGET
+    assert not report['initialized']
+    assert not report['sklearn'] and not report['joblib'] and not report['pandas']
+
+
+def test_cold_start_from_bundle_within_budget(tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, len(FEATURE_COLS)))
+    scaler = StandardScaler().fit(X)
+    model = IsolationForest(n_estimators=20, random_state=0).fit(scaler.transform(X))
+    label_encoders = {col: LabelEncoder().fit(['a', 'b']) for col in CATEGORICAL_COLS}
+    write_bundle(str(tmp_path / BUNDLE_FILE), FlatForest.from_isolation_forest(model), scaler,
+                 CategoricalEncoder.from_label_encoders(label_encoders), FEATURE_COLS, model_version='v1')
+
+    report = run_cold(
+        "import json, sys\n"
+        "import app\n"
+        "app.create_app()\n"
+        "status = app.app.test_client().post('/predict', json={'avg_score': 50}).status_code\n"
+        "print(json.dumps({**app.startup_report, 'loaded': app.models_loaded, 'status': status,\n"
+        "                  'version': app.current_models().version, 'sklearn': 'sklearn' in sys.modules,\n"
+        "                  'pandas': 'pandas' in sys.modules}))",
+        MODELS_DIR=str(tmp_path)
+    )
+    assert report['loaded'] and report['version'] == 'v1'
+    assert report['total_s'] < STARTUP_BUDGET
+    assert report['load_s'] is not None and report['warm_up_s'] is not None
+    # Serving single records from the bundle never needs sklearn or pandas
+    assert report['status'] == 200
+    assert not report['sklearn'] and not report['pandas']
@@ -0,0 +1,69 @@
+import sys
+import os
+import json
+import pytest
+from unittest.mock import patch
+
+# Add parent directory to path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+
+
+@pytest.fixture
+def client(cohort):
+    _, model, scaler, label_encoders = cohort
+    app_module.app.config['TESTING'] = True
+    with patch('app.model', model), patch('app.scaler', scaler), patch('app.label_encoders', label_encoders):
+        with app_module.app.test_client() as client:
+            yield client
+
+
+def read_ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_ndjson_stream_matches_predict_batch(client, cohort):
+    df = cohort[0]
+    students = json.loads(df.to_json(orient='records'))
+    body = ''.join(json.dumps(s) + '\n' for s in students)
+
+    response = client.post('/predict_stream?chunk_size=64', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = read_ndjson(response)
+
+    batch = client.post('/predict_batch', json={'students': students}).get_json()
+    assert lines[:-1] == batch['predictions']
+    assert lines[-1] == {'summary': batch['summary'], 'modelVersion': batch['modelVersion']}
+
+
+def test_csv_stream_matches_predict_batch(client, cohort):
+    df = cohort[0]
+    students = json.loads(df.to_json(orient='records'))
+
+    response = client.post('/predict_stream?chunk_size=100', data=df.to_csv(index=False), content_type='text/csv')
+    lines = read_ndjson(response)
+
+    batch = client.post('/predict_batch', json={'students': students}).get_json()
+    assert [r['riskScore'] for r in lines[:-1]] == [r['riskScore'] for r in batch['predictions']]
+    assert [r['student_id'] for r in lines[:-1]] == df['student_id'].tolist()
+    assert lines[-1]['summary'] == batch['summary']
+
+
+def test_stream_reports_bad_lines(client, cohort):
+    students = json.loads(cohort[0].head(3).to_json(orient='records'))
+    body = json.dumps(students[0]) + '\n{not json\n' + json.dumps(students[1]) + '\n'
+
+    response = client.post('/predict_stream?chunk_size=1', data=body, content_type='application/x-ndjson')
+    lines = read_ndjson(response)
+
+    assert len(lines) == 2
+    assert lines[0]['student_id'] == students[0]['student_id']
+    assert 'line 2' in lines[1]['error']
+    assert lines[1]['students_scored'] == 1
+
+
+def test_stream_rejects_bad_chunk_size(client):
+    response = client.post('/predict_stream?chunk_size=0', data='', content_type='application/x-ndjson')
+    assert response.status_code == 400
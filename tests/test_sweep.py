@@ -0,0 +1,77 @@
+import sys
+import os
+import json
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest
+from sklearn.metrics import f1_score
+
+# Add parent directory to path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sweep
+
+
+@pytest.fixture(scope='module')
+def matrices(tmp_path_factory):
+    rng = np.random.default_rng(3)
+    X = rng.normal(size=(1200, 6))
+    y = (rng.random(1200) < 0.25).astype(int)
+    X[y == 1] += rng.normal(2.5, 1.0, size=(int(y.sum()), 6))
+    directory = str(tmp_path_factory.mktemp('sweep'))
+    sweep.save_matrices(directory, X[:800], X[800:], y[:800], y[800:], [f'f{i}' for i in range(6)])
+    return directory
+
+
+def test_matrices_are_shared_read_only(matrices):
+    arrays, meta = sweep.load_matrices(matrices)
+    assert isinstance(arrays['X_train'], np.memmap) and not arrays['X_train'].flags.writeable
+    assert arrays['X_test'].shape == (400, 6) and meta['rows_train'] == 800
+    assert meta['label_rate'] == pytest.approx(arrays['y_train'].mean())
+
+
+def test_parameter_grid_resolves_label_rate():
+    configs = sweep.parameter_grid({'n_estimators': [50], 'max_samples': [64], 'max_features': [1.0],
+                                    'contamination': ['label', 0.25, 'auto']}, 0.25)
+    assert [c['contamination'] for c in configs] == [0.25, 'auto']
+    assert len(sweep.parameter_grid(None, 0.25)) == 3 * 3 * 3 * 4
+    assert len(sweep.parameter_grid(None, 0.3)) == 3 * 3 * 3 * 3
+
+
+def test_one_fit_matches_sklearn_for_every_contamination(matrices):
+    arrays, _ = sweep.load_matrices(matrices)
+    sweep._init_worker(matrices)
+    structure = (('n_estimators', 30), ('max_samples', 64), ('max_features', 0.5))
+    results = sweep.evaluate(structure, [0.1, 0.3, 'auto'])
+
+    for result in results:
+        model = IsolationForest(**result['params'], random_state=sweep.RANDOM_STATE).fit(arrays['X_train'])
+        expected = f1_score(arrays['y_test'], (model.predict(arrays['X_test']) == -1).astype(int))
+        assert result['f1'] == pytest.approx(expected, abs=1e-6)
+    assert len({r['model_bytes'] for r in results}) == 1 and results[0]['latency_ms'] > 0
+
+
+def test_pareto_front_and_pick():
+    results = [
+        {'name': 'accurate', 'f1': 0.80, 'latency_ms': 2.0, 'model_bytes': 400},
+        {'name': 'nearly', 'f1': 0.798, 'latency_ms': 1.0, 'model_bytes': 500},
+        {'name': 'fast', 'f1': 0.70, 'latency_ms': 0.5, 'model_bytes': 300},
+        {'name': 'dominated', 'f1': 0.75, 'latency_ms': 2.5, 'model_bytes': 600},
+    ]
+    assert [r['name'] for r in sweep.pareto_front(results)] == ['accurate', 'nearly', 'fast']
+    assert sweep.pick_best(results)['name'] == 'nearly'
+    assert sweep.pick_best(results, tolerance=0)['name'] == 'accurate'
+
+
+def test_run_sweep_in_parallel(matrices, tmp_path):
+    configs = sweep.parameter_grid({'n_estimators': [20, 40], 'max_samples': [64], 'max_features': [1.0],
+                                    'contamination': [0.2, 0.3]}, 0.25)
+    results = sweep.run_sweep(matrices, configs, workers=2)
+    assert sorted(json.dumps(r['params'], sort_keys=True) for r in results) == \
+        sorted(json.dumps(c, sort_keys=True) for c in configs)
+
+    best = sweep.pick_best(results)
+    report = sweep.write_results(str(tmp_path / 'results.json'), results, best)
+    assert best in report['pareto_front']
+    with open(tmp_path / 'results.json') as f:
+        assert json.load(f)['best']['params'] == best['params']
@@ -0,0 +1,168 @@
+import sys
+import os
+import json
+import threading
+import pytest
+from unittest.mock import patch
+from werkzeug.serving import make_server
+
+# Add parent directory and benchmarks/ to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'benchmarks'))
+
+import app as app_module
+from traffic import RequestRecorder, read_log
+from loadtest import (parse_mix, synthetic_requests, run_closed, run_open, poisson_schedule,
+                      log_schedule, summarize, is_saturated)
+
+
+@pytest.fixture
+def server(cohort):
+    """The API on a real socket, serving the fitted cohort model"""
+    _, model, scaler, label_encoders = cohort
+    with patch('app.model', model), patch('app.scaler', scaler), patch('app.label_encoders', label_encoders):
+        srv = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+        thread = threading.Thread(target=srv.serve_forever, daemon=True)
+        thread.start()
+        yield f"http://127.0.0.1:{srv.server_port}"
+        srv.shutdown()
+        thread.join()
+
+
+def test_recorder_round_trip(tmp_path):
+    path = str(tmp_path / 'log' / 'requests.jsonl')
+    recorder = RequestRecorder(path, max_body_bytes=100)
+
+    assert recorder.record('POST', '/predict', 'application/json', b'{"avg_score": 50}')
+    assert recorder.record('GET', '/info')
+    assert not recorder.record('POST', '/predict_batch', 'application/json', b'x' * 101)
+    recorder.close()
+    with open(path, 'a') as f:
+        f.write('not json\n\n')
+
+    entries = read_log(path)
+    assert [(e['method'], e['path']) for e in entries] == [('POST', '/predict'), ('GET', '/info')]
+    assert json.loads(entries[0]['body']) == {'avg_score': 50}
+    assert entries[1]['body'] is None
+    assert recorder.stats()['recorded'] == 2 and recorder.stats()['skipped'] == 1
+
+
+def test_recorder_skips_scrapes_and_admin(tmp_path):
+    recorder = RequestRecorder(str(tmp_path / 'r.jsonl'))
+    assert recorder.wants('/predict')
+    assert not recorder.wants('/metrics')
+    assert not recorder.wants('/admin/reload')
+    assert not RequestRecorder(str(tmp_path / 'r.jsonl'), sample_rate=0).wants('/predict')
+
+
+def test_app_captures_requests(cohort, tmp_path):
+    df, model, scaler, label_encoders = cohort
+    recorder = RequestRecorder(str(tmp_path / 'captured.jsonl'))
+    student = json.loads(df.iloc[:1].to_json(orient='records'))[0]
+
+    with patch('app.model', model), patch('app.scaler', scaler), patch('app.label_encoders', label_encoders), \
+         patch('app.request_recorder', recorder):
+        client = app_module.app.test_client()
+        assert client.post('/predict', json=student).status_code == 200
+        client.get('/info?verbose=1')
+        client.get('/metrics')
+    recorder.close()
+
+    entries = read_log(recorder.path)
+    assert [e['path'] for e in entries] == ['/predict', '/info?verbose=1']
+    assert json.loads(entries[0]['body']) == student
+
+
+def test_capture_leaves_streamed_uploads_to_their_handlers(cohort, tmp_path):
+    df, model, scaler, label_encoders = cohort
+    recorder = RequestRecorder(str(tmp_path / 'captured.jsonl'), max_body_bytes=100)
+    students = json.loads(df.head(5).to_json(orient='records'))
+    body = ''.join(json.dumps(s) + '\n' for s in students)
+
+    with patch('app.model', model), patch('app.scaler', scaler), patch('app.label_encoders', label_encoders), \
+         patch('app.request_recorder', recorder):
+        client = app_module.app.test_client()
+        response = client.post('/predict_stream', data=body, content_type='application/x-ndjson')
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        # Over max_body_bytes: skipped on its Content-Length, still scored
+        assert client.post('/predict_batch', json={'students': students}).status_code == 200
+    recorder.close()
+
+    assert response.status_code == 200
+    assert lines[-1]['summary']['total_students'] == 5
+    assert [r['student_id'] for r in lines[:-1]] == [s['student_id'] for s in students]
+    assert not os.path.exists(recorder.path)
+    assert recorder.stats()['skipped'] == 1
+
+
+def test_capture_skips_streamed_endpoints_for_json_content_types(cohort, tmp_path):
+    df, model, scaler, label_encoders = cohort
+    recorder = RequestRecorder(str(tmp_path / 'captured.jsonl'))
+    students = json.loads(df.head(5).to_json(orient='records'))
+    body = ''.join(json.dumps(s) + '\n' for s in students)
+
+    with patch('app.model', model), patch('app.scaler', scaler), patch('app.label_encoders', label_encoders), \
+         patch('app.request_recorder', recorder):
+        client = app_module.app.test_client()
+        # NDJSON labelled as JSON is still streamed by the handler
+        response = client.post('/predict_stream', data=body, content_type='application/json')
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    recorder.close()
+
+    assert response.status_code == 200
+    assert lines[-1]['summary']['total_students'] == 5
+    assert not os.path.exists(recorder.path)
+
+
+def test_parse_mix_normalizes_weights():
+    assert parse_mix('predict=3,info=1') == {'predict': 0.75, 'info': 0.25}
+    with pytest.raises(ValueError):
+        parse_mix('predict=1,bogus=1')
+
+
+def test_synthetic_requests_follow_mix():
+    entries = synthetic_requests(300, parse_mix('predict=1,predict_batch=1'), batch_size=5)
+    batch = [e for e in entries if e['path'] == '/predict_batch']
+    assert 100 < len(batch) < 200
+    assert len(json.loads(batch[0]['body'])['students']) == 5
+
+
+def test_schedules():
+    offsets = poisson_schedule(200, 2.0, seed=1)
+    assert 300 < len(offsets) < 500
+    assert (offsets < 2.0).all() and (offsets[1:] >= offsets[:-1]).all()
+    assert list(log_schedule([{'t': 10.0}, {'t': 12.0}, {'t': 14.0}], speed=2)) == [0.0, 1.0, 2.0]
+
+
+def test_closed_and_open_loop_against_server(server):
+    entries = synthetic_requests(50, parse_mix('predict=8,predict_batch=1,info=1'), batch_size=10)
+    entries.append({'method': 'POST', 'path': '/predict', 'content_type': 'application/json', 'body': '{}'})
+
+    results, elapsed = run_closed(server, entries, concurrency=2, duration=0.5)
+    step = summarize(results, elapsed)
+    assert step['requests'] == len(results) > 0
+    assert step['by_endpoint']['/predict']['p99_ms'] > 0
+
+    results, elapsed = run_open(server, entries, poisson_schedule(100, 0.6, seed=2), max_in_flight=4)
+    step = summarize(results, elapsed)
+    assert step['requests'] > 20
+    assert set(step['by_endpoint']) <= {'/predict', '/predict_batch', '/info'}
+
+
+def test_unreachable_server_counts_errors():
+    entries = [{'method': 'GET', 'path': '/info'}]
+    results, elapsed = run_closed('http://127.0.0.1:9', entries, concurrency=1, duration=0.1)
+    step = summarize(results, elapsed)
+    assert step['error_rate'] == 1.0 and step['p99_ms'] is None
+
+
+def test_saturation_rules():
+    base = {'error_rate': 0.0, 'p99_ms': 20.0, 'throughput_rps': 100.0, 'offered_rps': None}
+    assert is_saturated(base, None) is None
+    assert is_saturated(dict(base, throughput_rps=105.0), base) is not None
+    assert is_saturated(dict(base, throughput_rps=180.0), base) is None
+    assert is_saturated(dict(base, offered_rps=200.0), None) is not None
+    assert is_saturated(dict(base, offered_rps=105.0), None) is None
+    assert is_saturated(base, None, slo_ms=10) is not None
+    assert is_saturated(dict(base, error_rate=0.05), None) is not None
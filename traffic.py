@@ -0,0 +1,104 @@
+"""
+Traffic Capture
+Request logs in JSONL, one request per line: {"t", "method", "path", "content_type", "body"}
+The API appends to one when REQUEST_LOG_PATH is set; benchmarks/loadtest.py replays them.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+
+# Never recorded: scrapes and admin calls are not user traffic
+SKIP_PREFIXES = ('/metrics', '/admin')
+
+
+class RequestRecorder:
+    """
+    Appends a sample of incoming requests to a JSONL log
+    Each line is written with a single append, so gunicorn workers can share one file. Bodies
+    larger than max_body_bytes, or of unknown length, are not recorded (the request is counted as
+    skipped); callers check accepts_body() before reading one.
+    """
+
+    def __init__(self, path, sample_rate=1.0, max_body_bytes=1 << 20):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_body_bytes = max_body_bytes
+        self.recorded = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._pid = None
+
+    def wants(self, path):
+        if path.startswith(SKIP_PREFIXES):
+            return False
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def _handle(self):
+        if self._file is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+            self._pid = os.getpid()
+        return self._file
+
+    def accepts_body(self, content_length):
+        """Whether a body of content_length bytes may be read; unknown or too large is counted as skipped"""
+        if content_length is None or content_length > self.max_body_bytes:
+            self.skipped += 1
+            return False
+        return True
+
+    def record(self, method, path, content_type=None, body=b''):
+        if len(body) > self.max_body_bytes:
+            self.skipped += 1
+            return False
+        entry = {
+            't': round(time.time(), 6),
+            'method': method,
+            'path': path,
+            'content_type': content_type,
+            'body': body.decode('utf-8', errors='replace') if body else None
+        }
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        with self._lock:
+            f = self._handle()
+            f.write(line)
+            f.flush()
+            self.recorded += 1
+        return True
+
+    def close(self):
+        with self._lock:
+            if self._file is not None and self._pid == os.getpid():
+                self._file.close()
+            self._file = None
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'sample_rate': self.sample_rate,
+            'recorded': self.recorded,
+            'skipped': self.skipped
+        }
+
+
+def read_log(path):
+    """Entries of a request log, in order; blank and malformed lines are skipped"""
+    entries = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(entry, dict) and 'path' in entry:
+                entries.append(entry)
+    return entries
@@ -8,6 +8,18 @@ import joblib
 import warnings
 import wandb
 import os
+import json
+
+from preprocessing import CATEGORICAL_COLS, FEATURE_COLS, CategoricalEncoder
+from forest_engine import FlatForest
+from model_bundle import write_bundle
+from model_store import artifact_version
+from aggregation import assessment_features, vle_features, registration_features
+from data_cache import DataCache, read_table
+from feature_store import OBSERVED_COL, observed_events, write_feature_store
+import sweep
+import reservoir_training
+import sharded_training
 
 warnings.filterwarnings('ignore')
 
@@ -31,159 +43,215 @@ DATA_PATH = 'data/'  # Change this to your data folder path
 # artifact.add_dir(DATA_PATH)
 # wandb.log_artifact(artifact)
 
-students = pd.read_csv(f'{DATA_PATH}studentInfo.csv')
-assessments = pd.read_csv(f'{DATA_PATH}studentAssessment.csv')
-vle = pd.read_csv(f'{DATA_PATH}studentVle.csv')
-student_registration = pd.read_csv(f'{DATA_PATH}studentRegistration.csv')
+TABLES = ['studentInfo.csv', 'studentAssessment.csv', 'studentVle.csv', 'studentRegistration.csv']
+source_paths = [f'{DATA_PATH}{name}' for name in TABLES]
 
+# Each CSV is converted once into a typed columnar cache keyed by its content hash; later runs
+# memory-map the cached columns. DATA_CACHE=0 reads the CSVs directly.
+if os.environ.get('DATA_CACHE', '1') != '0':
+    data_cache = DataCache(os.environ.get('DATA_CACHE_DIR', os.path.join(DATA_PATH, '.cache')))
+    tables = data_cache.load(source_paths)
+else:
+    tables = dict(zip(TABLES, source_paths))
+
+students = read_table(tables['studentInfo.csv'])
 print(f"✓ Students: {students.shape}")
-print(f"✓ Assessments: {assessments.shape}")
-print(f"✓ VLE: {vle.shape}")
-print(f"✓ Registration: {student_registration.shape}")
 
 # ============================================================================
 # STEP 2: Feature Engineering
 # ============================================================================
 print("\n[2/7] Creating features...")
 
-# Assessment features
-assessment_agg = assessments.groupby('id_student').agg({
-    'score': ['mean', 'std', 'min', 'max', 'count'],
-    'date_submitted': ['mean', 'std']
-}).reset_index()
-
-assessment_agg.columns = ['id_student', 'avg_score', 'std_score', 'min_score', 
-                          'max_score', 'num_assessments', 'avg_submission_date', 
-                          'std_submission_date']
-
-assessment_agg['score_range'] = assessment_agg['max_score'] - assessment_agg['min_score']
-assessment_agg['std_score'] = assessment_agg['std_score'].fillna(0)
-assessment_agg['std_submission_date'] = assessment_agg['std_submission_date'].fillna(0)
-
-# VLE features
-vle_agg = vle.groupby('id_student').agg({
-    'sum_click': ['sum', 'mean', 'std', 'max'],
-    'date': ['count', 'min', 'max']
-}).reset_index()
-
-vle_agg.columns = ['id_student', 'total_clicks', 'avg_clicks', 'std_clicks', 
-                   'max_clicks', 'num_interactions', 'first_access', 'last_access']
+# The event tables are aggregated chunk by chunk (TRAIN_CHUNK_ROWS rows at a time), so memory
+# depends on the number of students, not on the size of the logs
+assessment_agg, n_assessments = assessment_features(tables['studentAssessment.csv'])
+print(f"✓ Assessments: {n_assessments} rows -> {len(assessment_agg)} students")
 
-vle_agg['access_duration'] = vle_agg['last_access'] - vle_agg['first_access']
-vle_agg['std_clicks'] = vle_agg['std_clicks'].fillna(0)
+vle_agg, n_vle = vle_features(tables['studentVle.csv'])
+print(f"✓ VLE: {n_vle} rows -> {len(vle_agg)} students")
 
-# Registration features
-reg_features = student_registration.groupby('id_student').agg({
-    'date_registration': 'mean',
-    'date_unregistration': lambda x: x.notna().sum()
-}).reset_index()
-
-reg_features.columns = ['id_student', 'avg_registration_date', 'num_unregistrations']
+reg_features, n_registrations = registration_features(tables['studentRegistration.csv'])
+print(f"✓ Registration: {n_registrations} rows -> {len(reg_features)} students")
 
 print("✓ Features created")
 
-# ============================================================================
-# STEP 3: Merge and Prepare Data
-# ============================================================================
-print("\n[3/7] Merging datasets...")
-
-df = students.copy()
-df = df.merge(assessment_agg, on='id_student', how='left')
-df = df.merge(vle_agg, on='id_student', how='left')
-df = df.merge(reg_features, on='id_student', how='left')
-
-# Fill missing values
-numeric_cols = df.select_dtypes(include=[np.number]).columns
-for col in numeric_cols:
-    df[col] = df[col].fillna(df[col].median())
-
-# Create anomaly labels
-df['is_anomaly'] = ((df['final_result'] == 'Fail') | 
-                    (df['final_result'] == 'Withdrawn')).astype(int)
-
-print(f"✓ Dataset merged: {df.shape}")
-print(f"✓ Anomaly rate: {df['is_anomaly'].mean():.2%}")
-
-# ============================================================================
-# STEP 4: Encode Categorical Variables
-# ============================================================================
-print("\n[4/7] Encoding categorical variables...")
-
-label_encoders = {}
-categorical_cols = ['code_module', 'code_presentation', 'gender', 'region', 
-                   'highest_education', 'imd_band', 'age_band', 'disability']
-
-for col in categorical_cols:
-    le = LabelEncoder()
-    df[col + '_encoded'] = le.fit_transform(df[col].astype(str))
-    label_encoders[col] = le
-
-print(f"✓ Encoded {len(categorical_cols)} categorical features")
-
-# ============================================================================
-# STEP 5: Prepare Feature Matrix
-# ============================================================================
-print("\n[5/7] Preparing feature matrix...")
-
-feature_cols = [col + '_encoded' for col in categorical_cols] + [
-    'studied_credits', 'num_of_prev_attempts',
-    'avg_score', 'std_score', 'min_score', 'max_score', 'num_assessments',
-    'avg_submission_date', 'std_submission_date', 'score_range',
-    'total_clicks', 'avg_clicks', 'std_clicks', 'max_clicks',
-    'num_interactions', 'first_access', 'last_access', 'access_duration',
-    'avg_registration_date', 'num_unregistrations'
-]
-
-X = df[feature_cols].copy()
-y = df['is_anomaly'].copy()
-
-# Scale features
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
-
-# Train-test split
-X_train, X_test, y_train, y_test = train_test_split(
-    X_scaled, y, test_size=0.3, random_state=42, stratify=y
-)
-
-print(f"✓ Training set: {X_train.shape}")
-print(f"✓ Test set: {X_test.shape}")
-
-# ============================================================================
-# STEP 6: Train Model
-# ============================================================================
-print("\n[6/7] Training Isolation Forest model...")
-
-contamination_rate = min(float(y_train.mean()), 0.5)
-
-model = IsolationForest(
-    n_estimators=200,
-    max_samples=256,
-    contamination=contamination_rate,
-    random_state=42,
-    verbose=0
-)
-
-model.fit(X_train)
-print("✓ Model trained successfully")
-
-# Evaluate
-y_pred = model.predict(X_test)
-y_pred = np.where(y_pred == -1, 1, 0)
-
-f1 = f1_score(y_test, y_pred)
-print(f"\nModel Performance:")
-print(f"  F1-Score: {f1:.4f}")
-print("\nClassification Report:")
-print(classification_report(y_test, y_pred, target_names=['Normal', 'Anomaly']))
+# TRAIN_STREAMING=1 runs steps 3-6 out of core (reservoir_training.py): the merged rows are streamed
+# in TRAIN_CHUNK_ROWS chunks, the trees are fitted on a uniform reservoir sample of the training
+# students and the holdout is scored chunk by chunk, so memory is set by the sample, not the population
+if os.environ.get('TRAIN_STREAMING', '0') == '1':
+    print("\n[3-6/7] Training out of core on a reservoir sample...")
+
+    params = {'n_estimators': 200, 'max_samples': 256, 'max_features': 1.0, 'contamination': None}
+    sample_rows = int(os.environ.get('TRAIN_SAMPLE_ROWS', 0)) or None
+    model, scaler, label_encoders, report = reservoir_training.train(
+        lambda: reservoir_training.merged_rows(tables['studentInfo.csv'], [assessment_agg, vle_agg, reg_features]),
+        params,
+        sample_rows=sample_rows
+    )
+    contamination_rate = params['contamination'] = report['contamination']
+    f1 = report['f1']
+    df = None
+    sweep_report = None
+
+    print("\nModel Performance:")
+    print(f"  F1-Score: {f1:.4f}")
+    print(f"  Precision: {report['precision']:.4f}, Recall: {report['recall']:.4f} "
+          f"({report['test_rows']} holdout students)")
+# TRAIN_SHARDS=1 runs steps 3-6 as one forest shard per code_module/code_presentation partition
+# (sharded_training.py), fitted across TRAIN_SHARD_WORKERS processes and merged into one model. The
+# shards are kept in TRAIN_SHARD_DIR, so a later run only refits partitions whose rows changed
+# (TRAIN_SHARDS_REBUILD=1 refits them all)
+elif os.environ.get('TRAIN_SHARDS', '0') == '1':
+    print("\n[3-6/7] Training forest shards per module presentation...")
+
+    df = pd.concat(
+        reservoir_training.merged_rows(tables['studentInfo.csv'], [assessment_agg, vle_agg, reg_features]),
+        ignore_index=True
+    )
+    df[OBSERVED_COL] = observed_events(df)
+    print(f"✓ Dataset merged: {df.shape}")
+    print(f"✓ Anomaly rate: {df['is_anomaly'].mean():.2%}")
+
+    params = {'n_estimators': 200, 'max_samples': 256, 'max_features': 1.0, 'contamination': None}
+    model, scaler, label_encoders, df, report = sharded_training.train(
+        df,
+        params,
+        os.environ.get('TRAIN_SHARD_DIR', 'models/shards'),
+        workers=int(os.environ.get('TRAIN_SHARD_WORKERS', 0)) or None,
+        rebuild=os.environ.get('TRAIN_SHARDS_REBUILD', '0') == '1'
+    )
+    contamination_rate = params['contamination'] = report['contamination']
+    params['n_estimators'] = report['trees']
+    f1 = report['f1']
+    sweep_report = None
+
+    print("\nModel Performance:")
+    print(f"  F1-Score: {f1:.4f}")
+    print(f"  Precision: {report['precision']:.4f}, Recall: {report['recall']:.4f} "
+          f"({report['test_rows']} holdout students, {report['shards']} shards, {report['trees']} trees)")
+else:
+    # ============================================================================
+    # STEP 3: Merge and Prepare Data
+    # ============================================================================
+    print("\n[3/7] Merging datasets...")
+
+    df = students.copy()
+    df = df.merge(assessment_agg, on='id_student', how='left')
+    df = df.merge(vle_agg, on='id_student', how='left')
+    df = df.merge(reg_features, on='id_student', how='left')
+
+    # Which event tables each student has rows in, for the feature store (before the gaps are filled)
+    df[OBSERVED_COL] = observed_events(df)
+
+    # Fill missing values
+    numeric_cols = df.select_dtypes(include=[np.number]).columns
+    for col in numeric_cols:
+        df[col] = df[col].fillna(df[col].median())
+
+    # Create anomaly labels
+    df['is_anomaly'] = ((df['final_result'] == 'Fail') | 
+                        (df['final_result'] == 'Withdrawn')).astype(int)
+
+    print(f"✓ Dataset merged: {df.shape}")
+    print(f"✓ Anomaly rate: {df['is_anomaly'].mean():.2%}")
+
+    # ============================================================================
+    # STEP 4: Encode Categorical Variables
+    # ============================================================================
+    print("\n[4/7] Encoding categorical variables...")
+
+    label_encoders = {}
+    categorical_cols = CATEGORICAL_COLS
+
+    for col in categorical_cols:
+        le = LabelEncoder()
+        df[col + '_encoded'] = le.fit_transform(df[col].astype(str))
+        label_encoders[col] = le
+
+    print(f"✓ Encoded {len(categorical_cols)} categorical features")
+
+    # ============================================================================
+    # STEP 5: Prepare Feature Matrix
+    # ============================================================================
+    print("\n[5/7] Preparing feature matrix...")
+
+    feature_cols = FEATURE_COLS
+
+    X = df[feature_cols].copy()
+    y = df['is_anomaly'].copy()
+
+    # Scale features
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+
+    # Train-test split
+    X_train, X_test, y_train, y_test = train_test_split(
+        X_scaled, y, test_size=0.3, random_state=42, stratify=y
+    )
+
+    print(f"✓ Training set: {X_train.shape}")
+    print(f"✓ Test set: {X_test.shape}")
+
+    # ============================================================================
+    # STEP 6: Train Model
+    # ============================================================================
+    print("\n[6/7] Training Isolation Forest model...")
+
+    contamination_rate = min(float(y_train.mean()), 0.5)
+    params = {'n_estimators': 200, 'max_samples': 256, 'max_features': 1.0, 'contamination': contamination_rate}
+
+    # TRAIN_SWEEP=1 fits a grid of settings (sweep.DEFAULT_GRID, overridden by TRAIN_SWEEP_GRID as JSON)
+    # across TRAIN_SWEEP_WORKERS processes over the matrices above, saved once to models/sweep, and
+    # trains the Pareto-best one (F1 vs. latency vs. size)
+    sweep_report = None
+    if os.environ.get('TRAIN_SWEEP', '0') == '1':
+        sweep_dir = os.environ.get('TRAIN_SWEEP_DIR', 'models/sweep')
+        sweep.save_matrices(sweep_dir, X_train, X_test, y_train.to_numpy(), y_test.to_numpy(), feature_cols)
+        grid = json.loads(os.environ['TRAIN_SWEEP_GRID']) if os.environ.get('TRAIN_SWEEP_GRID') else None
+        results = sweep.run_sweep(sweep_dir, sweep.parameter_grid(grid, float(y_train.mean())),
+                                  int(os.environ.get('TRAIN_SWEEP_WORKERS', 0)) or None)
+        best = sweep.pick_best(results)
+        sweep.print_front(results, best)
+        sweep_report = sweep.write_results(os.path.join(sweep_dir, 'results.json'), results, best)
+        params = best['params']
+        contamination_rate = params['contamination']
+        print(f"✓ Sweep picked {params}")
+
+    model = IsolationForest(
+        **params,
+        random_state=sweep.RANDOM_STATE,
+        verbose=0
+    )
+
+    model.fit(X_train)
+    print("✓ Model trained successfully")
+
+    # Evaluate
+    y_pred = model.predict(X_test)
+    y_pred = np.where(y_pred == -1, 1, 0)
+
+    f1 = f1_score(y_test, y_pred)
+    print(f"\nModel Performance:")
+    print(f"  F1-Score: {f1:.4f}")
+    print("\nClassification Report:")
+    print(classification_report(y_test, y_pred, target_names=['Normal', 'Anomaly']))
 
 # Log metrics to W&B
 wandb.log({
     "f1_score": f1,
     "contamination": contamination_rate,
-    "n_estimators": 200,
-    "random_state": 42
+    "n_estimators": params['n_estimators'],
+    "max_samples": params['max_samples'],
+    "max_features": params['max_features'],
+    "random_state": sweep.RANDOM_STATE
 })
+if sweep_report is not None:
+    wandb.log({
+        "sweep_configs": len(sweep_report['results']),
+        "sweep_pareto_size": len(sweep_report['pareto_front']),
+        "sweep_best_latency_ms": sweep_report['best']['latency_ms'],
+        "sweep_best_model_bytes": sweep_report['best']['model_bytes']
+    })
 
 # ============================================================================
 # STEP 7: Save Models and Preprocessors
@@ -207,11 +275,43 @@ print(f"✓ Model saved to: {model_path}")
 print(f"✓ Scaler saved to: {scaler_path}")
 print(f"✓ Encoders saved to: {encoders_path}")
 
+# Memory-mappable bundle for serving (shared read-only by all API worker processes)
+bundle_path = 'models/model_bundle.bin'
+if FlatForest.supports(model):
+    write_bundle(
+        bundle_path,
+        FlatForest.from_isolation_forest(model),
+        scaler,
+        CategoricalEncoder.from_label_encoders(label_encoders),
+        FEATURE_COLS,
+        model_version=artifact_version([model_path, scaler_path, encoders_path])
+    )
+    print(f"✓ Bundle saved to: {bundle_path}")
+
+# Merged per-student features, so the API can score a student from its id_student alone
+feature_store_path = 'models/feature_store.bin'
+if df is not None:
+    store = write_feature_store(
+        feature_store_path,
+        df,
+        version=artifact_version([model_path, scaler_path, encoders_path])
+    )
+    print(f"✓ Feature store saved to: {feature_store_path} ({store['rows']} students)")
+else:
+    # Writing it needs every merged row in memory at once. A store from an earlier run would be
+    # served next to a model it was not built for, so it is removed
+    print("⚠️  Feature store not written in streaming mode")
+    if os.path.exists(feature_store_path):
+        os.remove(feature_store_path)
+        print(f"⚠️  Removed the previous run's {feature_store_path}")
+
 # Log artifacts to W&B
 artifact = wandb.Artifact('anomaly-detection-model', type='model')
 artifact.add_file(model_path)
 artifact.add_file(scaler_path)
 artifact.add_file(encoders_path)
+if os.path.exists(bundle_path):
+    artifact.add_file(bundle_path)
 wandb.log_artifact(artifact)
 
 # Finish the run